@@ -1,17 +1,110 @@
 # app.py
-import numpy as np
-import joblib
-import matplotlib.pyplot as plt
+import importlib
+import sys
+import time
 
-from config import (
-    FOOTFALL_MODEL, DELIVERY_MODEL, CLV_MODEL,
-    CHARTS_DIR
-)
+_APP_START = time.perf_counter()
 
-# Load models
-footfall_model = joblib.load(FOOTFALL_MODEL)
-delivery_model = joblib.load(DELIVERY_MODEL)
-clv_model = joblib.load(CLV_MODEL)
+# NumPy, Matplotlib, scikit-learn/XGBoost and the models themselves are only
+# imported when a menu option needs them, so the menu shows up immediately.
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+_load_times = []  # (what, seconds), first use only
+
+
+def _record(what, seconds):
+    _load_times.append((what, seconds))
+    if PROFILE_STARTUP:
+        print(f"   [profile] {what}: {seconds * 1000:.1f} ms")
+
+
+def _lazy_import(name):
+    if name in sys.modules:
+        return sys.modules[name]
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    _record(f"import {name}", time.perf_counter() - start)
+    return module
+
+
+_DAEMON = []  # [ModelClient or None] once looked up
+
+
+def _daemon():
+    """Client of the local model daemon (model_server.py), or None when it is not running."""
+    if not _DAEMON:
+        start = time.perf_counter()
+        client = _lazy_import("model_client").connect()
+        _DAEMON.append(client)
+        if client is not None:
+            _record("connect to model daemon", time.perf_counter() - start)
+    return _DAEMON[0]
+
+
+def _predict(name, row, quantiles=()):
+    """
+    One row's prediction, from the model daemon when it is running (no
+    NumPy / scikit-learn / XGBoost or model loading in this process).
+    With quantiles (delivery): (mean, {quantile: value}).
+    """
+    client = _daemon()
+    if client is not None:
+        try:
+            if not quantiles:
+                return client.predict(name, [row])[0]
+            mean, q = client.predict_quantiles(name, [row], quantiles)
+        except OSError:  # the daemon went away: predict in-process from now on
+            client.close()
+            _DAEMON[0] = None
+            return _predict(name, row, quantiles)
+    else:
+        np = _lazy_import("numpy")
+        X = np.array([row])
+        if not quantiles:
+            return _model(name).predict(X)[0]
+        mean, q = _model(name).predict_quantiles(X, quantiles)
+    return mean[0], {k: v[0] for k, v in zip(quantiles, q)}
+
+
+def _model(name):
+    registry = _lazy_import("model_registry").registry
+    if registry.is_loaded(name):
+        return registry.get(name)
+    start = time.perf_counter()
+    model = registry.get(name)
+    _record(f"load {name} model", time.perf_counter() - start)
+    return model
+
+
+def _seconds_since_process_start():
+    """Linux only: how long ago the interpreter process was started."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        import os
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def print_startup_profile():
+    to_menu = time.perf_counter() - _APP_START
+    age = _seconds_since_process_start()
+
+    print("\n--- Startup profile ---")
+    if age is not None:
+        print(f"Interpreter start-up (before app.py): ~{max(age - to_menu, 0) * 1000:.0f} ms (10 ms resolution)")
+    for what, seconds in _load_times:
+        print(f"{what:<38} {seconds * 1000:8.1f} ms")
+    print(f"{'app.py → first menu':<38} {to_menu * 1000:8.1f} ms")
+
+    heavy = ["numpy", "pandas", "matplotlib", "joblib", "sklearn", "xgboost"]
+    deferred = [m for m in heavy if m not in sys.modules]
+    print(f"Modules loaded so far: {len(sys.modules)}")
+    print(f"Deferred until needed: {', '.join(deferred) or 'none'}")
+    print("Per-option import and model load times are printed as [profile] lines.")
+    print("For a per-module breakdown: python -X importtime app.py\n")
 
 
 # ---------------------------
@@ -20,13 +113,12 @@ clv_model = joblib.load(CLV_MODEL)
 def predict_footfall():
     print("\n--- Store Footfall Prediction ---")
     day_of_week = int(input("Day of week (0=Mon ... 6=Sun): "))
-    is_weekend = 1 if day_of_week >= 5 else 0
     is_holiday = int(input("Is it a holiday? (0=No, 1=Yes): "))
     promo_active = int(input("Is promotion active? (0=No, 1=Yes): "))
     month = int(input("Month (1-12): "))
 
-    X = np.array([[day_of_week, is_weekend, is_holiday, promo_active, month]])
-    pred = footfall_model.predict(X)[0]
+    # Precomputed at train time: a table lookup instead of predict()
+    pred = _predict("footfall", [day_of_week, int(day_of_week >= 5), is_holiday, promo_active, month])
 
     print(f"\n👉 Expected Footfall Today: {pred:.0f} people\n")
 
@@ -54,18 +146,23 @@ def predict_delivery_time():
     traffic_level = int(input("Traffic level (1=Low, 2=Medium, 3=High): "))
     rider_experience_months = int(input("Rider experience (months): "))
 
-    X = np.array([[distance_km, num_items, order_value,
-                   time_of_day_bucket, traffic_level,
-                   rider_experience_months]])
-    pred = delivery_model.predict(X)[0]
+    from config import DELIVERY_QUANTILES, DELIVERY_RISK_QUANTILE
+    quantiles = sorted(set(DELIVERY_QUANTILES) | ({DELIVERY_RISK_QUANTILE} - {None}))
+    row = [distance_km, num_items, order_value, time_of_day_bucket, traffic_level, rider_experience_months]
+    pred, by_q = _predict("delivery", row, quantiles) if quantiles else (_predict("delivery", row), {})
 
-    print(f"\n👉 Expected Delivery Time: {pred:.1f} minutes\n")
+    print(f"\n👉 Expected Delivery Time: {pred:.1f} minutes")
+    if len(DELIVERY_QUANTILES) >= 2:
+        lo, hi = min(DELIVERY_QUANTILES), max(DELIVERY_QUANTILES)
+        print(f"   Likely range (P{lo * 100:g}–P{hi * 100:g}): {by_q[lo]:.1f}–{by_q[hi]:.1f} minutes")
+    print()
 
-    if pred > 45:
+    risk = by_q.get(DELIVERY_RISK_QUANTILE, pred)
+    if risk > 45:
         print("⚙ Recommendation: HIGH delay risk.")
         print("- Inform customer proactively about delay.")
         print("- Avoid committing aggressive SLAs in this time slot.\n")
-    elif pred > 30:
+    elif risk > 30:
         print("⚙ Recommendation: MODERATE delay risk.")
         print("- Assign experienced rider.")
         print("- Review route selection.\n")
@@ -86,10 +183,9 @@ def predict_clv():
     loyalty_index = (1 - discount_usage_rate) * (1 - return_rate)
     monetary_value = orders_per_month * avg_order_value
 
-    X = np.array([[tenure_months, orders_per_month, avg_order_value,
-                   recency_days, discount_usage_rate, return_rate,
-                   loyalty_index, monetary_value]])
-    pred = clv_model.predict(X)[0]
+    pred = _predict("clv", [tenure_months, orders_per_month, avg_order_value,
+                            recency_days, discount_usage_rate, return_rate,
+                            loyalty_index, monetary_value])
 
     print(f"\n👉 Predicted 12-month CLV: ₹ {pred:,.2f}\n")
 
@@ -118,6 +214,9 @@ def generate_store_heatmap():
     Just a visual to make your app feel futuristic.
     """
     print("\n--- AR View: Store Heatmap (Simulation) ---")
+    np = _lazy_import("numpy")
+    plt = _lazy_import("matplotlib.pyplot")
+    from config import CHARTS_DIR
 
     # 5x5 grid = 25 zones
     rows, cols = 5, 5
@@ -185,6 +284,9 @@ def chatbot():
 # Main Menu
 # ---------------------------
 def main_menu():
+    if PROFILE_STARTUP:
+        print_startup_profile()
+
     while True:
         print("=" * 60)
         print("        RetailPredict 360 – AI Store Intelligence Suite")
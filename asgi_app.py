@@ -0,0 +1,297 @@
+# asgi_app.py
+"""
+Async (ASGI) front end for the web app.
+
+    python asgi_app.py [--port 8000] [--workers 2]       # needs uvicorn
+    uvicorn asgi_app:app --port 8000                     # or any ASGI server
+
+The /footfall, /delivery and /clv pages are served here directly: the page
+is rendered on the event loop, and parsing plus the model call run in a
+bounded thread pool (NumPy and XGBoost release the GIL while they predict),
+so one slow prediction no longer holds up other requests. The footfall
+lookup stays on the loop once its model is loaded; a request that would
+load a model first always goes to the pool. The parse/predict/result steps
+and templates are the ones web_app.py uses, so both modes give the same
+pages, error messages included.
+
+Backpressure: at most ASYNC_MAX_PENDING predictions may be queued or running;
+beyond that a page answers 503 with Retry-After instead of queueing without
+bound. Every other route (JSON APIs, /metrics, static pages) is handed to the
+Flask app in a worker thread, with its response buffered.
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.parse import parse_qsl
+
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from config import BASE_DIR, ASYNC_PREDICT_THREADS, ASYNC_MAX_PENDING, METRICS_ENABLED
+from metrics import metrics, StageTimer, NullTimer, HTTP_SECONDS, STAGE_SECONDS
+import web_app
+from model_registry import registry
+from web_app import FORM_PAGES
+
+flask_app = web_app.app
+
+# path -> (FORM_PAGES name, Flask endpoint, offload predict() to the pool)
+PAGES = {
+    "/footfall": ("footfall", "footfall_page", False),  # a table lookup: cheaper than a thread hop
+    "/delivery": ("delivery", "delivery_page", True),
+    "/clv": ("clv", "clv_page", True),
+}
+
+
+class Busy(Exception):
+    pass
+
+
+class FormError(ValueError):
+    """A form field failed to parse; the message is shown on the page."""
+
+
+class PredictPool:
+    """Thread pool that refuses work instead of queueing past max_pending."""
+
+    def __init__(self, threads, max_pending):
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="predict")
+        self.threads = threads
+        self.max_pending = max_pending
+        self.pending = 0     # only touched from the event loop thread
+        self.rejected = 0
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise Busy()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+
+predict_pool = PredictPool(ASYNC_PREDICT_THREADS, ASYNC_MAX_PENDING)
+wsgi_pool = ThreadPoolExecutor(ASYNC_PREDICT_THREADS, thread_name_prefix="wsgi")
+
+
+@metrics.collector
+def _pool_samples():
+    return [
+        ("rp360_async_predict_pending", "gauge", "Predictions queued or running in the async pool.",
+         [({}, predict_pool.pending)]),
+        ("rp360_async_predict_rejected_total", "counter", "Requests refused with 503 because the pool was full.",
+         [({}, predict_pool.rejected)]),
+    ]
+
+
+# ---------------------------
+# HTTP helpers
+# ---------------------------
+async def read_body(receive):
+    chunks = []
+    more = True
+    while more:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        more = message.get("more_body", False)
+    return b"".join(chunks)
+
+
+async def respond(send, status, body, content_type="text/html; charset=utf-8", headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode()),
+                    *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+_urls = flask_app.url_map.bind("localhost")
+
+
+def render(template, endpoint, result, error=None):
+    """render_template() without a Flask request context (base.html only needs these two)."""
+    return flask_app.jinja_env.get_template(template).render(
+        result=result,
+        error=error,
+        request=SimpleNamespace(endpoint=endpoint),
+        url_for=lambda ep, **values: _urls.build(ep, values),
+    )
+
+
+# ---------------------------
+# Form pages
+# ---------------------------
+def _models_for(name, form):
+    """Registry entries a form request will touch."""
+    if name == "footfall" and (form.get("store_id") or "").strip():
+        return ["footfall_stores"]
+    return [name]
+
+
+def _score(form, parse, features, predict, timer):
+    try:
+        values = parse(form)
+    except (TypeError, ValueError) as exc:  # e.g. an unknown store_id
+        raise FormError(str(exc) if isinstance(exc, ValueError) else "Invalid or missing form field")
+    timer.mark("parse")
+    if features is not None:
+        values = features(values)
+        timer.mark("features")
+    pred = predict(values)
+    timer.mark("predict")
+    return pred
+
+
+async def form_page(scope, receive, send):
+    path, method = scope["path"], scope["method"]
+    name, endpoint, offload = PAGES[path]
+    template, parse, features, predict, to_result = FORM_PAGES[name]
+    start = time.perf_counter()
+    timer = StageTimer(STAGE_SECONDS, path) if METRICS_ENABLED else NullTimer()
+    status, body, headers = 200, None, ()
+
+    result = error = None
+    if method == "POST":
+        form = dict(parse_qsl((await read_body(receive)).decode("utf-8", "replace")))
+        # A first load (or the store check in parse) can take a while: never on the loop
+        cold = not all(registry.is_loaded(m) for m in _models_for(name, form))
+        try:
+            if offload or cold:
+                pred = await predict_pool.run(_score, form, parse, features, predict, timer)
+            else:
+                pred = _score(form, parse, features, predict, timer)
+        except FormError as exc:
+            status, error = 400, str(exc)
+        except Busy:
+            status, body, headers = 503, b"Busy, retry shortly", [(b"retry-after", b"1")]
+        else:
+            result = to_result(pred)
+
+    if body is None:
+        body = render(template, endpoint, result, error).encode()
+        timer.mark("render")
+        await respond(send, status, body)
+    else:
+        await respond(send, status, body, "text/plain; charset=utf-8", headers)
+    if METRICS_ENABLED:
+        HTTP_SECONDS.observe(time.perf_counter() - start, (path, method, str(status)))
+
+
+# ---------------------------
+# Everything else: the Flask app in a worker thread
+# ---------------------------
+def _environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope["headers"]:
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif key != "CONTENT_LENGTH":
+            key = "HTTP_" + key
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _call_flask(environ):
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = headers
+
+    chunks = flask_app(environ, start_response)
+    try:
+        body = b"".join(chunks)
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+    return response["status"], response["headers"], body
+
+
+async def flask_fallback(scope, receive, send):
+    environ = _environ(scope, await read_body(receive))
+    status, headers, body = await asyncio.get_running_loop().run_in_executor(wsgi_pool, _call_flask, environ)
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers
+                    if k.lower() != "content-length"] + [(b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                predict_pool.executor.shutdown(wait=False)
+                wsgi_pool.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+    if scope["path"] in PAGES and scope["method"] in ("GET", "POST"):
+        await form_page(scope, receive, send)
+    else:
+        await flask_fallback(scope, receive, send)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the web app asynchronously (ASGI).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="server processes")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("The async server needs uvicorn (pip install uvicorn), "
+                         "or run asgi_app:app with any other ASGI server.")
+    print(f"Serving on http://{args.host}:{args.port} "
+          f"({args.workers} worker(s), {ASYNC_PREDICT_THREADS} predict threads, "
+          f"max {ASYNC_MAX_PENDING} pending)")
+    if args.workers > 1:
+        # uvicorn imports the app in each worker itself; exec so it is not also loaded here
+        os.execv(sys.executable, [sys.executable, "-m", "uvicorn", "asgi_app:app", "--app-dir", str(BASE_DIR),
+                                  "--host", args.host, "--port", str(args.port),
+                                  "--workers", str(args.workers), "--log-level", "warning"])
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/bench_assign.py
+"""
+Rider assignment: scoring and solving time for waves of orders x riders.
+
+    python benchmarks/bench_assign.py [--waves 100x50 500x200 2000x500] [--repeat 5]
+
+Orders are sampled from the cleaned delivery data, riders get 0-35 months of
+experience, and the served delivery model (model_registry) does the scoring.
+"""
+import argparse
+import sys
+import warnings
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from datastore import read_clean
+from dispatch import ORDER_INPUTS, OBJECTIVES, assign_wave
+from model_registry import registry
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--waves", nargs="+", default=["100x50", "500x200", "2000x500"],
+                        help="orders x riders per wave")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per wave (best is reported)")
+    args = parser.parse_args()
+
+    model = registry.get("delivery")
+    base = read_clean("delivery", ORDER_INPUTS)
+    rng = np.random.default_rng(42)
+    model.predict(base.iloc[:1].assign(rider_experience_months=0).to_numpy(np.float64))  # warm-up
+
+    print(f"\n{'wave':>10} | {'objective':>9} | {'score ms':>9} | {'solve ms':>9} | {'mean ETA':>8} | {'max ETA':>7}")
+    print("-" * 68)
+    for wave in args.waves:
+        n_orders, n_riders = (int(v) for v in wave.lower().split("x"))
+        sample = base.iloc[rng.integers(0, len(base), n_orders)]
+        orders = {c: sample[c].to_numpy(np.float64) for c in ORDER_INPUTS}
+        experience = rng.integers(0, 36, n_riders)
+        for objective in OBJECTIVES:
+            runs = [assign_wave(model.predict, orders, experience, objective) for _ in range(args.repeat)]
+            score = min(r["score_seconds"] for r in runs)
+            solve = min(r["solve_seconds"] for r in runs)
+            eta = runs[0]["eta"]
+            print(f"{wave:>10} | {objective:>9} | {score * 1e3:>9.1f} | {solve * 1e3:>9.1f} | "
+                  f"{eta.mean():>8.1f} | {eta.max():>7.1f}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_forest.py
+"""
+Latency: scikit-learn RandomForest vs the array-backed CompactForest
+(mean alone, and mean + P10/P90 from the same traversal).
+
+    python benchmarks/bench_forest.py [--repeat 20]
+
+Rows are resampled (with a little noise) from the cleaned delivery data.
+"""
+import argparse
+import sys
+import time
+import warnings
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from config import CLEAN_DELIVERY, DELIVERY_MODEL, DELIVERY_FOREST
+from features import DELIVERY_FEATURES
+from forest_engine import CompactForest
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+SIZES = [1, 100, 100_000]
+
+
+def timed(fn, X, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(X)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="runs per size (best is reported)")
+    args = parser.parse_args()
+
+    rf = joblib.load(DELIVERY_MODEL)
+    if DELIVERY_FOREST.exists():
+        forest = CompactForest.load(DELIVERY_FOREST)
+    else:
+        forest = CompactForest.from_sklearn(rf)
+
+    base = pd.read_csv(CLEAN_DELIVERY)[DELIVERY_FEATURES].to_numpy(np.float64)
+    rng = np.random.default_rng(42)
+    X_all = base[rng.integers(0, len(base), max(SIZES))]
+    X_all[:, [0, 2]] *= rng.uniform(0.9, 1.1, size=(len(X_all), 2))
+
+    print(f"\nForest: {forest.n_trees} trees, {forest.n_nodes:,} nodes, "
+          f"max depth {forest.max_depth}, {forest.nbytes / 1e6:.1f} MB of arrays\n")
+    print(f"{'rows':>8} | {'sklearn ms':>11} | {'compact ms':>11} | {'speed-up':>8} | "
+          f"{'+P10/P90 ms':>11} | max |diff|")
+    print("-" * 76)
+    for n in SIZES:
+        X = X_all[:n]
+        repeat = args.repeat if n < 10_000 else max(1, args.repeat // 10)
+        t_sk, p_sk = timed(rf.predict, X, repeat)
+        t_cf, p_cf = timed(forest.predict, X, repeat)
+        t_q, _ = timed(lambda X: forest.predict_quantiles(X, (0.1, 0.9)), X, repeat)
+        diff = np.abs(p_sk - p_cf).max()
+        print(f"{n:>8,} | {t_sk * 1000:>11.2f} | {t_cf * 1000:>11.2f} | {t_sk / t_cf:>7.1f}x | "
+              f"{t_q * 1000:>11.2f} | {diff:.2e}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/bench_storage.py
+"""
+Load time and memory of the cleaned-data formats (csv / parquet / feather / npy).
+
+    python benchmarks/bench_storage.py [--rows 1200000] [--dataset delivery]
+
+The cleaned dataset is resampled (with noise on the float columns) to --rows,
+written once per format, and every read runs in a fresh process so the peak
+RSS it reports belongs to that read alone.
+"""
+import argparse
+import importlib.util
+import multiprocessing as mp
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from datastore import FORMATS, SCHEMAS, read_clean, write_clean
+
+# Columns each consumer actually reads (train_models.py / eda.py)
+PROJECTIONS = {
+    "footfall": ["day_of_week", "is_weekend", "is_holiday", "promo_active", "month", "footfall"],
+    "delivery": ["distance_km", "traffic_level", "delivery_time_min"],
+    "clv": ["tenure_months", "orders_per_month", "avg_order_value", "recency_days",
+            "discount_usage_rate", "return_rate", "monetary_value", "clv_next_12m"],
+}
+
+
+def make_frame(name, rows, seed=42):
+    base = read_clean(name, fmt="csv")
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), rows)].reset_index(drop=True)
+    for col, dtype in SCHEMAS[name].items():
+        if dtype.startswith("float"):
+            df[col] = (df[col].to_numpy(np.float64) * rng.uniform(0.95, 1.05, rows)).round(2)
+    return df
+
+
+def _peak_rss_bytes():
+    # VmHWM belongs to this address space; ru_maxrss would carry over the
+    # parent's peak across exec()
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def _measure(name, fmt, path, columns, queue):
+    before = _peak_rss_bytes()
+    start = time.perf_counter()
+    df = read_clean(name, columns, fmt=fmt, path=path)
+    # Touch every value so lazily mapped columns are really read
+    total = sum(float(np.asarray(df[c].to_numpy(), dtype=np.float64).sum())
+                for c in df.columns if df[c].dtype.kind in "biuf")
+    elapsed = time.perf_counter() - start
+    peak = _peak_rss_bytes() - before
+    queue.put((elapsed, peak, int(df.memory_usage(deep=True).sum()), total))
+
+
+def measure(name, fmt, path, columns):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(name, fmt, path, columns, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_200_000)
+    parser.add_argument("--dataset", choices=list(SCHEMAS), default="delivery")
+    args = parser.parse_args()
+
+    formats = list(FORMATS)
+    if importlib.util.find_spec("pyarrow") is None:
+        formats = [f for f in formats if f not in ("parquet", "feather")]
+        print("pyarrow not installed: skipping parquet and feather")
+
+    print(f"\nBuilding {args.rows:,} {args.dataset} rows...")
+    df = make_frame(args.dataset, args.rows)
+    tmp = Path(tempfile.mkdtemp(prefix="bench_storage_"))
+    try:
+        paths = {}
+        for fmt in formats:
+            suffix = {"csv": ".csv", "npy": ""}.get(fmt, f".{fmt}")
+            paths[fmt] = tmp / f"{args.dataset}{suffix}"
+            write_clean(args.dataset, df, fmt=fmt, path=paths[fmt])
+        del df
+
+        cols = PROJECTIONS[args.dataset]
+        print(f"\n{'format':<8} | {'on disk MB':>10} | {'all cols s':>10} | {'peak MB':>8} | "
+              f"{'{} cols s'.format(len(cols)):>10} | {'peak MB':>8} | {'proj MB':>8}")
+        print("-" * 80)
+        for fmt in formats:
+            path = paths[fmt]
+            size = sum(p.stat().st_size for p in path.rglob("*")) if path.is_dir() else path.stat().st_size
+            t_all, peak_all, _, _ = measure(args.dataset, fmt, path, None)
+            t_proj, peak_proj, frame, _ = measure(args.dataset, fmt, path, cols)
+            print(f"{fmt:<8} | {size / 1e6:>10.1f} | {t_all:>10.3f} | {peak_all / 1e6:>8.1f} | "
+                  f"{t_proj:>10.3f} | {peak_proj / 1e6:>8.1f} | {frame / 1e6:>8.1f}")
+        print()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
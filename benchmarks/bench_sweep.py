@@ -0,0 +1,74 @@
+# benchmarks/bench_sweep.py
+"""
+CLV what-if sweeps: rows in the customers x grid block, rows actually scored, and time.
+
+    python benchmarks/bench_sweep.py [--customers 1 100 1000] [--check 20]
+
+Customers are sampled from the cleaned CLV data and the served CLV model
+(model_registry) does the scoring. --check compares that many customers of
+each sweep against model.predict() on the full, un-deduplicated block.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from clv_sweep import parse_grid, sweep
+from datastore import read_clean
+from features import CLV_INPUTS, clv_matrix
+from model_registry import registry
+
+GRIDS = {
+    "discount x return": {"discount_usage_rate": {"start": 0, "stop": 0.7, "num": 100},
+                          "return_rate": {"start": 0, "stop": 0.4, "num": 100}},
+    "orders x aov": {"orders_per_month": {"start": 0.5, "stop": 8, "num": 100},
+                     "avg_order_value": {"start": 200, "stop": 4000, "num": 100}},
+    "orders": {"orders_per_month": {"start": 0.5, "stop": 8, "num": 100}},
+}
+
+
+def brute_force(model, customers, names, axes):
+    mesh = [m.reshape(-1) for m in np.meshgrid(*axes, indexing="ij")]
+    n = len(customers[CLV_INPUTS[0]])
+    block = {c: np.repeat(customers[c], len(mesh[0])) for c in CLV_INPUTS}
+    for name, values in zip(names, mesh):
+        block[name] = np.tile(values, n)
+    return model.predict(clv_matrix(block)).reshape((n,) + tuple(len(a) for a in axes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--customers", nargs="+", type=int, default=[1, 100, 1000], help="cohort sizes")
+    parser.add_argument("--check", type=int, default=20, help="customers checked against the full block (0: skip)")
+    args = parser.parse_args()
+
+    model = registry.get("clv")
+    base = read_clean("clv", CLV_INPUTS)
+    rng = np.random.default_rng(42)
+
+    print(f"\n{'grid':>18} | {'customers':>9} | {'rows':>11} | {'scored':>11} | {'seconds':>8} | {'rows/s':>10}")
+    print("-" * 84)
+    for label, grid in GRIDS.items():
+        names, axes = parse_grid(grid)
+        for n in args.customers:
+            sample = base.iloc[rng.integers(0, len(base), n)]
+            customers = {c: sample[c].to_numpy(np.float64) for c in CLV_INPUTS}
+            start = time.perf_counter()
+            result = sweep(model, customers, names, axes)
+            seconds = time.perf_counter() - start
+            print(f"{label:>18} | {n:>9,} | {result['rows_total']:>11,} | {result['rows_scored']:>11,} | "
+                  f"{seconds:>8.2f} | {result['rows_total'] / seconds:>10,.0f}")
+            if args.check:
+                head = {c: v[:args.check] for c, v in customers.items()}
+                diff = np.abs(brute_force(model, head, names, axes) - result["clv"][:args.check]).max()
+                if diff > 1e-3:
+                    print(f"   ⚠ differs from the full block by up to {diff:.4f}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+# benchmarks/loadtest.py
+"""
+HTTP load generator for the /footfall, /delivery and /clv form routes.
+
+    python benchmarks/loadtest.py --rate 200 --duration 30
+    python benchmarks/loadtest.py --concurrency 16 --env RP360_COALESCE=1
+    python benchmarks/loadtest.py --url http://127.0.0.1:5000 --rate 50
+
+Without --url a web_app server is started on a free local port (threaded
+Werkzeug server, or asgi_app.py with --asgi, plus any --env settings) and
+stopped afterwards, so two serving configurations can be compared on the
+same machine.
+
+Form payloads are sampled from the cleaned datasets. Two modes:
+
+    --rate R          open loop: requests are scheduled as a Poisson process
+                      of R/s, and latency is measured from the *scheduled*
+                      send time, so a stalled server shows up as latency
+                      instead of silently lowering the offered load.
+    --concurrency N   closed loop: N clients send back to back.
+
+The report has throughput, latency percentiles and errors per route; the
+full numbers go to a JSON file. The load generator shares the CPU with the
+server, so on small machines keep an eye on the achieved vs target rate.
+"""
+import argparse
+import http.client
+import json
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from config import BASE_DIR, BENCHMARKS_DIR
+from datastore import read_clean
+from features import FOOTFALL_INPUTS, DELIVERY_INPUTS, CLV_INPUTS
+
+# route -> (dataset, form fields)
+ROUTES = {
+    "/footfall": ("footfall", FOOTFALL_INPUTS),
+    "/delivery": ("delivery", DELIVERY_INPUTS),
+    "/clv": ("clv", CLV_INPUTS),
+}
+INT_FIELDS = {"day_of_week", "month", "is_holiday", "promo_active", "num_items", "time_of_day_bucket",
+              "traffic_level", "rider_experience_months", "tenure_months", "recency_days"}
+FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+
+def sample_payloads(routes, n, seed):
+    """n urlencoded form bodies per route, drawn from the cleaned data."""
+    rng = np.random.default_rng(seed)
+    payloads = {}
+    for route in routes:
+        dataset, fields = ROUTES[route]
+        df = read_clean(dataset, fields)
+        rows = df.iloc[rng.integers(0, len(df), n)]
+        bodies = []
+        for values in rows.itertuples(index=False):
+            form = {f: int(v) if f in INT_FIELDS else round(float(v), 4) for f, v in zip(fields, values)}
+            bodies.append(urlencode(form).encode())
+        payloads[route] = bodies
+    return payloads
+
+
+# ---------------------------
+# Local server
+# ---------------------------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(env_overrides, asgi=False, timeout=60):
+    port = _free_port()
+    env = dict(os.environ, **env_overrides)
+    if asgi:
+        cmd = [sys.executable, "asgi_app.py", "--port", str(port)]
+    else:
+        cmd = [sys.executable, "-c", f"from web_app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("web_app exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            conn.close()
+            return proc, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"web_app did not answer within {timeout}s")
+
+
+# ---------------------------
+# Clients
+# ---------------------------
+class Client:
+    """One keep-alive connection; reconnects after errors or Connection: close."""
+
+    def __init__(self, host, port, timeout):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.conn = None
+
+    def post(self, route, body):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.conn.request("POST", route, body, FORM_HEADERS)
+            resp = self.conn.getresponse()
+            resp.read()
+            if resp.will_close:
+                self.close()
+            return resp.status, None
+        except (OSError, http.client.HTTPException) as exc:
+            self.close()
+            return None, type(exc).__name__
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class Recorder:
+    def __init__(self, routes):
+        self.lock = threading.Lock()
+        self.recording = False  # closed loop: set once the warm-up is over
+        self.latency = {r: [] for r in routes}
+        self.errors = {r: {} for r in routes}
+
+    def add(self, route, seconds, status, error):
+        with self.lock:
+            if error is None and status == 200:
+                self.latency[route].append(seconds)
+            else:
+                kind = error or f"HTTP {status}"
+                self.errors[route][kind] = self.errors[route].get(kind, 0) + 1
+
+
+def _pick(routes, payloads, rng):
+    route = routes[rng.integers(len(routes))]
+    bodies = payloads[route]
+    return route, bodies[rng.integers(len(bodies))]
+
+
+def warm_up(target, routes, payloads, timeout):
+    """One request per route first, so lazy model loading is not measured."""
+    parts = urlsplit(target)
+    client = Client(parts.hostname, parts.port, timeout)
+    for route in routes:
+        status, error = client.post(route, payloads[route][0])
+        if error or status != 200:
+            print(f"   ⚠ warm-up {route}: {error or f'HTTP {status}'}")
+    client.close()
+
+
+def run_open_loop(target, routes, payloads, rate, duration, warmup, connections, timeout, seed):
+    """Poisson arrivals at `rate`/s handed to a pool of `connections` client threads."""
+    parts = urlsplit(target)
+    recorder = Recorder(routes)
+    tasks = queue.Queue()
+
+    def worker():
+        client = Client(parts.hostname, parts.port, timeout)
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            scheduled, route, body, measured = task
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            status, error = client.post(route, body)
+            if measured:
+                recorder.add(route, time.perf_counter() - scheduled, status, error)
+        client.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(connections)]
+    for t in threads:
+        t.start()
+
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    next_at = start
+    record_from = start + warmup
+    end = record_from + duration
+    sent = 0
+    while next_at < end:
+        route, body = _pick(routes, payloads, rng)
+        # Scheduling runs slightly ahead so workers can sleep until the exact send time
+        ahead = next_at - time.perf_counter() - 0.005
+        if ahead > 0:
+            time.sleep(ahead)
+        measured = next_at >= record_from
+        tasks.put((next_at, route, body, measured))
+        sent += measured
+        next_at += rng.exponential(1.0 / rate)
+    for _ in threads:
+        tasks.put(None)
+    for t in threads:
+        t.join()
+    return recorder, sent, time.perf_counter() - record_from
+
+
+def run_closed_loop(target, routes, payloads, concurrency, duration, warmup, timeout, seed):
+    parts = urlsplit(target)
+    recorder = Recorder(routes)
+    stop_at = time.perf_counter() + warmup + duration
+
+    def worker(i):
+        rng = np.random.default_rng([seed, i])
+        client = Client(parts.hostname, parts.port, timeout)
+        while True:
+            start = time.perf_counter()
+            if start >= stop_at:
+                break
+            measured = recorder.recording
+            route, body = _pick(routes, payloads, rng)
+            status, error = client.post(route, body)
+            if measured:
+                recorder.add(route, time.perf_counter() - start, status, error)
+        client.close()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    time.sleep(warmup)
+    recorder.recording = True
+    record_start = time.perf_counter()
+    for t in threads:
+        t.join()
+    return recorder, None, time.perf_counter() - record_start
+
+
+# ---------------------------
+# Report
+# ---------------------------
+def summarize(recorder, seconds):
+    out = {}
+    for route, samples in list(recorder.latency.items()) + [("all", None)]:
+        if route == "all":
+            lat = np.concatenate([np.asarray(v) for v in recorder.latency.values()])
+            errors = {}
+            for errs in recorder.errors.values():
+                for kind, n in errs.items():
+                    errors[kind] = errors.get(kind, 0) + n
+        else:
+            lat = np.asarray(samples)
+            errors = recorder.errors[route]
+        n_err = sum(errors.values())
+        total = len(lat) + n_err
+        ms = lat * 1000.0
+        out[route] = {
+            "requests": total,
+            "ok": len(lat),
+            "errors": errors,
+            "error_rate": n_err / total if total else 0.0,
+            "throughput_rps": len(lat) / seconds if seconds else 0.0,
+            "latency_ms": {
+                "mean": float(ms.mean()) if ms.size else None,
+                **{f"p{q}": float(np.percentile(ms, q)) if ms.size else None for q in (50, 90, 99)},
+                "max": float(ms.max()) if ms.size else None,
+            },
+        }
+    return out
+
+
+def scrape_rss(target):
+    """Server resident memory from /metrics, if it is exposed."""
+    parts = urlsplit(target)
+    try:
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=5)
+        conn.request("GET", "/metrics")
+        text = conn.getresponse().read().decode()
+        conn.close()
+    except OSError:
+        return None
+    for line in text.splitlines():
+        if line.startswith("process_resident_memory_bytes "):
+            return int(float(line.split()[1]))
+    return None
+
+
+def print_report(summary):
+    print(f"\n{'route':<10} | {'requests':>9} | {'rps':>8} | {'errors':>7} | "
+          f"{'p50 ms':>8} | {'p90 ms':>8} | {'p99 ms':>8} | {'max ms':>8}")
+    print("-" * 88)
+    for route, s in summary.items():
+        lat = s["latency_ms"]
+        cells = [f"{lat[k]:>8.1f}" if lat[k] is not None else f"{'-':>8}" for k in ("p50", "p90", "p99", "max")]
+        print(f"{route:<10} | {s['requests']:>9,} | {s['throughput_rps']:>8.1f} | {s['error_rate']:>7.1%} | "
+              + " | ".join(cells))
+    for route, s in summary.items():
+        if s["errors"] and route != "all":
+            print(f"   {route}: " + ", ".join(f"{kind} × {n}" for kind, n in s["errors"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the prediction form routes under load.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--rate", type=float, help="open loop: target requests per second")
+    mode.add_argument("--concurrency", type=int, help="closed loop: clients sending back to back")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds (default 20)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds first (default 2)")
+    parser.add_argument("--routes", nargs="+", choices=list(ROUTES), default=list(ROUTES))
+    parser.add_argument("--connections", type=int, default=64,
+                        help="open loop: client threads, i.e. max requests in flight (default 64)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="per-request timeout in seconds")
+    parser.add_argument("--payloads", type=int, default=2_000, help="distinct form bodies per route")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="test a running server instead of starting one")
+    parser.add_argument("--asgi", action="store_true", help="start asgi_app.py (uvicorn) instead of the Flask server")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="environment for the started server, e.g. RP360_COALESCE=1 (repeatable)")
+    parser.add_argument("--out", type=Path, help="JSON report (default outputs/benchmarks/loadtest_<time>.json)")
+    args = parser.parse_args()
+
+    env = dict(item.split("=", 1) for item in args.env)
+    payloads = sample_payloads(args.routes, args.payloads, args.seed)
+
+    proc = None
+    target = args.url
+    if target is None:
+        print(f"Starting {'asgi_app' if args.asgi else 'web_app'}"
+              f"{' with ' + ' '.join(args.env) if args.env else ''}...")
+        proc, target = start_server(env, args.asgi)
+    mode = f"open loop, {args.rate:g} req/s" if args.rate else f"closed loop, {args.concurrency} clients"
+    print(f"\n=== LOAD TEST: {target} ({mode}, {args.duration:g}s + {args.warmup:g}s warm-up) ===")
+
+    try:
+        warm_up(target, args.routes, payloads, args.timeout)
+        if args.rate:
+            recorder, sent, seconds = run_open_loop(target, args.routes, payloads, args.rate, args.duration,
+                                                    args.warmup, args.connections, args.timeout, args.seed)
+        else:
+            recorder, sent, seconds = run_closed_loop(target, args.routes, payloads, args.concurrency,
+                                                      args.duration, args.warmup, args.timeout, args.seed)
+        server_rss = scrape_rss(target)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    summary = summarize(recorder, seconds)
+    print_report(summary)
+    if args.rate:
+        print(f"\nTarget {args.rate:g} req/s, offered {sent / seconds:.1f} req/s, "
+              f"completed {summary['all']['throughput_rps']:.1f} req/s")
+    if server_rss:
+        print(f"Server RSS after the run: {server_rss / 1e6:.0f} MB")
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "target": target,
+        "config": {"rate": args.rate, "concurrency": args.concurrency, "duration": args.duration,
+                   "warmup": args.warmup, "routes": args.routes, "connections": args.connections,
+                   "asgi": args.asgi, "env": env, "seed": args.seed},
+        "seconds": seconds,
+        "server_rss_bytes": server_rss,
+        "routes": summary,
+    }
+    out = args.out or BENCHMARKS_DIR / f"loadtest_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"\n✔ Report → {out}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# benchmarks/suite.py
+"""
+Benchmark suite: cleaning throughput, training time and inference latency.
+
+    python benchmarks/suite.py [--rows 10000 1000000] [--compare outputs/benchmarks/baseline.json]
+
+For every size, synthetic raw files (benchmarks/synth.py, same seed = same
+data) are cleaned with prepare_data.py and each model is fitted on the
+cleaned rows (at most --train-rows of them) with the estimator
+train_models.py uses. The served models, as web_app.py loads them through
+the registry, are then timed on single rows and on batches of --batch rows.
+
+Results are written as JSON; with --compare, every metric present in both
+files is checked and the run exits with status 1 if any got worse by more
+than --threshold (relative).
+
+Timings are the best of --repeat runs (more for sub-second ones, to keep
+the noise below the threshold); training and cleaning above 1M rows run once.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from functools import partial
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+import numpy as np
+
+from config import BASE_DIR, BENCHMARKS_DIR, BENCH_THRESHOLD
+from datastore import read_clean
+from features import (
+    FOOTFALL_FEATURES, DELIVERY_FEATURES, CLV_FEATURES,
+    FOOTFALL_INPUTS, DELIVERY_INPUTS, CLV_INPUTS,
+    footfall_matrix, delivery_matrix, clv_matrix,
+)
+from synth import DATASETS, write_raw
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+TARGETS = {"footfall": "footfall", "delivery": "delivery_time_min", "clv": "clv_next_12m"}
+FEATURES = {"footfall": FOOTFALL_FEATURES, "delivery": DELIVERY_FEATURES, "clv": CLV_FEATURES}
+INPUTS = {
+    "footfall": (FOOTFALL_INPUTS, footfall_matrix),
+    "delivery": (DELIVERY_INPUTS, delivery_matrix),
+    "clv": (CLV_INPUTS, clv_matrix),
+}
+SINGLE_RUNS = 200
+TRAIN_ROWS = 200_000  # the 200-tree forest takes minutes per 100k rows on one core
+ONE_SHOT_ROWS = 1_000_000
+MIN_TIMING_SECONDS = 0.25  # fast timings repeat until this much time has passed
+
+
+def best_of(fn, repeat):
+    best, spent, runs = float("inf"), 0.0, 0
+    while runs < repeat or (spent < MIN_TIMING_SECONDS and runs < 10_000):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best, spent, runs = min(best, elapsed), spent + elapsed, runs + 1
+    return best
+
+
+def metric(value, unit, better, gate=True):
+    """gate=False: reported and compared, but too noisy to fail a run."""
+    return {"value": float(value), "unit": unit, "better": better, "gate": gate}
+
+
+# ---------------------------
+# Benchmarks
+# ---------------------------
+def bench_clean(name, rows, raw, clean, fmt, repeat):
+    import prepare_data
+    from prepare_data import DEFAULT_CHUNKSIZE
+
+    prepare = getattr(prepare_data, f"prepare_{name}")
+    chunksize = DEFAULT_CHUNKSIZE if rows > DEFAULT_CHUNKSIZE else None
+    seconds = best_of(lambda: prepare(raw, dst=clean, chunksize=chunksize, fmt=fmt),
+                      1 if rows > ONE_SHOT_ROWS else repeat)
+    return {
+        f"clean.{name}@{rows}.seconds": metric(seconds, "s", "lower"),
+        f"clean.{name}@{rows}.rows_per_s": metric(rows / seconds, "rows/s", "higher"),
+    }
+
+
+def bench_train(name, rows, clean, fmt, repeat, n_jobs, max_rows):
+    from train_models import make_estimator
+
+    df = read_clean(name, FEATURES[name] + [TARGETS[name]], fmt=fmt, path=clean)
+    if max_rows:
+        df = df.iloc[:max_rows]
+    X, y = df[FEATURES[name]], df[TARGETS[name]]
+    seconds = best_of(lambda: make_estimator(name, n_jobs).fit(X, y), 1 if rows > ONE_SHOT_ROWS else repeat)
+    return {
+        f"train.{name}@{rows}.seconds": metric(seconds, "s", "lower"),
+        f"train.{name}@{rows}.rows_per_s": metric(len(X) / seconds, "rows/s", "higher"),
+    }
+
+
+def bench_infer(name, clean, fmt, batches, repeat):
+    """Served-model latency; independent of the dataset size, so it runs once per model."""
+    from model_registry import registry
+
+    model = registry.get(name)
+    required, build = INPUTS[name]
+    data = read_clean(name, required, fmt=fmt, path=clean)
+    X = build({c: data[c].to_numpy(np.float64) for c in required})
+    model.predict(X[:1])  # warm-up
+
+    single = np.empty(SINGLE_RUNS)
+    for i in range(SINGLE_RUNS):
+        row = X[i % len(X):i % len(X) + 1]
+        start = time.perf_counter()
+        model.predict(row)
+        single[i] = time.perf_counter() - start
+    out = {
+        f"infer.{name}.single_p50_us": metric(np.percentile(single, 50) * 1e6, "us", "lower"),
+        f"infer.{name}.single_p99_us": metric(np.percentile(single, 99) * 1e6, "us", "lower", gate=False),
+    }
+    for size in batches:
+        X_batch = X[np.arange(size) % len(X)]
+        seconds = best_of(partial(model.predict, X_batch), repeat)
+        out[f"infer.{name}.batch{size}_ms"] = metric(seconds * 1e3, "ms", "lower")
+        out[f"infer.{name}.batch{size}_rows_per_s"] = metric(size / seconds, "rows/s", "higher")
+    return out
+
+
+def run(sizes, models, fmt, repeat, batches, n_jobs, train_rows, seed, keep):
+    results = {}
+    for i, rows in enumerate(sizes):
+        work = Path(tempfile.mkdtemp(prefix=f"rp360_bench_{rows}_"))
+        try:
+            for name in models:
+                raw = work / f"{name}_data.csv"
+                start = time.perf_counter()
+                write_raw(name, rows, raw, seed)
+                print(f"\n>> {name} @ {rows:,} rows (generated in {time.perf_counter() - start:.1f}s)")
+
+                clean = work / (f"clean_{name}.{fmt}" if fmt != "npy" else f"clean_{name}")
+                steps = [
+                    partial(bench_clean, name, rows, raw, clean, fmt, repeat),
+                    partial(bench_train, name, rows, clean, fmt, repeat, n_jobs, train_rows),
+                ]
+                if i == 0:
+                    steps.append(partial(bench_infer, name, clean, fmt, batches, repeat))
+                for step in steps:
+                    out = step()
+                    for key, m in out.items():
+                        print(f"   {key:<42} {m['value']:>14,.2f} {m['unit']}")
+                    results.update(out)
+        finally:
+            if keep:
+                print(f"   (kept {work})")
+            else:
+                shutil.rmtree(work, ignore_errors=True)
+    return results
+
+
+# ---------------------------
+# Comparing runs
+# ---------------------------
+def compare(current, baseline, threshold):
+    """Print old vs new for shared metrics; return the names that regressed."""
+    regressed = []
+    shared = [k for k in current if k in baseline]
+    print(f"\n{'metric':<44} | {'baseline':>14} | {'current':>14} | {'change':>8}")
+    print("-" * 90)
+    for key in shared:
+        old, new = baseline[key]["value"], current[key]["value"]
+        change = (new - old) / old if old else 0.0
+        worse = change > threshold if current[key]["better"] == "lower" else change < -threshold
+        flag = ""
+        if worse and current[key].get("gate", True):
+            regressed.append(key)
+            flag = "  ✖"
+        elif worse:
+            flag = "  (not gated)"
+        print(f"{key:<44} | {old:>14,.2f} | {new:>14,.2f} | {change:>+7.1%}{flag}")
+    missing = len(current) - len(shared)
+    if missing:
+        print(f"({missing} metric(s) not in the baseline)")
+    return regressed
+
+
+def environment():
+    import pandas, sklearn, xgboost
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+        "xgboost": xgboost.__version__,
+        "cpu_count": os.cpu_count(),
+        "machine": platform.machine(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cleaning, training and inference on synthetic data.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000], help="dataset size(s), 10k .. 10M")
+    parser.add_argument("--models", nargs="+", choices=DATASETS, default=DATASETS)
+    parser.add_argument("--format", default="csv", help="clean data format (see datastore.py)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per timing (best is kept)")
+    parser.add_argument("--batch", type=int, nargs="+", default=[100, 10_000],
+                        help="batch size(s) for the inference timings (default 100 10000)")
+    parser.add_argument("--train-rows", type=int, default=TRAIN_ROWS,
+                        help=f"fit on at most this many cleaned rows, 0 = all (default {TRAIN_ROWS:,})")
+    parser.add_argument("--jobs", type=int, default=None, help="n_jobs for training (default: library default)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, help="result file (default outputs/benchmarks/<time>.json)")
+    parser.add_argument("--compare", type=Path, help="earlier result file to check against")
+    parser.add_argument("--threshold", type=float, default=BENCH_THRESHOLD,
+                        help=f"allowed relative slowdown per metric (default {BENCH_THRESHOLD:.0%})")
+    parser.add_argument("--keep-data", action="store_true", help="keep the generated files")
+    args = parser.parse_args()
+
+    print("\n=== BENCHMARK SUITE ===")
+    start = time.perf_counter()
+    results = run(args.rows, args.models, args.format, args.repeat, args.batch, args.jobs, args.train_rows,
+                  args.seed, args.keep_data)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seconds": time.perf_counter() - start,
+        "config": {"rows": args.rows, "models": args.models, "format": args.format, "repeat": args.repeat,
+                   "batch": args.batch, "train_rows": args.train_rows, "jobs": args.jobs, "seed": args.seed},
+        "environment": environment(),
+        "metrics": results,
+    }
+
+    out = args.out or BENCHMARKS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"\n✔ {len(results)} metrics in {report['seconds']:.1f}s → {out}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressed = compare(results, baseline["metrics"], args.threshold)
+        if regressed:
+            print(f"\n✖ {len(regressed)} metric(s) regressed by more than {args.threshold:.0%}\n")
+            sys.exit(1)
+        print(f"\n✔ No regression beyond {args.threshold:.0%}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# benchmarks/synth.py
+"""
+Deterministic synthetic raw data in the footfall_data.csv / delivery_data.csv /
+clv_data.csv layouts, at any size.
+
+    python benchmarks/synth.py --rows 1000000 --out /tmp/synth [--seed 0]
+
+Rows are produced in fixed blocks of BLOCK_ROWS, each with its own seeded
+generator, so the same (dataset, rows, seed) always gives byte-identical
+files and a block never depends on how the file is written. Targets follow
+the same drivers as the real data (weekends/holidays/promos, distance and
+traffic, order frequency and basket value), and a small share of rows carries
+the gaps and impossible values prepare_data.py is there to clean up.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DATASETS = ["footfall", "delivery", "clv"]
+BLOCK_ROWS = 100_000
+FOOTFALL_START = np.datetime64("2015-01-01")
+FOOTFALL_DAYS = 3_652  # larger files put several stores (store_id) on each day
+
+
+def _blank(rng, values, share):
+    """Float copy of values with `share` of the entries set to NaN."""
+    values = values.astype(np.float64)
+    values[rng.random(len(values)) < share] = np.nan
+    return values
+
+
+def _footfall_block(rng, start, n, total):
+    per_day = -(-total // FOOTFALL_DAYS)
+    pos = np.arange(start, start + n)
+    date = FOOTFALL_START + (pos // per_day).astype("timedelta64[D]")
+    store = pos % per_day
+    size = 0.6 + 0.8 * ((store * 2654435761) % 1000) / 1000  # fixed per-store scale
+    weekday = (date.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    month = date.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    holiday = (rng.random(n) < 0.05).astype(np.int64)
+    promo = (rng.random(n) < 0.27).astype(np.int64)
+    footfall = (size * (205 + 45 * (weekday >= 5) + 60 * holiday + 35 * promo
+                        + 12 * np.sin((month - 3) / 12 * 2 * np.pi)) + rng.normal(0, 25, n)).round()
+    glitch = rng.random(n) < 0.003  # sensor glitches
+    footfall[glitch] = rng.integers(0, 30, glitch.sum())
+    return pd.DataFrame({
+        "date": date.astype(str),
+        "store_id": np.char.add("S", np.char.zfill(store.astype(str), 4)),
+        "is_holiday": pd.array(_blank(rng, holiday, 0.005), dtype="Int8"),
+        "promo_active": pd.array(_blank(rng, promo, 0.005), dtype="Int8"),
+        "footfall": pd.array(np.maximum(footfall, 0), dtype="Int32"),
+    })
+
+
+def _delivery_block(rng, start, n, total):
+    distance = rng.uniform(0.5, 15, n).round(2)
+    items = rng.integers(1, 10, n)
+    order_value = (items * rng.uniform(60, 300, n)).round(2)
+    bucket = rng.integers(0, 3, n)
+    traffic = rng.integers(1, 4, n)
+    experience = rng.integers(0, 36, n)
+    minutes = (8 + 2.6 * distance + 0.8 * items + 5 * traffic + 3 * (bucket == 2)
+               - 0.15 * experience + rng.normal(0, 4, n)).round(1)
+    minutes[rng.random(n) < 0.003] = 1.0
+    distance[rng.random(n) < 0.002] = 0.0
+    return pd.DataFrame({
+        "distance_km": _blank(rng, distance, 0.01),
+        "num_items": items,
+        "order_value": _blank(rng, order_value, 0.01),
+        "time_of_day_bucket": bucket,
+        "traffic_level": traffic,
+        "rider_experience_months": experience,
+        "delivery_time_min": _blank(rng, np.maximum(minutes, 1.0), 0.01),
+    })
+
+
+def _clv_block(rng, start, n, total):
+    tenure = rng.integers(1, 60, n)
+    orders = rng.uniform(0.5, 6, n).round(2)
+    aov = rng.uniform(200, 3000, n).round(2)
+    recency = rng.integers(0, 365, n)
+    discount = rng.uniform(0, 0.7, n).round(2)
+    returns = rng.uniform(0, 0.4, n).round(2)
+    clv = (12 * orders * aov * (1 - returns) * (1 - 0.4 * discount) * (0.7 + tenure / 200)
+           * np.exp(-recency / 900) * rng.lognormal(0, 0.15, n)).round(2)
+    aov[rng.random(n) < 0.002] = 0.0
+    width = len(str(max(total - 1, 0)))
+    return pd.DataFrame({
+        "customer_id": np.char.add("CUST_", np.char.zfill(np.arange(start, start + n).astype(str), width)),
+        "tenure_months": tenure,
+        "orders_per_month": orders,
+        "avg_order_value": aov,
+        "recency_days": recency,
+        "discount_usage_rate": _blank(rng, discount, 0.01),
+        "return_rate": _blank(rng, returns, 0.01),
+        "clv_next_12m": clv,
+    })
+
+
+_BUILDERS = {"footfall": _footfall_block, "delivery": _delivery_block, "clv": _clv_block}
+
+
+def generate(name, rows, seed=0):
+    """Yield the raw frame in blocks of BLOCK_ROWS rows."""
+    for block, start in enumerate(range(0, rows, BLOCK_ROWS)):
+        rng = np.random.default_rng([seed, DATASETS.index(name), block])
+        yield _BUILDERS[name](rng, start, min(BLOCK_ROWS, rows - start), rows)
+
+
+def write_raw(name, rows, path, seed=0):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="") as f:
+        for i, block in enumerate(generate(name, rows, seed)):
+            block.to_csv(f, index=False, header=i == 0)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic raw CSVs with the project's schemas.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--out", type=Path, required=True, help="folder for <name>_data.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", choices=DATASETS, action="append", help="dataset(s) to write (default all)")
+    args = parser.parse_args()
+
+    for name in args.only or DATASETS:
+        path = write_raw(name, args.rows, args.out / f"{name}_data.csv", args.seed)
+        print(f"✔ {args.rows:,} {name} rows → {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# clv_sweep.py
+"""
+What-if sweeps of predicted 12-month CLV over one or two customer inputs.
+
+Every customer of a cohort is crossed with a grid of values for the swept
+inputs; loyalty_index / monetary_value are re-derived for the whole block with
+features.clv_matrix() and the block is scored in chunks of at most
+SWEEP_CHUNK_ROWS rows (a single model call for most sweeps):
+
+    customers x grid[0] (x grid[1])  ->  CLV array of that shape
+
+XGBoost trees only look at which side of each split threshold a value falls
+on. Grid cells that land in the same threshold bins of every column the grid
+changes therefore get the same prediction for any customer, and customers
+that agree on all other columns get the same row of predictions. Only one
+representative of each is scored and the result is broadcast back (the
+same idea as eta_matrix() in dispatch.py). This is exact, and skipped when a
+derived column mixes a swept input with a per-customer one (sweeping
+orders_per_month alone changes monetary_value differently per customer).
+"""
+import time
+
+import numpy as np
+
+from config import SWEEP_CHUNK_ROWS, SWEEP_MAX_ROWS
+from features import CLV_FEATURES, CLV_INPUTS, clv_matrix, validate_block
+
+# derived column -> the inputs it is computed from (see features.clv_matrix)
+DERIVED = {
+    "loyalty_index": ("discount_usage_rate", "return_rate"),
+    "monetary_value": ("orders_per_month", "avg_order_value"),
+}
+
+
+def split_thresholds(model):
+    """Sorted float32 split thresholds per CLV_FEATURES column of an XGBoost model."""
+    # Kept on the model itself, so a reloaded model drops the old thresholds with it
+    cached = getattr(model, "_split_thresholds", None)
+    if cached is None:
+        cached = model._split_thresholds = _read_thresholds(model)
+    return cached
+
+
+def _read_thresholds(model):
+    import json
+
+    raw = json.loads(model.get_booster().save_raw("json"))
+    per_feature = [[] for _ in CLV_FEATURES]
+    for tree in raw["learner"]["gradient_booster"]["model"]["trees"]:
+        is_split = np.asarray(tree["left_children"]) != -1
+        features = np.asarray(tree["split_indices"])[is_split]
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)[is_split]
+        for f, c in zip(features.tolist(), conditions):
+            per_feature[f].append(c)
+    return [np.unique(np.asarray(t, dtype=np.float32)) for t in per_feature]
+
+
+def _signatures(X, columns, thresholds):
+    # XGBoost goes left when x < threshold, so two values follow the same path
+    # through every split iff the same number of thresholds is <= each of them
+    return np.column_stack([
+        np.searchsorted(thresholds[j], X[:, j].astype(np.float32), side="right") for j in columns
+    ])
+
+
+def _representatives(X, columns, thresholds):
+    """(rows to score, index of each row's representative among them)."""
+    if thresholds is None:
+        return np.arange(len(X)), np.arange(len(X))
+    _, first, inverse = np.unique(_signatures(X, columns, thresholds), axis=0,
+                                  return_index=True, return_inverse=True)
+    return first, inverse.reshape(-1)
+
+
+def parse_grid(grid, max_cells=SWEEP_MAX_ROWS):
+    """
+    {input: [values...] or {"start": a, "stop": b, "num": n}} for one or two
+    inputs -> (names, value arrays), validated like any other CLV input.
+    Grids of more than max_cells points are refused before anything is allocated.
+    """
+    if not isinstance(grid, dict) or not 1 <= len(grid) <= 2:
+        raise ValueError("'grid' must map one or two CLV inputs to their values")
+    names, axes = [], []
+    cells = 1
+    for name, spec in grid.items():
+        if name not in CLV_INPUTS:
+            raise ValueError(f"Cannot sweep '{name}' (expected one of {', '.join(CLV_INPUTS)})")
+        if isinstance(spec, dict):
+            try:
+                start, stop, num = float(spec["start"]), float(spec["stop"]), int(spec["num"])
+            except (KeyError, TypeError, ValueError, OverflowError):
+                raise ValueError(f"Grid for '{name}' needs numeric 'start', 'stop' and 'num'")
+        elif isinstance(spec, list):
+            num = len(spec)
+        else:
+            raise ValueError(f"Grid for '{name}' must be a list of values or {{'start', 'stop', 'num'}}")
+        cells *= num
+        if num < 1 or cells > max_cells:
+            raise ValueError(f"Grid for '{name}' needs 1 to {max_cells:,} points in total, got {cells:,}")
+        if isinstance(spec, dict):
+            spec = np.linspace(start, stop, num)
+        values = validate_block({name: spec}, [name])[name]
+        names.append(name)
+        axes.append(values)
+    return names, axes
+
+
+def sweep(model, customers, names, axes, predict=None, chunk_rows=SWEEP_CHUNK_ROWS):
+    """
+    Predicted CLV of every customer at every grid point.
+
+    model: the fitted CLV model (its split thresholds enable the de-duplication;
+    anything without get_booster() is scored row by row of the full block).
+    customers: column block of CLV_INPUTS; predict: X -> CLV (default model.predict).
+    """
+    predict = predict or model.predict
+    thresholds = split_thresholds(model) if hasattr(model, "get_booster") else None
+    start = time.perf_counter()
+
+    shape = tuple(len(a) for a in axes)
+    mesh = dict(zip(names, (m.reshape(-1) for m in np.meshgrid(*axes, indexing="ij"))))
+    n_cells = mesh[names[0]].size
+    n_customers = len(customers[CLV_INPUTS[0]])
+
+    # Columns the grid changes, and whether any of them also depends on the customer
+    varying = set(names) | {d for d, inputs in DERIVED.items() if set(inputs) & set(names)}
+    coupled = any(set(DERIVED[d]) - set(names) for d in varying & DERIVED.keys())
+    if coupled:
+        thresholds = None
+    grid_cols = [j for j, c in enumerate(CLV_FEATURES) if c in varying]
+    customer_cols = [j for j, c in enumerate(CLV_FEATURES) if c not in varying]
+
+    # The grid's own columns (derived ones included) are the same for every customer
+    filler = np.zeros(n_cells)
+    cell_X = clv_matrix({c: mesh.get(c, filler) for c in CLV_INPUTS})
+    cell_rep, cell_inv = _representatives(cell_X, grid_cols, thresholds)
+    customer_X = clv_matrix(customers)
+    customer_rep, customer_inv = _representatives(customer_X, customer_cols, thresholds)
+
+    # Score unique customers x unique cells, a chunk of customers at a time
+    per_chunk = max(1, chunk_rows // len(cell_rep))
+    scored = np.empty((len(customer_rep), len(cell_rep)), dtype=np.float32)
+    for lo in range(0, len(customer_rep), per_chunk):
+        rows = customer_rep[lo:lo + per_chunk]
+        block = {
+            c: np.tile(mesh[c][cell_rep], len(rows)) if c in mesh
+            else np.repeat(np.asarray(customers[c], dtype=np.float64)[rows], len(cell_rep))
+            for c in CLV_INPUTS
+        }
+        scored[lo:lo + len(rows)] = np.asarray(predict(clv_matrix(block))).reshape(len(rows), len(cell_rep))
+
+    clv = scored[customer_inv][:, cell_inv].reshape((n_customers,) + shape)
+    return {
+        "features": names,
+        "axes": axes,
+        "clv": clv,
+        "rows_total": n_customers * n_cells,
+        "rows_scored": scored.size,
+        "seconds": time.perf_counter() - start,
+    }
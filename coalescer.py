@@ -0,0 +1,131 @@
+# coalescer.py
+"""
+Micro-batching in front of a model's predict().
+
+Concurrent single-row requests are queued and flushed as one batch when either
+`max_batch` rows are waiting or the oldest row has waited `max_wait_ms`.
+Each caller gets back only its own prediction.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class BatchCoalescer:
+    def __init__(self, predict_fn, max_wait_ms=2.0, max_batch=64, name="model", history=10_000):
+        self.predict_fn = predict_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self.name = name
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+
+        # Stats (recent queue waits are kept for percentiles)
+        self._stats_lock = threading.Lock()
+        self._waits = deque(maxlen=history)
+        self._batch_sizes = deque(maxlen=history)
+        self._size_buckets = {}
+        self._n_batches = 0
+        self._n_rows = 0
+        self._predict_s = 0.0
+
+        self._worker = threading.Thread(target=self._run, name=f"coalescer-{name}", daemon=True)
+        self._worker.start()
+
+    # ---------------------------
+    # Caller side
+    # ---------------------------
+    def submit(self, row):
+        fut = Future()
+        row = np.asarray(row, dtype=np.float64).reshape(-1)
+        with self._cond:
+            self._pending.append((row, fut, time.perf_counter()))
+            self._cond.notify()
+        return fut
+
+    def predict_one(self, row):
+        return self.submit(row).result()
+
+    # ---------------------------
+    # Flush loop
+    # ---------------------------
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            deadline = self._pending[0][2] + self.max_wait
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            n = min(len(self._pending), self.max_batch)
+            return [self._pending.popleft() for _ in range(n)]
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            flushed_at = time.perf_counter()
+
+            X = np.vstack([row for row, _, _ in batch])
+            try:
+                preds = np.asarray(self.predict_fn(X))
+                if preds.size == len(batch):  # one value per row (else one vector per row)
+                    preds = preds.reshape(-1)
+                if preds.ndim == 0 or len(preds) != len(batch):  # zip() would strand some callers
+                    raise RuntimeError(f"{self.name}: predict returned {preds.shape[0] if preds.ndim else 0} "
+                                       f"results for {len(batch)} rows")
+            except Exception as exc:  # hand the failure to every waiting caller
+                for _, fut, _ in batch:
+                    fut.set_exception(exc)
+                continue
+            predict_s = time.perf_counter() - flushed_at
+
+            for (_, fut, _), pred in zip(batch, preds):
+                fut.set_result(pred)
+
+            self._record(batch, flushed_at, predict_s)
+
+    def _record(self, batch, flushed_at, predict_s):
+        size = len(batch)
+        bucket = 1 << (size - 1).bit_length()  # 1, 2, 4, 8, ...
+        with self._stats_lock:
+            self._n_batches += 1
+            self._n_rows += size
+            self._predict_s += predict_s
+            self._batch_sizes.append(size)
+            self._size_buckets[bucket] = self._size_buckets.get(bucket, 0) + 1
+            self._waits.extend(flushed_at - queued_at for _, _, queued_at in batch)
+
+    # ---------------------------
+    # Stats
+    # ---------------------------
+    def stats(self):
+        with self._stats_lock:
+            waits_ms = np.array(self._waits) * 1000.0
+            sizes = np.array(self._batch_sizes)
+            out = {
+                "model": self.name,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "max_batch": self.max_batch,
+                "batches": self._n_batches,
+                "rows": self._n_rows,
+                "queued": len(self._pending),
+                "mean_batch_size": float(sizes.mean()) if sizes.size else 0.0,
+                "batch_size_buckets": {f"<={k}": v for k, v in sorted(self._size_buckets.items())},
+                "predict_ms_per_batch": (self._predict_s / self._n_batches * 1000.0) if self._n_batches else 0.0,
+            }
+        if waits_ms.size:
+            p50, p90, p99 = np.percentile(waits_ms, [50, 90, 99])
+            out["queue_wait_ms"] = {
+                "p50": float(p50), "p90": float(p90), "p99": float(p99), "max": float(waits_ms.max()),
+            }
+        else:
+            out["queue_wait_ms"] = {}
+        return out
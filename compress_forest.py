@@ -0,0 +1,234 @@
+# compress_forest.py
+"""
+Shrink the delivery RandomForest within an accuracy budget.
+
+    python compress_forest.py [--budget 0.1] [--distill]
+
+The full forest (200 unpruned trees) is cut down along two axes, on the same
+held-out split train_models.py reports:
+
+    depth   every tree is cut at a candidate depth; a cut node predicts the
+            mean target of its training rows (CompactForest keeps those).
+    trees   forward selection: start empty and keep adding the tree that
+            lowers the ensemble's MAE most, so near-duplicate trees are
+            left out. The number of trees is the smallest for which the
+            cross-validated MAE (ordering fitted on 4/5 of the held-out rows,
+            scored on the rest) stays within the budget from there on.
+
+Of all (depth, trees) pairs that fit the budget the one with the fewest nodes
+wins and is stored as a float32 CompactForest in models/delivery_forest_small/.
+With --distill, a few small forests trained on the full forest's predictions
+(over jittered copies of the training rows) compete as well.
+
+Size, load time, predict latency and MAE before/after are printed and written
+to outputs/logs/compression_report.json. Serve the result with
+RP360_COMPRESSED_FOREST=1.
+"""
+import argparse
+import json
+import shutil
+import time
+import warnings
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import KFold, train_test_split
+
+from config import (
+    DELIVERY_MODEL, DELIVERY_FOREST, DELIVERY_FOREST_SMALL, COMPRESS_MAE_BUDGET, COMPRESSION_REPORT,
+)
+from datastore import read_clean
+from features import DELIVERY_FEATURES
+from forest_engine import CompactForest
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+DEPTHS = [6, 8, 10, 12, 14, 16, 20]           # candidate cuts (the full depth is always tried)
+STUDENTS = [(10, 6), (20, 8), (40, 10)]       # --distill: (trees, max_depth)
+JITTER = [DELIVERY_FEATURES.index("distance_km"), DELIVERY_FEATURES.index("order_value")]
+LATENCY_ROWS = [1, 100, 10_000]
+CV_FOLDS = 5
+SEED = 42
+
+
+def held_out_split():
+    """The train/test split of train_models.train_delivery()."""
+    df = read_clean("delivery", DELIVERY_FEATURES + ["delivery_time_min"])
+    X = df[DELIVERY_FEATURES].to_numpy(np.float64)
+    y = df["delivery_time_min"].to_numpy(np.float64)
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+
+# ---------------------------
+# Tree selection
+# ---------------------------
+def greedy_order(P, y):
+    """Trees (rows of the trees x rows block P) in forward-selection order."""
+    n_trees = len(P)
+    total = np.zeros(P.shape[1])
+    left = np.ones(n_trees, dtype=bool)
+    order = []
+    for k in range(1, n_trees + 1):
+        idx = np.flatnonzero(left)
+        err = np.abs((total + P[idx]) / k - y).mean(axis=1)
+        best = idx[np.argmin(err)]
+        order.append(best)
+        left[best] = False
+        total += P[best]
+    return np.asarray(order)
+
+
+def mae_curve(P, y, order):
+    """MAE of the ensembles made of the first 1, 2, ... trees of `order`."""
+    mean = np.cumsum(P[order], axis=0) / np.arange(1, len(order) + 1)[:, None]
+    return np.abs(mean - y).mean(axis=1)
+
+
+def cv_curve(P, y, folds=CV_FOLDS):
+    """mae_curve() of greedy orderings, each scored on the rows it was not fitted on."""
+    curve = np.zeros(len(P))
+    for fit, score in KFold(folds, shuffle=True, random_state=SEED).split(y):
+        order = greedy_order(P[:, fit], y[fit])
+        curve += mae_curve(P[:, score], y[score], order) * len(score)
+    return curve / len(y)
+
+
+def smallest_within(curve, target):
+    """Fewest trees from which the curve stays <= target (None if the whole forest misses it)."""
+    over = np.flatnonzero(curve > target)
+    if len(over) == 0:
+        return 1
+    return int(over[-1]) + 2 if over[-1] + 1 < len(curve) else None
+
+
+def pruned_candidates(rf, forest, X, y, target):
+    for depth in sorted({d for d in DEPTHS if d < forest.max_depth} | {forest.max_depth}):
+        P = forest.leaf_values(X, depth=depth)
+        curve = cv_curve(P, y)
+        k = smallest_within(curve, target)
+        if k is None:
+            print(f"   depth {depth:>2}: over budget even with all {len(P)} trees (CV MAE {curve[-1]:.3f})")
+            continue
+        trees = greedy_order(P, y)[:k]
+        small = CompactForest.from_sklearn(rf, trees=trees, max_depth=depth, float32=True)
+        print(f"   depth {depth:>2}: {k:>3} trees, {small.n_nodes:>7,} nodes, CV MAE {curve[k - 1]:.3f}")
+        yield {"method": "prune", "trees": k, "depth": depth, "nodes": small.n_nodes,
+               "mae": float(curve[k - 1]), "forest": small}
+
+
+def distilled_candidates(rf, X_train, X, y, target, copies=5):
+    """Small forests fitted to the full forest's predictions on jittered training rows."""
+    rng = np.random.default_rng(SEED)
+    X_aug = np.repeat(X_train, copies, axis=0)
+    X_aug[:, JITTER] *= rng.uniform(0.9, 1.1, size=(len(X_aug), len(JITTER)))
+    y_aug = rf.predict(X_aug)
+    for trees, depth in STUDENTS:
+        student = RandomForestRegressor(n_estimators=trees, max_depth=depth, random_state=SEED, n_jobs=-1)
+        student.fit(X_aug, y_aug)
+        small = CompactForest.from_sklearn(student, float32=True)
+        mae = float(np.abs(small.predict(X) - y).mean())
+        status = "ok" if mae <= target else "over budget"
+        print(f"   distilled {trees:>3} trees, depth {depth:>2}: {small.n_nodes:>7,} nodes, MAE {mae:.3f} ({status})")
+        if mae <= target:
+            yield {"method": "distill", "trees": trees, "depth": depth, "nodes": small.n_nodes,
+                   "mae": mae, "forest": small}
+
+
+# ---------------------------
+# Before / after measurements
+# ---------------------------
+def disk_bytes(path):
+    return path.stat().st_size if path.is_file() else sum(p.stat().st_size for p in path.iterdir())
+
+
+def best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def measure(path, load, X, y, X_bench, repeat):
+    load_s, model = best_time(lambda: load(path), max(1, repeat // 5))
+    latency = {}
+    for n in LATENCY_ROWS:
+        runs = repeat if n < 10_000 else max(1, repeat // 10)
+        latency[n], _ = best_time(lambda: model.predict(X_bench[:n]), runs)
+    return {
+        "path": str(path),
+        "bytes": disk_bytes(path),
+        "load_seconds": load_s,
+        "predict_seconds": {str(n): s for n, s in latency.items()},
+        "mae": float(np.abs(model.predict(X) - y).mean()),
+    }
+
+
+def print_report(rows):
+    head = "".join(f"{f'{n:,} rows':>12}" for n in LATENCY_ROWS)
+    print(f"\n{'':<14}{'size':>10}{'load':>10}{head}{'MAE':>8}")
+    print("-" * (42 + 12 * len(LATENCY_ROWS)))
+    for label, r in rows.items():
+        lat = "".join(f"{r['predict_seconds'][str(n)] * 1000:>9.2f} ms" for n in LATENCY_ROWS)
+        print(f"{label:<14}{r['bytes'] / 1e6:>7.2f} MB{r['load_seconds'] * 1000:>7.1f} ms{lat}{r['mae']:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress the delivery RandomForest within an MAE budget.")
+    parser.add_argument("--budget", type=float, default=COMPRESS_MAE_BUDGET,
+                        help=f"largest allowed MAE increase in minutes (default {COMPRESS_MAE_BUDGET})")
+    parser.add_argument("--distill", action="store_true", help="also try small forests fitted to the full one")
+    parser.add_argument("--repeat", type=int, default=20, help="timing runs (best is reported)")
+    args = parser.parse_args()
+
+    print("\n=== DELIVERY FOREST COMPRESSION ===\n")
+    X_train, X_test, _, y_test = held_out_split()
+    rf = joblib.load(DELIVERY_MODEL)
+    forest = CompactForest.load(DELIVERY_FOREST) if DELIVERY_FOREST.exists() else CompactForest.from_sklearn(rf)
+
+    base_mae = float(np.abs(forest.predict(X_test) - y_test).mean())
+    target = base_mae + args.budget
+    print(f">> Full forest: {forest.n_trees} trees, {forest.n_nodes:,} nodes, depth {forest.max_depth}, "
+          f"held-out MAE {base_mae:.3f} (budget {args.budget:+.3f} → {target:.3f})")
+
+    candidates = list(pruned_candidates(rf, forest, X_test, y_test, target))
+    if args.distill:
+        candidates += distilled_candidates(rf, X_train, X_test, y_test, target)
+    if not candidates:
+        print("\n⚠ Nothing fits the budget; no compressed forest written.\n")
+        return
+
+    chosen = min(candidates, key=lambda c: (c["nodes"], c["mae"]))
+    shutil.rmtree(DELIVERY_FOREST_SMALL, ignore_errors=True)
+    chosen["forest"].save(DELIVERY_FOREST_SMALL)
+    print(f"\n✔ {chosen['method']}: {chosen['trees']} trees, depth {chosen['depth']}, "
+          f"{chosen['nodes']:,} nodes → {DELIVERY_FOREST_SMALL}")
+
+    # Latency rows: held-out rows resampled with a little noise
+    rng = np.random.default_rng(SEED)
+    X_bench = X_test[rng.integers(0, len(X_test), max(LATENCY_ROWS))]
+    X_bench[:, JITTER] *= rng.uniform(0.9, 1.1, size=(len(X_bench), len(JITTER)))
+    rows = {"scikit-learn": measure(DELIVERY_MODEL, joblib.load, X_test, y_test, X_bench, args.repeat)}
+    if DELIVERY_FOREST.exists():
+        rows["compact"] = measure(DELIVERY_FOREST, CompactForest.load, X_test, y_test, X_bench, args.repeat)
+    rows["compressed"] = measure(DELIVERY_FOREST_SMALL, CompactForest.load, X_test, y_test, X_bench, args.repeat)
+    print_report(rows)
+    if chosen["method"] == "prune":
+        print(f"\nThe trees were picked on these held-out rows; their cross-validated MAE is {chosen['mae']:.3f}.")
+
+    report = {
+        "budget": args.budget,
+        "base_mae": base_mae,
+        "chosen": {k: v for k, v in chosen.items() if k != "forest"},
+        "candidates": [{k: v for k, v in c.items() if k != "forest"} for c in candidates],
+        "artifacts": rows,
+    }
+    COMPRESSION_REPORT.write_text(json.dumps(report, indent=2))
+    print(f"✔ Report → {COMPRESSION_REPORT}")
+    print("   Serve it with RP360_COMPRESSED_FOREST=1\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,137 @@
-# config.py
-from pathlib import Path
-
-# Base directory = folder where this file is saved
-BASE_DIR = Path(__file__).resolve().parent
-
-# Core folders
-DATA_DIR = BASE_DIR / "data"
-MODELS_DIR = BASE_DIR / "models"
-TEMPLATES_DIR = BASE_DIR / "templates"
-OUTPUTS_DIR = BASE_DIR / "outputs"
-CHARTS_DIR = OUTPUTS_DIR / "charts"
-LOGS_DIR = OUTPUTS_DIR / "logs"
-
-# Create folders if missing (portable across PCs)
-for d in [DATA_DIR, MODELS_DIR, TEMPLATES_DIR, OUTPUTS_DIR, CHARTS_DIR, LOGS_DIR]:
-    d.mkdir(parents=True, exist_ok=True)
-
-# Raw data files (from Mockaroo / my CSVs)
-FOOTFALL_CSV = DATA_DIR / "footfall_data.csv"
-DELIVERY_CSV = DATA_DIR / "delivery_data.csv"
-CLV_CSV = DATA_DIR / "clv_data.csv"
-
-# Cleaned data outputs
-CLEAN_FOOTFALL = DATA_DIR / "clean_footfall.csv"
-CLEAN_DELIVERY = DATA_DIR / "clean_delivery.csv"
-CLEAN_CLV = DATA_DIR / "clean_clv.csv"
-
-# Model files
-FOOTFALL_MODEL = MODELS_DIR / "footfall_model.pkl"
-DELIVERY_MODEL = MODELS_DIR / "delivery_model.pkl"
-CLV_MODEL = MODELS_DIR / "clv_model.pkl"
+# config.py
+import os
+from pathlib import Path
+
+# Base directory = folder where this file is saved
+BASE_DIR = Path(__file__).resolve().parent
+
+# Core folders
+DATA_DIR = BASE_DIR / "data"
+MODELS_DIR = BASE_DIR / "models"
+TEMPLATES_DIR = BASE_DIR / "templates"
+OUTPUTS_DIR = BASE_DIR / "outputs"
+CHARTS_DIR = OUTPUTS_DIR / "charts"
+LOGS_DIR = OUTPUTS_DIR / "logs"
+
+# Create folders if missing (portable across PCs)
+for d in [DATA_DIR, MODELS_DIR, TEMPLATES_DIR, OUTPUTS_DIR, CHARTS_DIR, LOGS_DIR]:
+    d.mkdir(parents=True, exist_ok=True)
+
+# Raw data files (from Mockaroo / my CSVs)
+FOOTFALL_CSV = DATA_DIR / "footfall_data.csv"
+DELIVERY_CSV = DATA_DIR / "delivery_data.csv"
+CLV_CSV = DATA_DIR / "clv_data.csv"
+
+# Cleaned data outputs
+CLEAN_FOOTFALL = DATA_DIR / "clean_footfall.csv"
+CLEAN_DELIVERY = DATA_DIR / "clean_delivery.csv"
+CLEAN_CLV = DATA_DIR / "clean_clv.csv"
+
+# Binary column stores for the cleaned data (datastore.py): csv | parquet | feather | npy
+CLEAN_STORE_DIR = DATA_DIR / "clean"
+CLEAN_FORMAT = os.environ.get("RP360_CLEAN_FORMAT", "csv")
+
+# Model files
+FOOTFALL_MODEL = MODELS_DIR / "footfall_model.pkl"
+DELIVERY_MODEL = MODELS_DIR / "delivery_model.pkl"
+CLV_MODEL = MODELS_DIR / "clv_model.pkl"
+
+# Memory-mappable exports used for serving (model_registry.py)
+FOOTFALL_ARRAYS = MODELS_DIR / "footfall"             # footfall lookup table + coefficients
+FOOTFALL_STORES = MODELS_DIR / "footfall_stores"      # per-store coefficient matrix (one row per store)
+DELIVERY_FOREST = MODELS_DIR / "delivery_forest"      # RandomForest flattened into arrays
+DELIVERY_FOREST_SMALL = MODELS_DIR / "delivery_forest_small"  # compress_forest.py output
+CLV_BOOSTER = MODELS_DIR / "clv_model.ubj"            # XGBoost native format
+
+# Batch scoring API (web_app.py /api/<model>/batch)
+BATCH_MAX_ROWS = 1_000_000
+BATCH_STREAM_CHUNK = 5_000
+
+# Micro-batching of concurrent single-row predictions (web_app.py), opt-in
+COALESCE_ENABLED = os.environ.get("RP360_COALESCE", "0") == "1"
+COALESCE_MAX_WAIT_MS = float(os.environ.get("RP360_COALESCE_MAX_WAIT_MS", "2"))
+COALESCE_MAX_BATCH = int(os.environ.get("RP360_COALESCE_MAX_BATCH", "64"))
+
+# Opt-in cache of single-row delivery/CLV predictions (prediction_cache.py). Float inputs are
+# snapped to these steps before lookup; the cache empties when the model is reloaded.
+PREDICTION_CACHE_ENABLED = os.environ.get("RP360_PREDICTION_CACHE", "0") == "1"
+PREDICTION_CACHE_SIZE = int(os.environ.get("RP360_PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.environ.get("RP360_PREDICTION_CACHE_TTL", "3600"))  # seconds, 0 = no expiry
+PREDICTION_CACHE_STEPS = {"distance_km": 0.1, "order_value": 10.0}
+
+# Latency histograms and process metrics at /metrics (Prometheus text format)
+METRICS_ENABLED = os.environ.get("RP360_METRICS", "1") == "1"
+
+# Delivery ETA quantiles, from the spread of the forest's per-tree predictions (forest_engine.py),
+# returned next to the mean ("" = mean only). With RP360_DELIVERY_RISK_QUANTILE set (e.g. 0.9)
+# the High/Moderate/Low delay risk is judged on that quantile instead of the mean.
+DELIVERY_QUANTILES = tuple(
+    float(q) for q in os.environ.get("RP360_DELIVERY_QUANTILES", "0.1,0.9").split(",") if q.strip()
+)
+DELIVERY_RISK_QUANTILE = float(os.environ["RP360_DELIVERY_RISK_QUANTILE"]) if os.environ.get(
+    "RP360_DELIVERY_RISK_QUANTILE") else None
+
+# Rider assignment (web_app.py /api/delivery/assign): largest orders x riders wave
+ASSIGN_MAX_PAIRS = 1_000_000
+
+# CLV what-if sweeps (clv_sweep.py, web_app.py /api/clv/sweep): largest customers x grid
+# cells per request, and rows per model call
+SWEEP_MAX_ROWS = 20_000_000
+SWEEP_CHUNK_ROWS = 1_000_000
+
+# Local model daemon (model_server.py / model_client.py). Unix socket paths are limited to ~100
+# characters; point RP360_MODEL_SOCKET somewhere shorter (e.g. /tmp/rp360.sock) if needed.
+MODEL_SOCKET = Path(os.environ.get("RP360_MODEL_SOCKET", OUTPUTS_DIR / "model_server.sock"))
+
+# Footfall calendar forecast (web_app.py /api/footfall/forecast)
+FORECAST_MAX_DAYS = 3_660
+
+# Incremental footfall updates (footfall_stats.py): per-day decay of older data, 1 = none
+FOOTFALL_FORGET = float(os.environ.get("RP360_FOOTFALL_FORGET", "1.0"))
+
+# Per-store footfall models: lookup tables kept in memory (LRU, web_app.py /footfall with a store)
+FOOTFALL_STORE_CACHE = int(os.environ.get("RP360_FOOTFALL_STORE_CACHE", "256"))
+
+# Serve delivery ETAs from the array-backed forest (set to 0 to force sklearn).
+# Batches larger than COMPACT_FOREST_MAX_ROWS still go to scikit-learn, which is faster there.
+COMPACT_FOREST_ENABLED = os.environ.get("RP360_COMPACT_FOREST", "1") == "1"
+COMPACT_FOREST_MAX_ROWS = int(os.environ.get("RP360_COMPACT_FOREST_MAX_ROWS", "1000"))
+
+# Compressed delivery forest (compress_forest.py): fewest nodes whose MAE stays within
+# COMPRESS_MAE_BUDGET minutes of the full forest. RP360_COMPRESSED_FOREST=1 serves it for every
+# batch size (the full scikit-learn model is then never loaded).
+COMPRESS_MAE_BUDGET = float(os.environ.get("RP360_COMPRESS_MAE_BUDGET", "0.1"))
+COMPRESSED_FOREST_ENABLED = os.environ.get("RP360_COMPRESSED_FOREST", "0") == "1"
+COMPRESSION_REPORT = LOGS_DIR / "compression_report.json"
+
+# Incremental pipeline runner (pipeline.py): state, logs and cached stage outputs
+PIPELINE_DIR = OUTPUTS_DIR / "pipeline"
+PIPELINE_CACHE_KEEP = int(os.environ.get("RP360_PIPELINE_CACHE_KEEP", "2"))  # runs kept per stage, 0 = off
+
+# Parallel training (train_models.py): total cores shared by the three model processes,
+# split in proportion to these shares (every model gets at least one core)
+TRAIN_CORES = int(os.environ.get("RP360_TRAIN_CORES", str(os.cpu_count() or 1)))
+TRAIN_CORE_SHARES = {"footfall": 0, "delivery": 3, "clv": 2}
+TRAINING_REPORT = LOGS_DIR / "training_report.json"
+
+# Model hyperparameters read by train_models.py; tune.py writes the best ones back
+TRAINING_CONFIG = BASE_DIR / "training_config.json"
+TUNING_WORKERS = int(os.environ.get("RP360_TUNING_WORKERS", str(os.cpu_count() or 1)))
+
+# Bulk CLV scoring (score_clv.py)
+CLV_SCORES_DIR = OUTPUTS_DIR / "clv_scores"
+BULK_CHUNK_ROWS = 200_000
+
+# Benchmark suite (benchmarks/suite.py)
+BENCHMARKS_DIR = OUTPUTS_DIR / "benchmarks"
+BENCH_THRESHOLD = float(os.environ.get("RP360_BENCH_THRESHOLD", "0.15"))  # allowed relative slowdown
+
+# Async serving (asgi_app.py): predict() runs in a bounded thread pool; requests
+# beyond ASYNC_MAX_PENDING waiting predictions get 503 + Retry-After
+ASYNC_PREDICT_THREADS = int(os.environ.get("RP360_ASYNC_PREDICT_THREADS", str(min(8, (os.cpu_count() or 1) * 2))))
+ASYNC_MAX_PENDING = int(os.environ.get("RP360_ASYNC_MAX_PENDING", "128"))
+
+# Streaming EDA (eda.py --streaming): one chunked pass builds sketches/histograms,
+# the charts are drawn from those, so chart time and memory do not grow with the rows
+EDA_STREAMING = os.environ.get("RP360_EDA_STREAMING", "0") == "1"
+EDA_CHUNKSIZE = int(os.environ.get("RP360_EDA_CHUNKSIZE", "500000"))
@@ -0,0 +1,301 @@
+# datastore.py
+"""
+Read/write the cleaned datasets with a declared schema.
+
+Formats (config.CLEAN_FORMAT / RP360_CLEAN_FORMAT):
+    csv      data/clean_<name>.csv           (default, text)
+    parquet  data/clean/<name>.parquet       (needs pyarrow)
+    feather  data/clean/<name>.feather       (needs pyarrow, memory-mapped reads)
+    npy      data/clean/<name>/<column>.npy  (NumPy only, memory-mapped reads)
+
+Every reader takes `columns=` so each consumer only loads what it uses.
+Model inputs are stored as float32 (both scikit-learn's trees and XGBoost
+convert to float32 anyway); targets stay float64.
+"""
+import importlib.util
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    CLEAN_FOOTFALL, CLEAN_DELIVERY, CLEAN_CLV, CLEAN_STORE_DIR, CLEAN_FORMAT
+)
+
+FORMATS = ["csv", "parquet", "feather", "npy"]
+
+SCHEMAS = {
+    "footfall": {
+        "date": "datetime64[ns]",
+        "store_id": "string",  # optional (single-store data has none)
+        "is_holiday": "int8",
+        "promo_active": "int8",
+        "footfall": "int32",
+        "day_of_week": "int8",
+        "is_weekend": "int8",
+        "month": "int8",
+    },
+    "delivery": {
+        "distance_km": "float32",
+        "num_items": "int16",
+        "order_value": "float32",
+        "time_of_day_bucket": "int8",
+        "traffic_level": "int8",
+        "rider_experience_months": "int16",
+        "delivery_time_min": "float64",
+    },
+    "clv": {
+        "customer_id": "string",
+        "tenure_months": "int16",
+        "orders_per_month": "float32",
+        "avg_order_value": "float32",
+        "recency_days": "int16",
+        "discount_usage_rate": "float32",
+        "return_rate": "float32",
+        "clv_next_12m": "float64",
+        "loyalty_index": "float32",
+        "monetary_value": "float32",
+    },
+}
+
+# Schema columns a dataset may lack (read only when the stored data has them)
+OPTIONAL = {"footfall": {"store_id"}}
+
+CSV_PATHS = {"footfall": CLEAN_FOOTFALL, "delivery": CLEAN_DELIVERY, "clv": CLEAN_CLV}
+
+
+def clean_path(name, fmt=None):
+    fmt = fmt or CLEAN_FORMAT
+    if fmt == "csv":
+        return CSV_PATHS[name]
+    if fmt == "npy":
+        return CLEAN_STORE_DIR / name
+    if fmt in ("parquet", "feather"):
+        return CLEAN_STORE_DIR / f"{name}.{fmt}"
+    raise ValueError(f"Unknown clean data format '{fmt}' (expected one of {', '.join(FORMATS)})")
+
+
+def apply_schema(name, df):
+    schema = SCHEMAS[name]
+    return df.astype({c: t for c, t in schema.items() if c in df.columns})
+
+
+def _require_pyarrow(fmt):
+    if importlib.util.find_spec("pyarrow") is None:
+        raise ImportError(f"The '{fmt}' format needs pyarrow (pip install pyarrow); use 'npy' or 'csv' instead")
+
+
+# ---------------------------
+# Reading
+# ---------------------------
+def _default_columns(name, fmt, path):
+    """The schema columns, minus optional ones the stored data does not have."""
+    optional = OPTIONAL.get(name, set())
+    present = set(stored_columns(name, fmt, path)) if optional else set()
+    return [c for c in SCHEMAS[name] if c not in optional or c in present]
+
+
+def read_clean(name, columns=None, fmt=None, path=None):
+    fmt = fmt or CLEAN_FORMAT
+    path = path or clean_path(name, fmt)
+    schema = SCHEMAS[name]
+    columns = list(columns) if columns is not None else _default_columns(name, fmt, path)
+
+    if fmt == "csv":
+        dtypes = {c: schema[c] for c in columns if c != "date"}
+        parse_dates = ["date"] if "date" in columns else None
+        return pd.read_csv(path, usecols=columns, dtype=dtypes, parse_dates=parse_dates)[columns]
+
+    if fmt == "parquet":
+        _require_pyarrow(fmt)
+        return pd.read_parquet(path, columns=columns)
+
+    if fmt == "feather":
+        _require_pyarrow(fmt)
+        from pyarrow import feather
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        return table.to_pandas()
+
+    # npy: one memory-mapped array per column
+    data = {}
+    for c in columns:
+        if schema[c] == "string":
+            data[c] = pd.array(np.load(path / f"{c}.npy", allow_pickle=False), dtype="string")
+        else:
+            data[c] = np.load(path / f"{c}.npy", mmap_mode="r")
+    return pd.DataFrame(data, copy=False)
+
+
+def stored_columns(name, fmt=None, path=None):
+    """Names of the columns actually present in the cleaned data (without reading it)."""
+    fmt = fmt or CLEAN_FORMAT
+    path = path or clean_path(name, fmt)
+    if fmt == "csv":
+        return list(pd.read_csv(path, nrows=0).columns)
+    if fmt == "parquet":
+        _require_pyarrow(fmt)
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    if fmt == "feather":
+        _require_pyarrow(fmt)
+        import pyarrow as pa
+        with pa.memory_map(str(path)) as source:
+            return pa.ipc.open_file(source).schema.names
+    return list(json.loads((path / "schema.json").read_text())["columns"])
+
+
+def read_columns(name, columns, fmt=None, path=None):
+    """Like read_clean() but returns {column: ndarray} without building a DataFrame."""
+    fmt = fmt or CLEAN_FORMAT
+    if fmt == "npy":
+        path = path or clean_path(name, fmt)
+        return {c: np.load(path / f"{c}.npy", mmap_mode="r") for c in columns}
+    df = read_clean(name, columns, fmt, path)
+    return {c: df[c].to_numpy() for c in columns}
+
+
+def iter_clean(name, columns=None, chunksize=500_000, fmt=None, path=None):
+    """Like read_clean() but yields DataFrames of at most `chunksize` rows."""
+    fmt = fmt or CLEAN_FORMAT
+    path = path or clean_path(name, fmt)
+    schema = SCHEMAS[name]
+    columns = list(columns) if columns is not None else _default_columns(name, fmt, path)
+
+    if fmt == "csv":
+        dtypes = {c: schema[c] for c in columns if c != "date"}
+        parse_dates = ["date"] if "date" in columns else None
+        with pd.read_csv(path, usecols=columns, dtype=dtypes, parse_dates=parse_dates,
+                         chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield chunk[columns]
+        return
+
+    if fmt in ("parquet", "feather"):
+        _require_pyarrow(fmt)
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            batches = pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns)
+        else:
+            from pyarrow import feather
+            batches = feather.read_table(path, columns=columns, memory_map=True).to_batches(chunksize)
+        for batch in batches:
+            yield batch.to_pandas()
+        return
+
+    # npy: slices of the memory-mapped columns
+    data = read_clean(name, columns, fmt, path)
+    for start in range(0, len(data), chunksize):
+        yield data.iloc[start:start + chunksize]
+
+
+# ---------------------------
+# Writing
+# ---------------------------
+class CleanWriter:
+    """Append cleaned frames chunk by chunk in any of the formats."""
+
+    def __init__(self, name, fmt=None, path=None):
+        self.name = name
+        self.fmt = fmt or CLEAN_FORMAT
+        self.path = path or clean_path(name, self.fmt)
+        self.rows = 0
+        self._writer = None
+        self._parts = {}
+        if self.fmt != "csv":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.fmt in ("parquet", "feather"):
+            _require_pyarrow(self.fmt)
+
+    def write(self, df):
+        first = self.rows == 0 and self._writer is None and not self._parts
+
+        if self.fmt == "csv":
+            # Text keeps the values exactly as cleaned; the schema is applied on read
+            df.to_csv(self.path, index=False, mode="w" if first else "a", header=first)
+
+        elif self.fmt in ("parquet", "feather"):
+            import pyarrow as pa
+            df = apply_schema(self.name, df)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                if self.fmt == "parquet":
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self.path, table.schema)
+                else:
+                    # Feather v2 == Arrow IPC file; uncompressed so it can be memory-mapped
+                    self._writer = pa.ipc.new_file(str(self.path), table.schema)
+            self._writer.write_table(table)
+
+        else:
+            # Raw column bytes now, wrapped into .npy files on close()
+            df = apply_schema(self.name, df)
+            if first:
+                shutil.rmtree(self.path, ignore_errors=True)
+                self.path.mkdir(parents=True)
+            for c in df.columns:
+                if SCHEMAS[self.name].get(c) == "string":
+                    # Fixed-width unicode; the final width is only known at the end
+                    values = df[c].to_numpy(dtype=str)
+                    part = self._parts.setdefault(c, {"dtype": values.dtype, "chunks": 0})
+                    np.save(self.path / f"{c}.part{part['chunks']}.npy", values)
+                    part["chunks"] += 1
+                    part["dtype"] = max(part["dtype"], values.dtype, key=lambda d: d.itemsize)
+                    continue
+                values = df[c].to_numpy()
+                self._parts.setdefault(c, {"dtype": values.dtype})
+                with open(self.path / f"{c}.bin", "ab") as f:
+                    f.write(np.ascontiguousarray(values).tobytes())
+
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self.fmt == "npy":
+            self._finish_npy()
+        return self.rows
+
+    def _finish_npy(self):
+        for c, part in self._parts.items():
+            target = self.path / f"{c}.npy"
+            if "chunks" in part and self.rows == 0:
+                np.save(target, np.array([], dtype=part["dtype"]))
+                (self.path / f"{c}.part0.npy").unlink(missing_ok=True)
+                continue
+            if "chunks" in part:
+                out = np.lib.format.open_memmap(target, mode="w+", dtype=part["dtype"], shape=(self.rows,))
+                start = 0
+                for i in range(part["chunks"]):
+                    piece = self.path / f"{c}.part{i}.npy"
+                    values = np.load(piece)
+                    out[start:start + len(values)] = values
+                    start += len(values)
+                    piece.unlink()
+                out.flush()
+                del out
+                continue
+            raw = self.path / f"{c}.bin"
+            header = {"descr": np.lib.format.dtype_to_descr(part["dtype"]),
+                      "fortran_order": False, "shape": (self.rows,)}
+            with open(target, "wb") as out, open(raw, "rb") as src:
+                np.lib.format.write_array_header_1_0(out, header)
+                shutil.copyfileobj(src, out, 16 * 1024 * 1024)
+            raw.unlink()
+        (self.path / "schema.json").write_text(json.dumps(
+            {"rows": self.rows, "columns": {c: SCHEMAS[self.name][c] for c in self._parts}}, indent=2
+        ))
+        self._parts = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_clean(name, df, fmt=None, path=None):
+    with CleanWriter(name, fmt, path) as writer:
+        writer.write(df)
+    return writer.rows
@@ -0,0 +1,87 @@
+# dispatch.py
+"""
+Rider assignment for a wave of orders, on top of the delivery ETA model.
+
+Only rider_experience_months differs between riders, so the orders x riders
+ETA matrix is scored as orders x (distinct experience values) rows in one
+model call and broadcast back to every rider. The assignment is then solved
+with SciPy's Hungarian algorithm (linear_sum_assignment):
+
+    total   minimise the sum of predicted ETAs
+    worst   minimise the largest predicted ETA (bottleneck assignment),
+            then the sum among the assignments that reach it
+
+Each rider takes at most one order per wave; with more orders than riders the
+orders left over wait for the next wave.
+"""
+import time
+
+import numpy as np
+
+from features import DELIVERY_FEATURES, delivery_matrix
+
+ORDER_INPUTS = [c for c in DELIVERY_FEATURES if c != "rider_experience_months"]
+OBJECTIVES = ("total", "worst")
+
+
+def eta_matrix(predict, orders, experience):
+    """
+    Predicted ETA of every (order, rider) pair as an (orders x riders) matrix.
+
+    predict: X -> ETAs (the delivery model); orders: column block of
+    ORDER_INPUTS; experience: rider_experience_months of each rider.
+    """
+    levels, rider_level = np.unique(np.asarray(experience, dtype=np.float64), return_inverse=True)
+    n_orders = len(orders[ORDER_INPUTS[0]])
+    block = {c: np.repeat(np.asarray(orders[c], dtype=np.float64), len(levels)) for c in ORDER_INPUTS}
+    block["rider_experience_months"] = np.tile(levels, n_orders)
+    eta = np.asarray(predict(delivery_matrix(block)), dtype=np.float64).reshape(n_orders, len(levels))
+    return eta[:, rider_level]
+
+
+def bottleneck_threshold(eta):
+    """Smallest t for which every order (or every rider, if fewer) can be matched with ETA <= t."""
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import maximum_bipartite_matching
+
+    size = min(eta.shape)
+    values = np.unique(eta)
+    # The worst pair is at least the best option of whichever side must be fully matched
+    floor = eta.min(axis=1).max() if eta.shape[0] <= eta.shape[1] else eta.min(axis=0).max()
+    lo, hi = int(np.searchsorted(values, floor)), len(values) - 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        match = maximum_bipartite_matching(csr_matrix(eta <= values[mid]), perm_type="column")
+        if (match >= 0).sum() >= size:
+            hi = mid
+        else:
+            lo = mid + 1
+    return values[lo]
+
+
+def solve(eta, objective="total"):
+    """(order indices, rider indices) of the optimal assignment."""
+    from scipy.optimize import linear_sum_assignment
+
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}' (expected one of {', '.join(OBJECTIVES)})")
+    cost = eta
+    if objective == "worst":
+        cost = np.where(eta <= bottleneck_threshold(eta), eta, np.inf)
+    return linear_sum_assignment(cost)
+
+
+def assign_wave(predict, orders, experience, objective="total"):
+    """Score and assign one wave; scoring and solving are timed separately."""
+    start = time.perf_counter()
+    eta = eta_matrix(predict, orders, experience)
+    scored = time.perf_counter()
+    order_idx, rider_idx = solve(eta, objective)
+    solved = time.perf_counter()
+    return {
+        "orders": order_idx,
+        "riders": rider_idx,
+        "eta": eta[order_idx, rider_idx],
+        "score_seconds": scored - start,
+        "solve_seconds": solved - scored,
+    }
@@ -1,99 +1,277 @@
 # eda.py
-import pandas as pd
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 import seaborn as sns
+from matplotlib.colors import LogNorm
 
-from config import CLEAN_FOOTFALL, CLEAN_DELIVERY, CLEAN_CLV, CHARTS_DIR
+from config import CHARTS_DIR, EDA_STREAMING, EDA_CHUNKSIZE
+from datastore import read_clean, iter_clean
+from streaming_stats import QuantileSketch, Moments, Hist2D
 
 sns.set()
 
-print("\n=== PHASE 3: EXPLORATORY DATA ANALYSIS (EDA) ===\n")
+# Charts written by each dataset's EDA step (in CHARTS_DIR)
+CHARTS = {
+    "footfall": ["footfall_time_series.png", "footfall_by_weekday.png"],
+    "delivery": ["delivery_distance_vs_time.png", "delivery_traffic_boxplot.png"],
+    "clv": ["clv_distribution.png", "clv_correlation_heatmap.png"],
+}
+
+CLV_CORR_COLS = ["tenure_months", "orders_per_month", "avg_order_value",
+                 "recency_days", "discount_usage_rate", "return_rate",
+                 "monetary_value", "clv_next_12m"]
+
 
 # ----------------------------------------------------
 # 1️⃣ Footfall EDA
 # ----------------------------------------------------
-df_foot = pd.read_csv(CLEAN_FOOTFALL, parse_dates=["date"])
-
-# Plot 1: Footfall over time
-plt.figure(figsize=(10, 4))
-plt.plot(df_foot["date"], df_foot["footfall"])
-plt.title("Daily Store Footfall Over Time")
-plt.xlabel("Date")
-plt.ylabel("Footfall")
-plt.tight_layout()
-p1 = CHARTS_DIR / "footfall_time_series.png"
-plt.savefig(p1)
-plt.close()
-print(f"✔ Saved chart → {p1}")
-
-# Plot 2: Boxplot by day of week
-plt.figure(figsize=(8, 4))
-sns.boxplot(x="day_of_week", y="footfall", data=df_foot)
-plt.title("Footfall by Day of Week (0=Mon, 6=Sun)")
-plt.tight_layout()
-p2 = CHARTS_DIR / "footfall_by_weekday.png"
-plt.savefig(p2)
-plt.close()
-print(f"✔ Saved chart → {p2}")
+def eda_footfall(streaming=EDA_STREAMING, chunksize=EDA_CHUNKSIZE):
+    if streaming:
+        return eda_streaming("footfall", chunksize)
+    df_foot = read_clean("footfall", ["date", "day_of_week", "footfall"])
+
+    # Plot 1: Footfall over time
+    plt.figure(figsize=(10, 4))
+    plt.plot(df_foot["date"], df_foot["footfall"])
+    plt.title("Daily Store Footfall Over Time")
+    plt.xlabel("Date")
+    plt.ylabel("Footfall")
+    plt.tight_layout()
+    p1 = CHARTS_DIR / CHARTS["footfall"][0]
+    plt.savefig(p1)
+    plt.close()
+    print(f"✔ Saved chart → {p1}")
+
+    # Plot 2: Boxplot by day of week
+    plt.figure(figsize=(8, 4))
+    sns.boxplot(x="day_of_week", y="footfall", data=df_foot)
+    plt.title("Footfall by Day of Week (0=Mon, 6=Sun)")
+    plt.tight_layout()
+    p2 = CHARTS_DIR / CHARTS["footfall"][1]
+    plt.savefig(p2)
+    plt.close()
+    print(f"✔ Saved chart → {p2}")
 
 
 # ----------------------------------------------------
 # 2️⃣ Delivery EDA
 # ----------------------------------------------------
-df_del = pd.read_csv(CLEAN_DELIVERY)
-
-# Scatter: distance vs delivery time
-plt.figure(figsize=(8, 4))
-plt.scatter(df_del["distance_km"], df_del["delivery_time_min"], alpha=0.5)
-plt.title("Distance vs Delivery Time")
-plt.xlabel("Distance (km)")
-plt.ylabel("Delivery Time (min)")
-plt.tight_layout()
-p3 = CHARTS_DIR / "delivery_distance_vs_time.png"
-plt.savefig(p3)
-plt.close()
-print(f"✔ Saved chart → {p3}")
-
-# Boxplot: traffic level vs delivery time
-plt.figure(figsize=(6, 4))
-sns.boxplot(x="traffic_level", y="delivery_time_min", data=df_del)
-plt.title("Delivery Time by Traffic Level")
-plt.tight_layout()
-p4 = CHARTS_DIR / "delivery_traffic_boxplot.png"
-plt.savefig(p4)
-plt.close()
-print(f"✔ Saved chart → {p4}")
+def eda_delivery(streaming=EDA_STREAMING, chunksize=EDA_CHUNKSIZE):
+    if streaming:
+        return eda_streaming("delivery", chunksize)
+    df_del = read_clean("delivery", ["distance_km", "traffic_level", "delivery_time_min"])
+
+    # Scatter: distance vs delivery time
+    plt.figure(figsize=(8, 4))
+    plt.scatter(df_del["distance_km"], df_del["delivery_time_min"], alpha=0.5)
+    plt.title("Distance vs Delivery Time")
+    plt.xlabel("Distance (km)")
+    plt.ylabel("Delivery Time (min)")
+    plt.tight_layout()
+    p3 = CHARTS_DIR / CHARTS["delivery"][0]
+    plt.savefig(p3)
+    plt.close()
+    print(f"✔ Saved chart → {p3}")
+
+    # Boxplot: traffic level vs delivery time
+    plt.figure(figsize=(6, 4))
+    sns.boxplot(x="traffic_level", y="delivery_time_min", data=df_del)
+    plt.title("Delivery Time by Traffic Level")
+    plt.tight_layout()
+    p4 = CHARTS_DIR / CHARTS["delivery"][1]
+    plt.savefig(p4)
+    plt.close()
+    print(f"✔ Saved chart → {p4}")
 
 
 # ----------------------------------------------------
 # 3️⃣ CLV EDA
 # ----------------------------------------------------
-df_clv = pd.read_csv(CLEAN_CLV)
-
-# Histogram of CLV
-plt.figure(figsize=(8, 4))
-plt.hist(df_clv["clv_next_12m"], bins=30)
-plt.title("Distribution of Customer Lifetime Value (Next 12m)")
-plt.xlabel("CLV (₹)")
-plt.ylabel("Count")
-plt.tight_layout()
-p5 = CHARTS_DIR / "clv_distribution.png"
-plt.savefig(p5)
-plt.close()
-print(f"✔ Saved chart → {p5}")
-
-# Correlation heatmap
-plt.figure(figsize=(8, 6))
-corr_cols = ["tenure_months", "orders_per_month", "avg_order_value",
-             "recency_days", "discount_usage_rate", "return_rate",
-             "monetary_value", "clv_next_12m"]
-corr = df_clv[corr_cols].corr()
-sns.heatmap(corr, annot=True, fmt=".2f")
-plt.title("Correlation Heatmap – CLV Features")
-plt.tight_layout()
-p6 = CHARTS_DIR / "clv_correlation_heatmap.png"
-plt.savefig(p6)
-plt.close()
-print(f"✔ Saved chart → {p6}")
-
-print("\n✅ PHASE 3 DONE: Charts saved in outputs/charts.\n")
+def eda_clv(streaming=EDA_STREAMING, chunksize=EDA_CHUNKSIZE):
+    if streaming:
+        return eda_streaming("clv", chunksize)
+    df_clv = read_clean("clv", CLV_CORR_COLS)
+
+    # Histogram of CLV
+    plt.figure(figsize=(8, 4))
+    plt.hist(df_clv["clv_next_12m"], bins=30)
+    plt.title("Distribution of Customer Lifetime Value (Next 12m)")
+    plt.xlabel("CLV (₹)")
+    plt.ylabel("Count")
+    plt.tight_layout()
+    p5 = CHARTS_DIR / CHARTS["clv"][0]
+    plt.savefig(p5)
+    plt.close()
+    print(f"✔ Saved chart → {p5}")
+
+    # Correlation heatmap
+    plt.figure(figsize=(8, 6))
+    corr = df_clv[CLV_CORR_COLS].corr()
+    sns.heatmap(corr, annot=True, fmt=".2f")
+    plt.title("Correlation Heatmap – CLV Features")
+    plt.tight_layout()
+    p6 = CHARTS_DIR / CHARTS["clv"][1]
+    plt.savefig(p6)
+    plt.close()
+    print(f"✔ Saved chart → {p6}")
+
+
+# ----------------------------------------------------
+# 4️⃣ Streaming EDA (any number of rows)
+# ----------------------------------------------------
+# One chunked pass per dataset builds small mergeable aggregates (quantile
+# sketches, one-pass covariance, a 2-D histogram, per-day means); the charts
+# are drawn from those, so their cost follows the number of days / buckets /
+# grid cells instead of the number of rows.
+DELIVERY_GRID = (0.1, 0.5)  # km × min per cell of the distance/time histogram
+
+
+def footfall_aggregates(chunksize=EDA_CHUNKSIZE, fmt=None, path=None):
+    daily = None
+    weekday = {}
+    for chunk in iter_clean("footfall", ["date", "day_of_week", "footfall"], chunksize, fmt, path):
+        day = chunk.groupby("date")["footfall"].agg(["sum", "count"])
+        daily = day if daily is None else daily.add(day, fill_value=0)
+        for d, values in chunk.groupby("day_of_week")["footfall"]:
+            weekday.setdefault(int(d), QuantileSketch()).update(values.to_numpy())
+    return {"daily": daily["sum"] / daily["count"], "weekday": weekday}
+
+
+def delivery_aggregates(chunksize=EDA_CHUNKSIZE, fmt=None, path=None):
+    grid = Hist2D(DELIVERY_GRID)
+    traffic = {}
+    for chunk in iter_clean("delivery", ["distance_km", "traffic_level", "delivery_time_min"], chunksize, fmt, path):
+        grid.update(chunk["distance_km"].to_numpy(), chunk["delivery_time_min"].to_numpy())
+        for level, values in chunk.groupby("traffic_level")["delivery_time_min"]:
+            traffic.setdefault(int(level), QuantileSketch()).update(values.to_numpy())
+    return {"grid": grid, "traffic": traffic}
+
+
+def clv_aggregates(chunksize=EDA_CHUNKSIZE, fmt=None, path=None):
+    clv = QuantileSketch()
+    moments = Moments(len(CLV_CORR_COLS))
+    for chunk in iter_clean("clv", CLV_CORR_COLS, chunksize, fmt, path):
+        clv.update(chunk["clv_next_12m"].to_numpy())
+        moments.update(chunk.to_numpy(np.float64))
+    corr = pd.DataFrame(moments.correlation(), index=CLV_CORR_COLS, columns=CLV_CORR_COLS)
+    return {"clv": clv, "corr": corr}
+
+
+def plot_footfall_time_series(agg):
+    plt.figure(figsize=(10, 4))
+    plt.plot(agg["daily"].index, agg["daily"].to_numpy())
+    plt.title("Daily Store Footfall Over Time")
+    plt.xlabel("Date")
+    plt.ylabel("Footfall")
+
+
+def plot_footfall_by_weekday(agg):
+    _, ax = plt.subplots(figsize=(8, 4))
+    ax.bxp([s.box_stats(d) for d, s in sorted(agg["weekday"].items())], showfliers=False)
+    ax.set_xlabel("day_of_week")
+    ax.set_ylabel("footfall")
+    plt.title("Footfall by Day of Week (0=Mon, 6=Sun)")
+
+
+def plot_delivery_distance_vs_time(agg):
+    x, y, counts = agg["grid"].dense()
+    fig, ax = plt.subplots(figsize=(8, 4))
+    mesh = ax.pcolormesh(x, y, np.ma.masked_equal(counts.T, 0), norm=LogNorm(), cmap="viridis")
+    fig.colorbar(mesh, ax=ax, label="Orders")
+    plt.title("Distance vs Delivery Time")
+    plt.xlabel("Distance (km)")
+    plt.ylabel("Delivery Time (min)")
+
+
+def plot_delivery_traffic_boxplot(agg):
+    _, ax = plt.subplots(figsize=(6, 4))
+    ax.bxp([s.box_stats(level) for level, s in sorted(agg["traffic"].items())], showfliers=False)
+    ax.set_xlabel("traffic_level")
+    ax.set_ylabel("delivery_time_min")
+    plt.title("Delivery Time by Traffic Level")
+
+
+def plot_clv_distribution(agg):
+    hist, edges = agg["clv"].histogram(30)
+    plt.figure(figsize=(8, 4))
+    plt.stairs(hist, edges, fill=True)
+    plt.title("Distribution of Customer Lifetime Value (Next 12m)")
+    plt.xlabel("CLV (₹)")
+    plt.ylabel("Count")
+
+
+def plot_clv_correlation_heatmap(agg):
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(agg["corr"], annot=True, fmt=".2f")
+    plt.title("Correlation Heatmap – CLV Features")
+
+
+# Same order as CHARTS
+AGGREGATES = {"footfall": footfall_aggregates, "delivery": delivery_aggregates, "clv": clv_aggregates}
+PLOTS = {
+    "footfall": [plot_footfall_time_series, plot_footfall_by_weekday],
+    "delivery": [plot_delivery_distance_vs_time, plot_delivery_traffic_boxplot],
+    "clv": [plot_clv_distribution, plot_clv_correlation_heatmap],
+}
+
+
+def save_chart(name, i, agg):
+    PLOTS[name][i](agg)
+    plt.tight_layout()
+    path = CHARTS_DIR / CHARTS[name][i]
+    plt.savefig(path)
+    plt.close()
+    return path
+
+
+def eda_streaming(name, chunksize=EDA_CHUNKSIZE):
+    agg = AGGREGATES[name](chunksize)
+    for i in range(len(CHARTS[name])):
+        print(f"✔ Saved chart → {save_chart(name, i, agg)}")
+
+
+def main_streaming(chunksize, jobs):
+    if jobs <= 1:
+        for name in AGGREGATES:
+            eda_streaming(name, chunksize)
+        return
+    # One pass per dataset in parallel; each chart is drawn in its own task once its aggregates are in
+    with ProcessPoolExecutor(jobs, mp_context=get_context("spawn")) as pool:
+        passes = {pool.submit(AGGREGATES[name], chunksize): name for name in AGGREGATES}
+        charts = []
+        for future in as_completed(passes):
+            name = passes[future]
+            agg = future.result()
+            charts += [pool.submit(save_chart, name, i, agg) for i in range(len(CHARTS[name]))]
+        for future in charts:
+            print(f"✔ Saved chart → {future.result()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Draw the EDA charts from the cleaned data.")
+    parser.add_argument("--streaming", action="store_true", default=EDA_STREAMING,
+                        help="one chunked pass + aggregates; for data that does not fit in memory")
+    parser.add_argument("--chunksize", type=int, default=EDA_CHUNKSIZE,
+                        help=f"rows per chunk with --streaming (default {EDA_CHUNKSIZE:,})")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="worker processes with --streaming (default: all cores)")
+    args = parser.parse_args()
+
+    print("\n=== PHASE 3: EXPLORATORY DATA ANALYSIS (EDA) ===\n")
+    if args.streaming:
+        main_streaming(args.chunksize, args.jobs)
+    else:
+        eda_footfall(streaming=False)
+        eda_delivery(streaming=False)
+        eda_clv(streaming=False)
+    print("\n✅ PHASE 3 DONE: Charts saved in outputs/charts.\n")
+
+
+if __name__ == "__main__":
+    main()
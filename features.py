@@ -0,0 +1,161 @@
+# features.py
+"""
+Column layouts and vectorized feature builders shared by the web app,
+the console app and the batch/bulk scoring paths.
+
+Every builder takes a mapping of column name -> 1-D array (a "column block")
+and returns the 2-D float matrix the corresponding model was trained on.
+"""
+import numpy as np
+
+# Model input columns, in the exact order used by train_models.py
+FOOTFALL_FEATURES = ["day_of_week", "is_weekend", "is_holiday", "promo_active", "month"]
+DELIVERY_FEATURES = [
+    "distance_km",
+    "num_items",
+    "order_value",
+    "time_of_day_bucket",
+    "traffic_level",
+    "rider_experience_months",
+]
+CLV_FEATURES = [
+    "tenure_months",
+    "orders_per_month",
+    "avg_order_value",
+    "recency_days",
+    "discount_usage_rate",
+    "return_rate",
+    "loyalty_index",
+    "monetary_value",
+]
+
+# Columns a caller has to supply (derived columns are computed here)
+FOOTFALL_INPUTS = ["day_of_week", "is_holiday", "promo_active", "month"]
+DELIVERY_INPUTS = list(DELIVERY_FEATURES)
+CLV_INPUTS = CLV_FEATURES[:6]
+
+# name -> (integer only, min, max); None = unbounded
+_RULES = {
+    "day_of_week": (True, 0, 6),
+    "is_holiday": (True, 0, 1),
+    "promo_active": (True, 0, 1),
+    "month": (True, 1, 12),
+    "distance_km": (False, 0, None),
+    "num_items": (True, 1, None),
+    "order_value": (False, 0, None),
+    "time_of_day_bucket": (True, 0, 2),
+    "traffic_level": (True, 1, 3),
+    "rider_experience_months": (True, 0, None),
+    "tenure_months": (True, 0, None),
+    "orders_per_month": (False, 0, None),
+    "avg_order_value": (False, 0, None),
+    "recency_days": (True, 0, None),
+    "discount_usage_rate": (False, 0, 1),
+    "return_rate": (False, 0, 1),
+}
+
+
+def invalid_rows(col, arr):
+    """Boolean mask of the values in a float array that break col's rule."""
+    integer, lo, hi = _RULES[col]
+    bad = ~np.isfinite(arr)
+    if integer:
+        bad |= arr != np.round(arr)
+    if lo is not None:
+        bad |= arr < lo
+    if hi is not None:
+        bad |= arr > hi
+    return bad
+
+
+def validate_block(data, required):
+    """
+    Check a column block in one pass per column and return it as float arrays.
+
+    Raises ValueError naming the first offending column and row.
+    """
+    missing = [c for c in required if c not in data]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    block = {}
+    n_rows = None
+    for col in required:
+        try:
+            arr = np.asarray(data[col], dtype=np.float64).reshape(-1)
+        except (TypeError, ValueError):
+            raise ValueError(f"Column '{col}' must be numeric")
+
+        if n_rows is None:
+            n_rows = arr.shape[0]
+        elif arr.shape[0] != n_rows:
+            raise ValueError(f"Column '{col}' has {arr.shape[0]} rows, expected {n_rows}")
+
+        bad = invalid_rows(col, arr)
+        if bad.any():
+            row = int(np.flatnonzero(bad)[0])
+            raise ValueError(f"Invalid value for '{col}' at row {row}: {arr[row]:g}")
+
+        block[col] = arr
+
+    if not n_rows:
+        raise ValueError("No rows to score")
+    return block
+
+
+# ---------------------------
+# Feature matrices
+# ---------------------------
+def footfall_matrix(block):
+    day_of_week = np.asarray(block["day_of_week"], dtype=np.float64)
+    is_weekend = (day_of_week >= 5).astype(np.float64)
+    return np.column_stack([
+        day_of_week,
+        is_weekend,
+        block["is_holiday"],
+        block["promo_active"],
+        block["month"],
+    ]).astype(np.float64, copy=False)
+
+
+def delivery_matrix(block):
+    return np.column_stack([block[c] for c in DELIVERY_FEATURES]).astype(np.float64, copy=False)
+
+
+def clv_matrix(block):
+    discount_usage_rate = np.asarray(block["discount_usage_rate"], dtype=np.float64)
+    return_rate = np.asarray(block["return_rate"], dtype=np.float64)
+    orders_per_month = np.asarray(block["orders_per_month"], dtype=np.float64)
+    avg_order_value = np.asarray(block["avg_order_value"], dtype=np.float64)
+
+    loyalty_index = (1 - discount_usage_rate) * (1 - return_rate)
+    monetary_value = orders_per_month * avg_order_value
+
+    return np.column_stack([
+        block["tenure_months"],
+        orders_per_month,
+        avg_order_value,
+        block["recency_days"],
+        discount_usage_rate,
+        return_rate,
+        loyalty_index,
+        monetary_value,
+    ]).astype(np.float64, copy=False)
+
+
+# ---------------------------
+# Labels (same thresholds as the single-row pages)
+# ---------------------------
+def footfall_level(pred):
+    pred = np.asarray(pred)
+    return np.select([pred > 500, pred > 300], ["High", "Medium"], "Low")
+
+
+def delivery_risk(pred):
+    pred = np.asarray(pred)
+    return np.select([pred > 45, pred > 30], ["High", "Moderate"], "Low")
+
+
+def clv_segment(pred):
+    pred = np.asarray(pred)
+    return np.select([pred > 50000, pred > 20000], ["High Value", "Medium Value"], "Low Value")
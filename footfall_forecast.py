@@ -0,0 +1,195 @@
+# footfall_forecast.py
+"""
+Materialized footfall predictions.
+
+The footfall model only sees day_of_week, is_weekend (derived), is_holiday,
+promo_active and month, so every possible input fits in a 7 x 2 x 2 x 12 table.
+train_models.py stores that table on the model as `lookup_table_`; serving
+code indexes into it instead of calling predict().
+
+Per-store models (StoreModels) keep only the coefficients, one row per
+store, and build a store's table when it is first asked for.
+"""
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from features import FOOTFALL_FEATURES
+
+TABLE_SHAPE = (7, 2, 2, 12)  # day_of_week, is_holiday, promo_active, month-1
+
+
+def feature_grid():
+    """Every possible footfall input, one column per feature, in table order."""
+    dow, hol, promo, month = np.meshgrid(
+        np.arange(7), np.arange(2), np.arange(2), np.arange(1, 13), indexing="ij"
+    )
+    return {
+        "day_of_week": dow.ravel(),
+        "is_weekend": (dow.ravel() >= 5).astype(int),
+        "is_holiday": hol.ravel(),
+        "promo_active": promo.ravel(),
+        "month": month.ravel(),
+    }
+
+
+def build_table(model):
+    """Predict every point of the input space once and return the table."""
+    import pandas as pd
+
+    grid = pd.DataFrame(feature_grid())[FOOTFALL_FEATURES]
+    return model.predict(grid).reshape(TABLE_SHAPE).astype(np.float64)
+
+
+class FootfallTable:
+    """Drop-in for the footfall model's predict() backed by the lookup table."""
+
+    def __init__(self, table):
+        self.table = np.ascontiguousarray(table, dtype=np.float64)
+
+    @classmethod
+    def from_model(cls, model):
+        table = getattr(model, "lookup_table_", None)
+        if table is None:  # artifact trained before the table existed
+            table = build_table(model)
+        return cls(table)
+
+    def lookup(self, day_of_week, is_holiday, promo_active, month):
+        return self.table[
+            np.asarray(day_of_week, dtype=np.intp),
+            np.asarray(is_holiday, dtype=np.intp),
+            np.asarray(promo_active, dtype=np.intp),
+            np.asarray(month, dtype=np.intp) - 1,
+        ]
+
+    def predict(self, X):
+        # X columns follow FOOTFALL_FEATURES; is_weekend (col 1) is implied by the day
+        X = np.asarray(X)
+        return self.lookup(X[:, 0], X[:, 2], X[:, 3], X[:, 4])
+
+    # ---------------------------
+    # Calendar forecasts
+    # ---------------------------
+    def forecast(self, start, end, holidays=(), promos=()):
+        """
+        Forecast every day in [start, end].
+
+        holidays: iterable of dates.
+        promos: iterable of dates or (first, last) date pairs.
+        Returns (dates, predictions) as NumPy arrays.
+        """
+        dates, cal = calendar_features(start, end, holidays, promos)
+        return dates, self.lookup(cal["day_of_week"], cal["is_holiday"], cal["promo_active"], cal["month"])
+
+
+def calendar_features(start, end, holidays=(), promos=()):
+    """Every day in [start, end] and its footfall features (see FootfallTable.forecast)."""
+    dates = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    days = dates.astype(np.int64)
+
+    day_of_week = (days + 3) % 7  # 1970-01-01 was a Thursday
+    month = dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+
+    for name, value in (("holidays", holidays), ("promos", promos)):
+        if not isinstance(value, (list, tuple, np.ndarray)):
+            raise ValueError(f"'{name}' must be a list of dates")
+    is_holiday = np.isin(dates, np.asarray(list(holidays), dtype="datetime64[D]"))
+
+    is_promo = np.zeros(dates.shape, dtype=bool)
+    single = []
+    for p in promos:
+        if isinstance(p, (list, tuple)):
+            if len(p) != 2:
+                raise ValueError(f"A promo range must be a [first, last] pair, got {p}")
+            first, last = np.datetime64(p[0], "D"), np.datetime64(p[1], "D")
+            is_promo |= (dates >= first) & (dates <= last)
+        else:
+            single.append(p)
+    if single:
+        is_promo |= np.isin(dates, np.asarray(single, dtype="datetime64[D]"))
+
+    return dates, {
+        "day_of_week": day_of_week,
+        "is_weekend": (day_of_week >= 5).astype(np.int64),
+        "is_holiday": is_holiday.astype(np.int64),
+        "promo_active": is_promo.astype(np.int64),
+        "month": month,
+    }
+
+
+class StoreModels:
+    """
+    Per-store footfall models: one (stores x features) coefficient matrix.
+
+    The arrays are memory-mapped and store ids are found with a binary search
+    in the sorted id array, so loading costs the same for 10 or 10,000 stores.
+    A store's lookup table is built from its coefficient row on first use and
+    kept in a bounded LRU; whole-chain forecasts skip the tables and do one
+    matrix product for every store and day.
+    """
+
+    def __init__(self, stores, coef, intercept, cache_size=256):
+        self.stores = stores        # (stores,) sorted ids
+        self.coef = coef            # (stores, features), FOOTFALL_FEATURES order
+        self.intercept = intercept  # (stores,)
+        self.cache_size = cache_size
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    @classmethod
+    def load(cls, path, cache_size=256, mmap_mode="r"):
+        path = Path(path)
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode)
+                  for name in ("stores", "coef", "intercept")}
+        return cls(cache_size=cache_size, **arrays)
+
+    def __len__(self):
+        return len(self.stores)
+
+    def index(self, stores):
+        """Store ids -> row numbers; KeyError for an unknown store."""
+        ids = np.asarray(stores, dtype=str)
+        pos = np.minimum(np.searchsorted(self.stores, ids), len(self.stores) - 1)
+        unknown = self.stores[pos] != ids
+        if unknown.any():
+            raise KeyError(ids[unknown][0].item())
+        return pos
+
+    def table(self, store):
+        """The store's FootfallTable (LRU-cached)."""
+        with self._lock:
+            table = self._tables.get(store)
+            if table is not None:
+                self._tables.move_to_end(store)
+                self.hits += 1
+                return table
+        i = int(self.index([store])[0])
+        grid = feature_grid()
+        G = np.column_stack([grid[f] for f in FOOTFALL_FEATURES]).astype(np.float64)
+        table = FootfallTable((G @ self.coef[i] + self.intercept[i]).reshape(TABLE_SHAPE))
+        with self._lock:
+            self.misses += 1
+            self._tables[store] = table
+            while len(self._tables) > self.cache_size:
+                self._tables.popitem(last=False)
+                self.evictions += 1
+        return table
+
+    def forecast(self, start, end, holidays=(), promos=(), stores=None):
+        """(store ids, dates, predictions (stores x days)) in one matrix product."""
+        dates, cal = calendar_features(start, end, holidays, promos)
+        X = np.column_stack([cal[f] for f in FOOTFALL_FEATURES]).astype(np.float64)
+        if stores is None:
+            ids, coef, intercept = self.stores, self.coef, self.intercept
+        else:
+            rows = self.index(stores)
+            ids, coef, intercept = self.stores[rows], self.coef[rows], self.intercept[rows]
+        return np.asarray(ids), dates, coef @ X.T + np.asarray(intercept)[:, None]
+
+    def cache_info(self):
+        with self._lock:
+            return {"stores": len(self.stores), "cached": len(self._tables), "capacity": self.cache_size,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
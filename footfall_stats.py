@@ -0,0 +1,360 @@
+# footfall_stats.py
+"""
+Running sufficient statistics for the footfall linear model.
+
+A least-squares fit only needs Σ w·z·zᵀ, Σ w·z·y and the row counts
+(z = [1, features]), so new days are folded in with O(features²) work per
+row instead of a refit over the whole history. Optional exponential
+forgetting (0 < forget < 1, per day) lets old seasons fade out.
+
+Statistics are kept per store, stacked into (stores, p, p) / (stores, p)
+arrays, so thousands of store models are updated with one bincount pass and
+solved with one batched np.linalg.solve. The solve centres the statistics
+exactly like scikit-learn's LinearRegression does, so on the same rows (and
+sample weights) the coefficients match a full refit.
+
+    python footfall_stats.py --append new_days.csv [--forget 0.995]
+
+Files with a store_id column update the per-store models (models/footfall_stores/,
+see fit_stores / export_store_models); others update the single-store model.
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from features import FOOTFALL_FEATURES
+from footfall_forecast import TABLE_SHAPE, feature_grid
+
+N_TERMS = len(FOOTFALL_FEATURES) + 1  # intercept + features
+DEFAULT_STORE = "default"
+_ARRAYS = ("xtx", "xty", "yty", "count")
+
+
+def _group_sum(idx, values, n_groups):
+    """Column-wise sums of values (rows x k) per group -> (n_groups x k)."""
+    return np.stack(
+        [np.bincount(idx, weights=values[:, j], minlength=n_groups) for j in range(values.shape[1])],
+        axis=1,
+    )
+
+
+def to_days(dates):
+    """Dates -> int64 days since 1970-01-01 (the clock used for forgetting)."""
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+class FootfallStats:
+    def __init__(self, xtx, xty, yty, count, stores, last_day=None):
+        self.xtx = xtx          # (stores, p, p)  Σ w z zᵀ
+        self.xty = xty          # (stores, p)     Σ w z y
+        self.yty = yty          # (stores,)       Σ w y²
+        self.count = count      # (stores,)       rows seen (unweighted)
+        self.stores = list(stores)
+        self.last_day = last_day
+        self._index = {s: i for i, s in enumerate(self.stores)}
+
+    @classmethod
+    def empty(cls, stores=(DEFAULT_STORE,)):
+        n = len(stores)
+        return cls(np.zeros((n, N_TERMS, N_TERMS)), np.zeros((n, N_TERMS)),
+                   np.zeros(n), np.zeros(n, dtype=np.int64), stores)
+
+    @property
+    def n_stores(self):
+        return len(self.stores)
+
+    def store_index(self, stores):
+        """Row store ids -> indices, adding stores seen for the first time."""
+        stores = np.asarray(stores)
+        uniq, inverse = np.unique(stores, return_inverse=True)
+        new = [s for s in uniq.tolist() if s not in self._index]
+        if new:
+            k = len(new)
+            self.xtx = np.concatenate([self.xtx, np.zeros((k, N_TERMS, N_TERMS))])
+            self.xty = np.concatenate([self.xty, np.zeros((k, N_TERMS))])
+            self.yty = np.concatenate([self.yty, np.zeros(k)])
+            self.count = np.concatenate([self.count, np.zeros(k, dtype=np.int64)])
+            for s in new:
+                self._index[s] = len(self.stores)
+                self.stores.append(s)
+        return np.array([self._index[s] for s in uniq.tolist()], dtype=np.intp)[inverse]
+
+    # ---------------------------
+    # Updates
+    # ---------------------------
+    def update(self, X, y, stores=None, days=None, forget=1.0):
+        """
+        Add rows (X columns follow FOOTFALL_FEATURES).
+
+        stores: store id per row (default: the single default store).
+        days: day number per row (see to_days); needed when forget < 1.
+        forget: per-day decay; statistics from d days before the newest row
+        are weighted forget**d.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != N_TERMS - 1 or len(X) != len(y):
+            raise ValueError(f"Expected X with {N_TERMS - 1} columns and one target per row")
+        if not 0 < forget <= 1:
+            raise ValueError("forget must be in (0, 1]")
+        n = len(y)
+        idx = np.zeros(n, dtype=np.intp) if stores is None else self.store_index(stores)
+
+        w = np.ones(n)
+        if days is not None:
+            days = np.asarray(days, dtype=np.int64)
+            now = int(days.max()) if n else self.last_day
+            if self.last_day is not None and now is not None:
+                now = max(now, self.last_day)
+            if forget < 1:
+                if self.last_day is not None:
+                    decay = forget ** (now - self.last_day)
+                    self.xtx *= decay
+                    self.xty *= decay
+                    self.yty *= decay
+                w = forget ** (now - days).astype(np.float64)
+            self.last_day = now
+        elif forget < 1:
+            raise ValueError("Exponential forgetting needs the day of each row")
+
+        Z = np.empty((n, N_TERMS))
+        Z[:, 0] = 1.0
+        Z[:, 1:] = X
+        S = self.n_stores
+        outer = (Z[:, :, None] * Z[:, None, :]).reshape(n, -1) * w[:, None]
+        self.xtx += _group_sum(idx, outer, S).reshape(S, N_TERMS, N_TERMS)
+        self.xty += _group_sum(idx, Z * (w * y)[:, None], S)
+        self.yty += np.bincount(idx, weights=w * y * y, minlength=S)
+        self.count += np.bincount(idx, minlength=S)
+        return self
+
+    def merge(self, other):
+        """Add another set of statistics (built without forgetting), store by store."""
+        idx = self.store_index(other.stores)
+        self.xtx[idx] += other.xtx
+        self.xty[idx] += other.xty
+        self.yty[idx] += other.yty
+        self.count[idx] += other.count
+        if other.last_day is not None:
+            self.last_day = other.last_day if self.last_day is None else max(self.last_day, other.last_day)
+        return self
+
+    # ---------------------------
+    # Solving
+    # ---------------------------
+    def solve(self):
+        """Return (coef (stores x features), intercept (stores,)) for every store at once."""
+        n_w = self.xtx[:, 0, 0]
+        sx, sxx = self.xtx[:, 0, 1:], self.xtx[:, 1:, 1:]
+        sy, sxy = self.xty[:, 0], self.xty[:, 1:]
+        seen = n_w > 0
+        safe = np.where(seen, n_w, 1.0)
+
+        # Centred normal equations (what LinearRegression(fit_intercept=True) solves)
+        C = sxx - sx[:, :, None] * sx[:, None, :] / safe[:, None, None]
+        c = sxy - sx * (sy / safe)[:, None]
+
+        coef = np.zeros((self.n_stores, N_TERMS - 1))
+        full = seen & (np.linalg.matrix_rank(C) == N_TERMS - 1)
+        if full.any():
+            coef[full] = np.linalg.solve(C[full], c[full][..., None])[..., 0]
+        # Too few distinct days for a unique fit: minimum-norm solution, as lstsq gives
+        partial = seen & ~full
+        if partial.any():
+            coef[partial] = (np.linalg.pinv(C[partial]) @ c[partial][..., None])[..., 0]
+
+        intercept = np.where(seen, (sy - (sx * coef).sum(axis=1)) / safe, 0.0)
+        return coef, intercept
+
+    def squared_error(self, coef, intercept):
+        """
+        Per-store (residual, total) sums of squares of these rows under the given
+        fit, straight from the statistics: Σ(y - zᵀb)² = yᵀy - 2bᵀZᵀy + bᵀZᵀZb.
+        """
+        b = np.column_stack([intercept, coef])
+        sse = self.yty - 2 * (b * self.xty).sum(axis=1) + np.einsum("si,sij,sj->s", b, self.xtx, b)
+        n = self.xtx[:, 0, 0]
+        sst = self.yty - self.xty[:, 0] ** 2 / np.where(n > 0, n, 1.0)
+        return np.maximum(sse, 0.0), sst
+
+    def predict(self, X, stores=None):
+        coef, intercept = self.solve()
+        X = np.asarray(X, dtype=np.float64)
+        if stores is None:
+            return X @ coef[0] + intercept[0]
+        idx = np.array([self._index[s] for s in np.asarray(stores).tolist()], dtype=np.intp)
+        return np.einsum("ij,ij->i", X, coef[idx]) + intercept[idx]
+
+    def lookup_tables(self, coef=None, intercept=None):
+        """(stores, 7, 2, 2, 12) precomputed predictions, see footfall_forecast.py."""
+        if coef is None:
+            coef, intercept = self.solve()
+        grid = feature_grid()
+        G = np.column_stack([grid[f] for f in FOOTFALL_FEATURES]).astype(np.float64)
+        return (coef @ G.T + intercept[:, None]).reshape((self.n_stores,) + TABLE_SHAPE)
+
+    # ---------------------------
+    # Persistence (next to the other footfall arrays)
+    # ---------------------------
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAYS:
+            _save_atomic(path / f"stats_{name}.npy", getattr(self, name))
+        meta = {"features": FOOTFALL_FEATURES, "stores": self.stores, "last_day": self.last_day}
+        (path / "stats.json").write_text(json.dumps(meta))
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        path = Path(path)
+        meta = json.loads((path / "stats.json").read_text())
+        if meta["features"] != FOOTFALL_FEATURES:
+            raise ValueError("Footfall statistics were built for different features; retrain the model")
+        arrays = {name: np.load(path / f"stats_{name}.npy", mmap_mode=mmap_mode) for name in _ARRAYS}
+        return cls(stores=meta["stores"], last_day=meta["last_day"], **arrays)
+
+
+def _save_atomic(path, array):
+    # A running server may have the old file memory-mapped: replace, never rewrite in place
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(tmp, path)
+
+
+def export_serving_arrays(stats, path):
+    """Rewrite coef / intercept / lookup table of the default store from the statistics."""
+    coef, intercept = stats.solve()
+    table = stats.lookup_tables(coef, intercept)
+    i = stats.stores.index(DEFAULT_STORE) if DEFAULT_STORE in stats.stores else 0
+    _save_atomic(Path(path) / "coef.npy", coef[i])
+    _save_atomic(Path(path) / "intercept.npy", intercept[i:i + 1])
+    _save_atomic(Path(path) / "lookup_table.npy", table[i])
+    return coef[i], intercept[i], table[i]
+
+
+# ---------------------------
+# Per-store models (train_models.py)
+# ---------------------------
+def _shard_stats(X, y, stores, days, test):
+    """Train and holdout statistics of one shard of rows."""
+    train = FootfallStats.empty(stores=()).update(X[~test], y[~test], stores[~test], days[~test])
+    holdout = FootfallStats.empty(stores=()).update(X[test], y[test], stores[test], days[test])
+    return train, holdout
+
+
+def fit_stores(shards, n_jobs=1, holdout_every=5, holdout_rows=None):
+    """
+    Fit every store in one pass over the data.
+
+    shards yields (X, y, stores, days) row blocks; every holdout_every-th row
+    is held out, or the rows flagged in the boolean array holdout_rows (one
+    entry per row, in shard order) when given. Shards are summarised in parallel worker processes when
+    n_jobs > 1 and merged per store, then all stores are solved at once.
+    Returns (train stats, holdout stats, coef, intercept).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    train, holdout = FootfallStats.empty(stores=()), FootfallStats.empty(stores=())
+    pool = ProcessPoolExecutor(n_jobs, mp_context=get_context("spawn")) if n_jobs > 1 else None
+    pending = []
+    offset = 0
+    try:
+        for X, y, stores, days in shards:
+            if holdout_rows is not None:
+                test = np.asarray(holdout_rows[offset:offset + len(y)], dtype=bool)
+            else:
+                test = (np.arange(offset, offset + len(y)) % holdout_every) == 0
+            offset += len(y)
+            if pool is None:
+                pending.append(_shard_stats(X, y, stores, days, test))
+            else:
+                pending.append(pool.submit(_shard_stats, X, y, stores, days, test))
+            if len(pending) > 2 * max(n_jobs, 1):  # bounded memory: merge as we go
+                t, h = pending.pop(0) if pool is None else pending.pop(0).result()
+                train.merge(t)
+                holdout.merge(h)
+        for item in pending:
+            t, h = item if pool is None else item.result()
+            train.merge(t)
+            holdout.merge(h)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    coef, intercept = train.solve()
+    return train, holdout, coef, intercept
+
+
+def export_store_models(stats, path, coef=None, intercept=None):
+    """Write the serving arrays (ids sorted for binary search) and the statistics."""
+    if coef is None:
+        coef, intercept = stats.solve()
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    ids = np.asarray(stats.stores, dtype=str)
+    order = np.argsort(ids, kind="stable")
+    _save_atomic(path / "stores.npy", ids[order])
+    _save_atomic(path / "coef.npy", coef[order])
+    _save_atomic(path / "intercept.npy", intercept[order])
+    stats.save(path)
+    return ids[order]
+
+
+def main():
+    import joblib
+    import pandas as pd
+
+    from config import FOOTFALL_ARRAYS, FOOTFALL_MODEL, FOOTFALL_STORES, FOOTFALL_FORGET
+    from prepare_data import FOOTFALL_DTYPES, clean_footfall
+
+    parser = argparse.ArgumentParser(description="Fold new days into the footfall model without a refit.")
+    parser.add_argument("--append", required=True, type=Path,
+                        help="CSV in the footfall_data.csv format (with store_id: per-store models)")
+    parser.add_argument("--forget", type=float, default=FOOTFALL_FORGET,
+                        help=f"per-day decay of older data, 1 = none (default {FOOTFALL_FORGET})")
+    args = parser.parse_args()
+
+    if not (FOOTFALL_ARRAYS / "stats.json").exists():
+        raise SystemExit("No footfall statistics found; run train_models.py first.")
+
+    start = time.perf_counter()
+    df = clean_footfall(pd.read_csv(args.append, parse_dates=["date"], dtype=FOOTFALL_DTYPES))
+
+    if "store_id" in df.columns:
+        # Per-store rows update the per-store models (new stores are added)
+        stores_stats = (FootfallStats.load(FOOTFALL_STORES) if (FOOTFALL_STORES / "stats.json").exists()
+                        else FootfallStats.empty(stores=()))
+        stores_stats.update(df[FOOTFALL_FEATURES].to_numpy(), df["footfall"].to_numpy(),
+                            stores=df["store_id"].astype(str).to_numpy(), days=to_days(df["date"]),
+                            forget=args.forget)
+        export_store_models(stores_stats, FOOTFALL_STORES)
+        print(f"✔ Added {len(df):,} day(s) across {stores_stats.n_stores:,} store(s) in "
+              f"{time.perf_counter() - start:.3f}s (forget={args.forget})")
+        print(f"   ✔ Updated {FOOTFALL_STORES} (restart or reload the app to serve it)")
+        return
+
+    stats = FootfallStats.load(FOOTFALL_ARRAYS)
+    stats.update(df[FOOTFALL_FEATURES].to_numpy(), df["footfall"].to_numpy(),
+                 days=to_days(df["date"]), forget=args.forget)
+    stats.save(FOOTFALL_ARRAYS)
+    coef, intercept, table = export_serving_arrays(stats, FOOTFALL_ARRAYS)
+
+    # Keep the pickled model in step with the arrays
+    model = joblib.load(FOOTFALL_MODEL)
+    model.coef_, model.intercept_, model.lookup_table_ = coef, float(intercept), table
+    joblib.dump(model, FOOTFALL_MODEL)
+
+    print(f"✔ Added {len(df):,} day(s) in {time.perf_counter() - start:.3f}s (forget={args.forget})")
+    print("   Coefficients: " + ", ".join(f"{f}={c:+.3f}" for f, c in zip(FOOTFALL_FEATURES, coef))
+          + f", intercept={intercept:.2f}")
+    print(f"   ✔ Updated {FOOTFALL_ARRAYS} and {FOOTFALL_MODEL.name} (restart or reload the app to serve it)")
+
+
+if __name__ == "__main__":
+    main()
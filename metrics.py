@@ -0,0 +1,180 @@
+# metrics.py
+"""
+In-process metrics in the Prometheus text format (served at /metrics).
+
+Histograms keep one array of bucket counts per label set; observe() is a
+bisect plus a few additions under a lock (about a microsecond), so the
+instrumentation can stay on in production. Values that already live
+elsewhere (model load times, cache/coalescer counters, process memory) are
+read by collector callbacks only when /metrics is scraped.
+
+Each worker process keeps its own numbers; scrape every worker (or run one
+process per port) when serving with several.
+"""
+import bisect
+import threading
+import time
+
+# Seconds: 10 µs .. 10 s, roughly x2.5 apart
+LATENCY_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Rows per predict() call
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(buckets)
+        self._lock = threading.Lock()
+        self._children = {}  # label values -> [per-bucket counts..., sum, count]
+
+    def observe(self, value, labels=()):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            child = self._children.get(labels)
+            if child is None:
+                child = self._children[labels] = [0] * (len(self.bounds) + 1) + [0.0, 0]
+            child[i] += 1
+            child[-2] += value
+            child[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            children = {k: list(v) for k, v in self._children.items()}
+        for labels in sorted(children):
+            child = children[labels]
+            cumulative = 0
+            for bound, n in zip(self.bounds + (float("inf"),), child[:-2]):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(child[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {child[-1]}")
+        return lines
+
+
+class StageTimer:
+    """Times consecutive stages of one request: mark() closes the stage that just ran."""
+
+    __slots__ = ("hist", "route", "last")
+
+    def __init__(self, hist, route):
+        self.hist = hist
+        self.route = route
+        self.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.hist.observe(now - self.last, (self.route, stage))
+        self.last = now
+
+
+class NullTimer:
+    """Stand-in for StageTimer when metrics are switched off."""
+
+    def mark(self, stage):
+        pass
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms = []
+        self._collectors = []
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        hist = Histogram(name, help, labelnames, buckets)
+        self._histograms.append(hist)
+        return hist
+
+    def collector(self, fn):
+        """fn() -> iterable of (name, type, help, [(labels dict, value), ...]), called per scrape."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for hist in self._histograms:
+            lines.extend(hist.render())
+        for fn in self._collectors:
+            for name, kind, help, samples in fn():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    label_text = _labels(list(labels), list(labels.values()))
+                    lines.append(f"{name}{label_text} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# ---------------------------
+# Process metrics (Linux /proc, standard Prometheus names)
+# ---------------------------
+def _process_samples():
+    import resource
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    out = [("process_cpu_seconds_total", "counter", "User and system CPU time.",
+            [({}, usage.ru_utime + usage.ru_stime)])]
+    try:
+        status = {}
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("VmRSS", "VmHWM", "VmSize", "Threads"):
+                    status[key] = int(rest.split()[0])
+    except OSError:
+        return out
+    out += [
+        ("process_resident_memory_bytes", "gauge", "Resident memory size.", [({}, status.get("VmRSS", 0) * 1024)]),
+        ("process_resident_memory_peak_bytes", "gauge", "Peak resident memory size.",
+         [({}, status.get("VmHWM", 0) * 1024)]),
+        ("process_virtual_memory_bytes", "gauge", "Virtual memory size.", [({}, status.get("VmSize", 0) * 1024)]),
+        ("process_threads", "gauge", "OS threads.", [({}, status.get("Threads", 0))]),
+    ]
+    return out
+
+
+_START = time.time()
+
+
+def _uptime_samples():
+    return [("process_start_time_seconds", "gauge", "Start time since the epoch.", [({}, _START)])]
+
+
+metrics = MetricsRegistry()
+metrics.collector(_process_samples)
+metrics.collector(_uptime_samples)
+
+# Shared instruments (labels are route templates / model names, so cardinality stays bounded)
+HTTP_SECONDS = metrics.histogram(
+    "rp360_http_request_seconds", "Request latency by route, method and status.",
+    ("route", "method", "status"))
+STAGE_SECONDS = metrics.histogram(
+    "rp360_route_stage_seconds", "Time per request stage (parse, features, predict, render, ...).",
+    ("route", "stage"))
+PREDICT_SECONDS = metrics.histogram(
+    "rp360_model_predict_seconds", "Time per model predict call.", ("model",))
+PREDICT_ROWS = metrics.histogram(
+    "rp360_model_predict_rows", "Rows per model predict call.", ("model",), SIZE_BUCKETS)
@@ -0,0 +1,152 @@
+# model_client.py
+"""
+Thin client for the local model daemon (model_server.py).
+
+Standard library only (no NumPy, scikit-learn or XGBoost), so a fresh
+process gets its first prediction in a few milliseconds:
+
+    from model_client import connect
+    client = connect()                  # None when no daemon is running
+    if client:
+        client.predict("delivery", [[4.2, 3, 850, 1, 2, 12]])[0]
+
+Rows may be lists of numbers or a 2-D NumPy array (sent as-is, without
+copying row by row). Results are array('d') objects, which index like lists
+and convert with np.frombuffer(result) when NumPy is around.
+
+Wire format (little-endian, one request/response at a time per connection):
+
+    request   <BBHII  op, model, n_quantiles, rows, cols
+              n_quantiles x f8, then rows x cols x f8 (row-major)
+    response  <BII    status, a, b
+              STATUS_ARRAY: a x b x f8 (rows x values per row)
+              STATUS_ERROR / STATUS_TEXT: a bytes of UTF-8 (b = 0)
+
+OP_QUANTILES (delivery) answers with 1 + n_quantiles values per row: the
+mean, then each quantile.
+"""
+import socket
+import struct
+import sys
+from array import array
+
+from config import MODEL_SOCKET
+
+MODELS = ("footfall", "delivery", "clv")
+OP_PING, OP_PREDICT, OP_QUANTILES, OP_STATUS, OP_RELOAD, OP_SHUTDOWN = range(6)
+STATUS_ARRAY, STATUS_ERROR, STATUS_TEXT = range(3)
+
+REQUEST = struct.Struct("<BBHII")
+RESPONSE = struct.Struct("<BII")
+_SWAP = sys.byteorder == "big"
+
+
+class ModelServerError(RuntimeError):
+    """The daemon refused a request (bad model name, wrong column count, ...)."""
+
+
+def pack_floats(values):
+    out = array("d", values)
+    if _SWAP:
+        out.byteswap()
+    return out.tobytes()
+
+
+def unpack_floats(raw):
+    out = array("d")
+    out.frombytes(raw)
+    if _SWAP:
+        out.byteswap()
+    return out
+
+
+def recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:])
+        if k == 0:
+            raise ConnectionError("model daemon closed the connection")
+        got += k
+    return bytes(buf)
+
+
+def _rows_payload(rows):
+    if hasattr(rows, "dtype"):  # NumPy array: one buffer copy, no per-value work
+        block = rows.astype("<f8", order="C", copy=False)
+        if block.ndim == 1:
+            block = block.reshape(1, -1)
+        return block.shape[0], block.shape[1], block.tobytes()
+    rows = [list(r) for r in rows]
+    n_cols = len(rows[0]) if rows else 0
+    if any(len(r) != n_cols for r in rows):
+        raise ValueError("All rows must have the same number of values")
+    return len(rows), n_cols, pack_floats(v for r in rows for v in r)
+
+
+class ModelClient:
+    def __init__(self, path=MODEL_SOCKET, timeout=30.0):
+        self.path = str(path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(self.path)
+        except OSError:
+            self.sock.close()
+            raise
+
+    def _call(self, op, model=0, quantiles=(), rows=None):
+        n_rows, n_cols, payload = (0, 0, b"") if rows is None else _rows_payload(rows)
+        head = REQUEST.pack(op, model, len(quantiles), n_rows, n_cols)
+        self.sock.sendall(head + pack_floats(quantiles) + payload)
+
+        status, a, b = RESPONSE.unpack(recv_exact(self.sock, RESPONSE.size))
+        if status == STATUS_ARRAY:
+            return a, b, unpack_floats(recv_exact(self.sock, a * b * 8))
+        text = recv_exact(self.sock, a).decode("utf-8")
+        if status == STATUS_ERROR:
+            raise ModelServerError(text)
+        return text
+
+    def ping(self):
+        self._call(OP_PING)
+        return True
+
+    def predict(self, model, rows):
+        """One prediction per row, as array('d')."""
+        _, _, values = self._call(OP_PREDICT, MODELS.index(model), rows=rows)
+        return values
+
+    def predict_quantiles(self, model, rows, quantiles):
+        """(mean per row, [values per row for each quantile]), like ForestPredictor.predict_quantiles()."""
+        _, width, values = self._call(OP_QUANTILES, MODELS.index(model), tuple(quantiles), rows)
+        return values[0::width], [values[1 + i::width] for i in range(width - 1)]
+
+    def status(self):
+        """The daemon's registry.stats() as a JSON string."""
+        return self._call(OP_STATUS)
+
+    def reload(self):
+        """Re-read every artifact (after re-training); returns the load times as a JSON string."""
+        return self._call(OP_RELOAD)
+
+    def shutdown(self):
+        self._call(OP_SHUTDOWN)
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def connect(path=MODEL_SOCKET, timeout=30.0):
+    """A connected ModelClient, or None when no daemon is listening on `path`."""
+    try:
+        return ModelClient(path, timeout)
+    except OSError:  # no socket file, stale socket, no permission
+        return None
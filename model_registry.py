@@ -0,0 +1,212 @@
+# model_registry.py
+"""
+Lazily loaded, memory-mapped model artifacts.
+
+Nothing is loaded at import time. The first `registry.get(name)` loads that
+model (thread-safe, once per process) and records how long it took and how
+much memory it added. Array artifacts are opened with np.load(mmap_mode="r"),
+so every worker process on a machine shares the same pages through the OS
+page cache instead of holding a private copy:
+
+    footfall          models/footfall/*.npy        (lookup table, mmap)
+    footfall_stores   models/footfall_stores/*.npy (per-store coefficients, mmap)
+    delivery          models/delivery_forest/*.npy (CompactForest, mmap)
+                      or models/delivery_forest_small/ (RP360_COMPRESSED_FOREST=1)
+    delivery_sklearn  models/delivery_model.pkl    (only for large batches)
+    clv               models/clv_model.ubj         (XGBoost native format)
+
+Older artifacts without the exported files fall back to the .pkl models.
+"""
+import mmap
+import threading
+import time
+
+import numpy as np
+
+from config import (
+    FOOTFALL_MODEL, DELIVERY_MODEL, CLV_MODEL,
+    FOOTFALL_ARRAYS, FOOTFALL_STORES, DELIVERY_FOREST, DELIVERY_FOREST_SMALL, CLV_BOOSTER,
+    COMPACT_FOREST_ENABLED, COMPACT_FOREST_MAX_ROWS, COMPRESSED_FOREST_ENABLED, FOOTFALL_STORE_CACHE,
+)
+
+
+def _rss_bytes():
+    """Current resident set size (Linux), or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    import resource
+    return pages * resource.getpagesize()
+
+
+def _is_mapped(arr):
+    while arr is not None:
+        if isinstance(arr, (np.memmap, mmap.mmap)):
+            return True
+        arr = getattr(arr, "base", None)
+    return False
+
+
+def _array_bytes(obj):
+    """Split the NumPy arrays held by obj into (mapped, heap) bytes."""
+    mapped = heap = 0
+    for value in vars(obj).values():
+        if isinstance(value, np.ndarray):
+            if _is_mapped(value):
+                mapped += value.nbytes
+            else:
+                heap += value.nbytes
+    return mapped, heap
+
+
+class _Entry:
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.obj = None
+        self.generation = 0
+        self.info = {}
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._entries = {}
+
+    def register(self, name, loader):
+        """loader() -> (model, {"source": ..., optional "mapped_bytes"/"heap_bytes"})"""
+        self._entries[name] = _Entry(name, loader)
+
+    def names(self):
+        return list(self._entries)
+
+    def get(self, name):
+        entry = self._entries[name]
+        obj = entry.obj
+        if obj is not None:
+            return obj
+        with entry.lock:
+            if entry.obj is None:
+                rss_before = _rss_bytes()
+                start = time.perf_counter()
+                obj, info = entry.loader()
+                info["load_seconds"] = time.perf_counter() - start
+                rss_after = _rss_bytes()
+                if rss_before is not None and rss_after is not None:
+                    info["rss_delta_bytes"] = rss_after - rss_before
+                entry.info = info
+                entry.obj = obj
+            return entry.obj
+
+    def is_loaded(self, name):
+        return self._entries[name].obj is not None
+
+    def generation(self, name):
+        return self._entries[name].generation
+
+    def reload(self, name):
+        """Drop the cached object; the next get() loads the artifact again."""
+        entry = self._entries[name]
+        with entry.lock:
+            entry.obj = None
+            entry.info = {}
+            entry.generation += 1
+
+    def stats(self):
+        out = {}
+        for name, entry in self._entries.items():
+            out[name] = {"loaded": entry.obj is not None, "generation": entry.generation, **entry.info}
+        return out
+
+
+class LazyModel:
+    """Stand-in whose predict() (or any other attribute) resolves a registry entry on first use."""
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def predict(self, X):
+        return self.registry.get(self.name).predict(X)
+
+    def __getattr__(self, attr):
+        if attr.startswith("_") or attr in ("registry", "name"):
+            raise AttributeError(attr)
+        return getattr(self.registry.get(self.name), attr)
+
+
+# ---------------------------
+# Loaders
+# ---------------------------
+def _load_footfall():
+    from footfall_forecast import FootfallTable
+
+    table_path = FOOTFALL_ARRAYS / "lookup_table.npy"
+    if table_path.exists():
+        table = FootfallTable(np.load(table_path, mmap_mode="r"))
+        source = table_path
+    else:
+        import joblib
+        table = FootfallTable.from_model(joblib.load(FOOTFALL_MODEL))
+        source = FOOTFALL_MODEL
+    mapped, heap = _array_bytes(table)
+    return table, {"source": str(source), "mapped_bytes": mapped, "heap_bytes": heap}
+
+
+def _load_footfall_stores():
+    from footfall_forecast import StoreModels
+
+    models = StoreModels.load(FOOTFALL_STORES, FOOTFALL_STORE_CACHE)
+    mapped, heap = _array_bytes(models)
+    return models, {"source": str(FOOTFALL_STORES), "stores": len(models),
+                    "mapped_bytes": mapped, "heap_bytes": heap}
+
+
+def _load_delivery_sklearn():
+    import joblib
+    model = joblib.load(DELIVERY_MODEL)
+    return model, {"source": str(DELIVERY_MODEL), "file_bytes": DELIVERY_MODEL.stat().st_size}
+
+
+def _load_delivery():
+    from forest_engine import CompactForest, ForestPredictor
+
+    if COMPRESSED_FOREST_ENABLED and DELIVERY_FOREST_SMALL.exists():
+        # Small enough to beat scikit-learn at every batch size
+        forest = CompactForest.load(DELIVERY_FOREST_SMALL, mmap_mode="r")
+        mapped, heap = _array_bytes(forest)
+        info = {"source": str(DELIVERY_FOREST_SMALL), "mapped_bytes": mapped, "heap_bytes": heap}
+        return ForestPredictor(forest, None), info
+
+    fallback = LazyModel(registry, "delivery_sklearn")
+    if not (COMPACT_FOREST_ENABLED and DELIVERY_FOREST.exists()):
+        return ForestPredictor(None, fallback), {"source": str(DELIVERY_MODEL)}
+
+    forest = CompactForest.load(DELIVERY_FOREST, mmap_mode="r")
+    mapped, heap = _array_bytes(forest)
+    info = {"source": str(DELIVERY_FOREST), "mapped_bytes": mapped, "heap_bytes": heap}
+    return ForestPredictor(forest, fallback, COMPACT_FOREST_MAX_ROWS), info
+
+
+def _load_clv():
+    if CLV_BOOSTER.exists():
+        from xgboost import XGBRegressor
+        model = XGBRegressor()
+        model.load_model(CLV_BOOSTER)
+        source = CLV_BOOSTER
+    else:
+        import joblib
+        model = joblib.load(CLV_MODEL)
+        source = CLV_MODEL
+    # XGBoost copies the booster into its own heap; it cannot be memory-mapped
+    return model, {"source": str(source), "file_bytes": source.stat().st_size}
+
+
+registry = ModelRegistry()
+registry.register("footfall", _load_footfall)
+registry.register("footfall_stores", _load_footfall_stores)
+registry.register("delivery", _load_delivery)
+registry.register("delivery_sklearn", _load_delivery_sklearn)
+registry.register("clv", _load_clv)
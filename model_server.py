@@ -0,0 +1,184 @@
+# model_server.py
+"""
+Long-running local model daemon.
+
+    python model_server.py            # load the models once, then serve
+    python model_server.py --status   # ask a running daemon what it has loaded
+    python model_server.py --reload   # re-read the artifacts (after train_models.py)
+    python model_server.py --stop
+
+Loads footfall, delivery and CLV through model_registry at start-up (imports,
+unpickling and a warm-up prediction each), then answers single-row and batch
+predictions over a Unix domain socket (config.MODEL_SOCKET) with the binary
+framing described in model_client.py. One thread per connection; a
+connection may send any number of requests.
+
+app.py uses the daemon automatically whenever it is running, and any script
+can do the same with model_client.connect().
+"""
+import argparse
+import json
+import os
+import signal
+import socketserver
+import threading
+import time
+import warnings
+
+import numpy as np
+
+from config import MODEL_SOCKET, BATCH_MAX_ROWS
+from features import FOOTFALL_FEATURES, DELIVERY_FEATURES, CLV_FEATURES
+from model_client import (
+    MODELS, OP_PING, OP_PREDICT, OP_QUANTILES, OP_STATUS, OP_SHUTDOWN, OP_RELOAD,
+    STATUS_ARRAY, STATUS_ERROR, STATUS_TEXT, REQUEST, RESPONSE, connect, recv_exact,
+)
+from model_registry import registry
+
+N_FEATURES = {"footfall": len(FOOTFALL_FEATURES), "delivery": len(DELIVERY_FEATURES), "clv": len(CLV_FEATURES)}
+MAX_COLS = max(N_FEATURES.values())
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+def load_models():
+    """Load (and warm up) every served model; returns {name: seconds}."""
+    times = {}
+    for name in MODELS:
+        start = time.perf_counter()
+        model = registry.get(name)
+        model.predict(np.ones((1, N_FEATURES[name])))
+        times[name] = time.perf_counter() - start
+    # Large delivery batches go to scikit-learn unless the compressed forest serves them all
+    if getattr(registry.get("delivery"), "fallback", None) is not None:
+        start = time.perf_counter()
+        registry.get("delivery_sklearn")
+        times["delivery_sklearn"] = time.perf_counter() - start
+    return times
+
+
+def _text(status, message):
+    raw = message.encode("utf-8")
+    return RESPONSE.pack(status, len(raw), 0) + raw
+
+
+def _array(values):
+    values = np.ascontiguousarray(values, dtype="<f8")
+    if values.ndim == 1:
+        values = values.reshape(-1, 1)
+    return RESPONSE.pack(STATUS_ARRAY, values.shape[0], values.shape[1]) + values.tobytes()
+
+
+def answer(op, model, quantiles, X):
+    """The response bytes for one decoded request."""
+    if op == OP_PING:
+        return RESPONSE.pack(STATUS_ARRAY, 0, 0)
+    if op == OP_STATUS:
+        return _text(STATUS_TEXT, json.dumps(registry.stats(), default=str))
+    if op == OP_RELOAD:
+        for name in registry.names():
+            registry.reload(name)
+        times = load_models()
+        return _text(STATUS_TEXT, json.dumps({"load_seconds": times}))
+
+    name = MODELS[model]
+    if X.shape[1] != N_FEATURES[name]:
+        raise ValueError(f"'{name}' expects {N_FEATURES[name]} values per row, got {X.shape[1]}")
+    if op == OP_PREDICT:
+        return _array(registry.get(name).predict(X))
+    if op == OP_QUANTILES:
+        if name != "delivery":
+            raise ValueError("Quantiles are only available for the delivery model")
+        mean, q = registry.get(name).predict_quantiles(X, quantiles)
+        return _array(np.column_stack([mean, q.T]))
+    raise ValueError(f"Unknown op {op}")
+
+
+class Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        while True:
+            try:
+                head = recv_exact(sock, REQUEST.size)
+            except ConnectionError:
+                return  # client went away
+            op, model, n_quantiles, n_rows, n_cols = REQUEST.unpack(head)
+            if n_rows > BATCH_MAX_ROWS or n_cols > MAX_COLS or model >= len(MODELS):
+                # The rest of the request cannot be trusted; answer and drop the connection
+                sock.sendall(_text(STATUS_ERROR, f"Bad request: model {model}, {n_rows} x {n_cols} "
+                                                 f"(max {BATCH_MAX_ROWS} x {MAX_COLS})"))
+                return
+            quantiles = np.frombuffer(recv_exact(sock, n_quantiles * 8), dtype="<f8")
+            X = np.frombuffer(recv_exact(sock, n_rows * n_cols * 8), dtype="<f8").reshape(n_rows, n_cols)
+
+            if op == OP_SHUTDOWN:
+                sock.sendall(_text(STATUS_TEXT, "stopping"))
+                threading.Thread(target=self.server.shutdown).start()
+                return
+            try:
+                reply = answer(op, model, quantiles, X)
+            except Exception as exc:  # report to the caller, keep serving
+                reply = _text(STATUS_ERROR, f"{type(exc).__name__}: {exc}")
+            sock.sendall(reply)
+
+
+class ModelServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def serve(path=MODEL_SOCKET):
+    path = str(path)
+    if os.path.exists(path):
+        client = connect(path)
+        if client is not None:
+            client.close()
+            raise SystemExit(f"A model daemon is already listening on {path}")
+        os.unlink(path)  # left over from a daemon that did not exit cleanly
+
+    print("\n=== MODEL DAEMON ===\n")
+    for name, seconds in load_models().items():
+        print(f"✔ Loaded {name:<17} {seconds * 1000:8.1f} ms")
+
+    server = ModelServer(path, Handler)
+    os.chmod(path, 0o600)  # local user only
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"\n✅ Serving on {path} (pid {os.getpid()}); stop with Ctrl+C or --stop\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+        print("Model daemon stopped.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the models over a local Unix socket.")
+    parser.add_argument("--socket", default=str(MODEL_SOCKET), help=f"socket path (default {MODEL_SOCKET})")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--status", action="store_true", help="show what a running daemon has loaded")
+    group.add_argument("--reload", action="store_true", help="make a running daemon re-read the artifacts")
+    group.add_argument("--stop", action="store_true", help="stop a running daemon")
+    args = parser.parse_args()
+
+    if not (args.status or args.reload or args.stop):
+        serve(args.socket)
+        return
+
+    client = connect(args.socket)
+    if client is None:
+        raise SystemExit(f"No model daemon on {args.socket}")
+    with client:
+        if args.status:
+            print(json.dumps(json.loads(client.status()), indent=2))
+        elif args.reload:
+            print(json.dumps(json.loads(client.reload()), indent=2))
+        else:
+            client.shutdown()
+            print("Model daemon stopping.")
+
+
+if __name__ == "__main__":
+    main()
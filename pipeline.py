@@ -0,0 +1,483 @@
+# pipeline.py
+"""
+Incremental prepare → EDA → train runner.
+
+Each dataset is an independent branch of three stages:
+
+    prepare:<name>  raw CSV           → cleaned data   (prepare_data.prepare_<name>)
+    eda:<name>      cleaned data      → 2 charts       (eda.eda_<name>)
+    train:<name>    cleaned data +    → model files    (train_models.train_<name>)
+                    training_config.json
+
+A stage's fingerprint hashes its input files, the source of the stage
+function (plus the functions and constants it uses from its own module, the
+project modules it calls into, and the versions of third-party packages it
+uses) and the cleaned-data format. A stage only runs when its fingerprint
+changed or its outputs are missing/modified; downstream stages hash the
+*content* of upstream outputs, so a re-run that produces identical data stops
+there. Outputs of every run are also kept in a small cache, so switching
+back to an earlier input restores the earlier outputs instead of recomputing.
+Stages whose inputs are ready run in parallel worker processes; each
+stage's console output goes to outputs/logs/<stage>.log.
+
+    python pipeline.py                      # run whatever is stale
+    python pipeline.py --dry-run            # show what would run
+    python pipeline.py --only delivery      # one branch
+    python pipeline.py --force train:clv    # ignore the fingerprint
+"""
+import argparse
+import contextlib
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+import types
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from pathlib import Path
+
+from config import (
+    BASE_DIR, FOOTFALL_CSV, DELIVERY_CSV, CLV_CSV, CHARTS_DIR, LOGS_DIR,
+    FOOTFALL_MODEL, DELIVERY_MODEL, CLV_MODEL,
+    FOOTFALL_ARRAYS, FOOTFALL_STORES, DELIVERY_FOREST, CLV_BOOSTER,
+    CLEAN_FORMAT, PIPELINE_DIR, PIPELINE_CACHE_KEEP, TRAINING_CONFIG, EDA_STREAMING,
+)
+from datastore import clean_path
+
+DATASETS = ["footfall", "delivery", "clv"]
+RAW_CSV = {"footfall": FOOTFALL_CSV, "delivery": DELIVERY_CSV, "clv": CLV_CSV}
+MODEL_FILES = {
+    "footfall": [FOOTFALL_MODEL, FOOTFALL_ARRAYS, FOOTFALL_STORES],
+    "delivery": [DELIVERY_MODEL, DELIVERY_FOREST],
+    "clv": [CLV_MODEL, CLV_BOOSTER],
+}
+# Same file names as eda.CHARTS (kept here so planning does not import matplotlib)
+CHART_FILES = {
+    "footfall": ["footfall_time_series.png", "footfall_by_weekday.png"],
+    "delivery": ["delivery_distance_vs_time.png", "delivery_traffic_boxplot.png"],
+    "clv": ["clv_distribution.png", "clv_correlation_heatmap.png"],
+}
+
+STATE_FILE = PIPELINE_DIR / "state.json"
+CACHE_DIR = PIPELINE_DIR / "cache"
+
+
+class Stage:
+    def __init__(self, name, module, func, inputs, outputs, deps=(), kwargs=None):
+        self.name = name
+        self.module = module
+        self.func = func
+        self.inputs = list(inputs)      # files, or (json file, key) for one section of it
+        self.outputs = list(outputs)
+        self.deps = list(deps)          # upstream stages (hashed through their outputs)
+        self.kwargs = kwargs or {}
+
+
+def build_stages(fmt=CLEAN_FORMAT, chunksize=None, train_cores=1):
+    """train_cores: n_jobs of each train stage (up to --jobs stages run at once)."""
+    stages = {}
+    for name in DATASETS:
+        clean = clean_path(name, fmt)
+        prep = Stage(f"prepare:{name}", "prepare_data", f"prepare_{name}",
+                     inputs=[RAW_CSV[name]], outputs=[clean],
+                     kwargs={"chunksize": chunksize, "fmt": fmt})
+        eda = Stage(f"eda:{name}", "eda", f"eda_{name}", inputs=[],
+                    outputs=[CHARTS_DIR / c for c in CHART_FILES[name]], deps=[prep.name],
+                    kwargs={"streaming": True, "chunksize": chunksize} if chunksize else
+                    {"streaming": EDA_STREAMING})
+        train = Stage(f"train:{name}", "train_models", f"train_{name}", inputs=[(TRAINING_CONFIG, name)],
+                      outputs=MODEL_FILES[name], deps=[prep.name], kwargs={"n_jobs": train_cores})
+        for stage in (prep, eda, train):
+            stages[stage.name] = stage
+    return stages
+
+
+# ---------------------------
+# Fingerprints
+# ---------------------------
+def _is_project_file(path):
+    try:
+        Path(path).resolve().relative_to(BASE_DIR)
+    except (TypeError, ValueError):
+        return False
+    return "site-packages" not in str(path)
+
+
+def _code_names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _code_names(const)
+    return names
+
+
+def _owner(value):
+    """Module a global name comes from (None for plain values such as constants)."""
+    if isinstance(value, types.ModuleType):
+        return value
+    if inspect.isfunction(value) or inspect.isclass(value) or inspect.isbuiltin(value):
+        return sys.modules.get(value.__module__ or "")
+    return None
+
+
+def _package_version(module):
+    top = module.__name__.split(".")[0]
+    return f"{top}=={getattr(sys.modules.get(top), '__version__', '?')}"
+
+
+def _hash_module(module, h, seen):
+    if module.__name__ in seen:
+        return
+    seen.add(module.__name__)
+    h.update(Path(module.__file__).read_bytes())
+    # Project modules it imports from
+    for value in vars(module).values():
+        owner = _owner(value)
+        if owner is not None and _is_project_file(getattr(owner, "__file__", None)):
+            _hash_module(owner, h, seen)
+
+
+LITERALS = (str, bytes, int, float, complex, bool, type(None))
+
+
+def _hash_value(name, value, h, seen):
+    """A module-level value: literals by repr, functions in containers by source, nothing else."""
+    if isinstance(value, LITERALS):
+        h.update(f"{name}={value!r}".encode())
+    elif inspect.isfunction(value):
+        h.update(f"{name}=".encode())
+        owner = sys.modules.get(value.__module__)
+        if _is_project_file(getattr(owner, "__file__", None)):
+            _hash_function(value, h, seen)
+        else:
+            h.update(_package_version(owner).encode())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=repr):
+            _hash_value(f"{name}[{key!r}]", value[key], h, seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = sorted(value, key=repr) if isinstance(value, (set, frozenset)) else value
+        h.update(f"{name}:{type(value).__name__}[{len(items)}]".encode())
+        for i, item in enumerate(items):
+            _hash_value(f"{name}[{i}]", item, h, seen)
+    elif isinstance(value, Path):
+        h.update(f"{name}={value.as_posix()}".encode())
+    # anything else (objects, locks, ...) has no stable text form and is left out
+
+
+def _hash_function(func, h, seen):
+    """Source of func plus everything it references by global name."""
+    key = f"{func.__module__}.{func.__qualname__}"
+    if key in seen:
+        return
+    seen.add(key)
+    h.update(inspect.getsource(func).encode())
+    module = sys.modules[func.__module__]
+    for name in sorted(_code_names(func.__code__)):
+        if name not in vars(module):
+            continue
+        value = vars(module)[name]
+        if inspect.isfunction(value) and value.__module__ == module.__name__:
+            _hash_function(value, h, seen)
+            continue
+        owner = _owner(value)
+        if owner is None:
+            _hash_value(name, value, h, seen)  # module-level constant
+        elif owner is not module:
+            if _is_project_file(getattr(owner, "__file__", None)):
+                _hash_module(owner, h, seen)
+            else:
+                h.update(_package_version(owner).encode())
+
+
+def code_fingerprint(stage):
+    func = getattr(importlib.import_module(stage.module), stage.func)
+    h = hashlib.sha256()
+    _hash_function(func, h, set())
+    return h.hexdigest()
+
+
+class FileHasher:
+    """sha256 of files/directories, memoized on (size, mtime) across runs."""
+
+    def __init__(self, memo):
+        self.memo = memo
+
+    def file(self, path):
+        st = path.stat()
+        key = str(path)
+        cached = self.memo.get(key)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        self.memo[key] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def __call__(self, path):
+        path = Path(path)
+        if not path.exists():
+            return None
+        if path.is_file():
+            return self.file(path)
+        h = hashlib.sha256()
+        for p in sorted(q for q in path.rglob("*") if q.is_file()):
+            h.update(str(p.relative_to(path)).encode())
+            h.update(self.file(p).encode())
+        return h.hexdigest()
+
+
+def stage_fingerprint(stage, code, hasher, state):
+    h = hashlib.sha256()
+    h.update(stage.name.encode())
+    h.update(code.encode())
+    h.update(json.dumps(stage.kwargs.get("fmt")).encode())
+    if stage.kwargs.get("streaming"):  # streamed charts are drawn differently
+        h.update(b"streaming")
+    for path in stage.inputs:
+        if isinstance(path, tuple):  # only this model's section of training_config.json
+            path, key = path
+            section = json.loads(Path(path).read_text()).get(key) if Path(path).exists() else None
+            h.update(f"{path}[{key}]:{json.dumps(section, sort_keys=True)}".encode())
+        else:
+            h.update(f"{path}:{hasher(path)}".encode())
+    for dep in stage.deps:
+        h.update(json.dumps(state["stages"][dep]["outputs"], sort_keys=True).encode())
+    return h.hexdigest()
+
+
+# ---------------------------
+# State and output cache
+# ---------------------------
+def load_state():
+    if STATE_FILE.exists():
+        return json.loads(STATE_FILE.read_text())
+    return {"stages": {}, "files": {}}
+
+
+def save_state(state):
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    os.replace(tmp, STATE_FILE)
+
+
+def _copy(src, dst):
+    if src.is_dir():
+        shutil.rmtree(dst, ignore_errors=True)
+        shutil.copytree(src, dst)
+    else:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(src, dst)
+
+
+def _cache_slot(stage, fingerprint):
+    return CACHE_DIR / stage.name.replace(":", "_") / fingerprint[:16]
+
+
+def cache_outputs(stage, fingerprint):
+    if PIPELINE_CACHE_KEEP <= 0:
+        return
+    slot = _cache_slot(stage, fingerprint)
+    shutil.rmtree(slot, ignore_errors=True)
+    for i, path in enumerate(stage.outputs):
+        _copy(Path(path), slot / f"{i}_{Path(path).name}")
+    # Keep only the most recent entries per stage
+    entries = sorted(slot.parent.iterdir(), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in entries[PIPELINE_CACHE_KEEP:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def restore_outputs(stage, fingerprint):
+    slot = _cache_slot(stage, fingerprint)
+    if not slot.exists():
+        return False
+    for i, path in enumerate(stage.outputs):
+        cached = slot / f"{i}_{Path(path).name}"
+        if not cached.exists():
+            return False
+    for i, path in enumerate(stage.outputs):
+        _copy(slot / f"{i}_{Path(path).name}", Path(path))
+    os.utime(slot)
+    return True
+
+
+def outputs_match(stage, record, hasher):
+    return all(record["outputs"].get(str(p)) == hasher(p) for p in stage.outputs)
+
+
+# ---------------------------
+# Running
+# ---------------------------
+def run_stage(module, func, kwargs, log_path):
+    """Worker entry point: run one stage with its output captured in a log file."""
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        result = getattr(importlib.import_module(module), func)(**kwargs)
+    return time.perf_counter() - start, result
+
+
+def select(stages, only=None):
+    if not only:
+        return list(stages)
+    wanted = set()
+    for item in only:
+        if item in DATASETS:
+            wanted |= {s for s in stages if s.endswith(f":{item}")}
+        elif item in stages:
+            wanted.add(item)
+            wanted |= set(stages[item].deps)
+        else:
+            raise SystemExit(f"Unknown dataset or stage '{item}' (datasets: {', '.join(DATASETS)})")
+    return [s for s in stages if s in wanted]
+
+
+def run(stages, names, jobs, force=(), dry_run=False):
+    state = load_state()
+    hasher = FileHasher(state["files"])
+    codes = {name: code_fingerprint(stages[name]) for name in names}
+    force = set(force)
+
+    pending = list(names)
+    done, failed, report = set(), set(), []
+    running = {}
+
+    def ready(name):
+        # A failed dependency counts as settled: the stage is then skipped
+        return all(d in done or d in failed or d not in names for d in stages[name].deps)
+
+    def check(name):
+        """'fresh', 'restore' or 'run' for a stage whose dependencies are done."""
+        stage = stages[name]
+        if any(d not in state["stages"] for d in stage.deps):
+            return "run", None
+        fingerprint = stage_fingerprint(stage, codes[name], hasher, state)
+        record = state["stages"].get(name)
+        if name not in force and record and record["fingerprint"] == fingerprint:
+            if outputs_match(stage, record, hasher):
+                return "fresh", fingerprint
+        if name not in force and not dry_run and restore_outputs(stage, fingerprint):
+            return "restore", fingerprint
+        return "run", fingerprint
+
+    def record(name, fingerprint, seconds, status):
+        stage = stages[name]
+        state["stages"][name] = {
+            "fingerprint": fingerprint,
+            "outputs": {str(p): hasher(p) for p in stage.outputs},
+            "seconds": round(seconds, 3),
+            "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        save_state(state)
+        done.add(name)
+        report.append((name, status, seconds))
+
+    if dry_run:
+        stale = set()
+        for name in names:
+            stage = stages[name]
+            if any(d in stale for d in stage.deps):
+                stale.add(name)
+                report.append((name, "after upstream", 0.0))
+                continue
+            status, _ = check(name)
+            if status != "fresh":
+                stale.add(name)
+            report.append((name, "up to date" if status == "fresh" else "would run", 0.0))
+            done.add(name)
+        return report, True
+
+    LOGS_DIR.mkdir(parents=True, exist_ok=True)
+    ctx = get_context("spawn")  # no forking a parent that has imported xgboost/OpenMP
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx) as pool:
+        while pending or running:
+            startable = [n for n in pending if ready(n)]
+            if not running and not startable:  # nothing left that can start
+                for name in pending:
+                    failed.add(name)
+                    report.append((name, "skipped (upstream failed)", 0.0))
+                break
+            for name in startable:
+                pending.remove(name)
+                if any(d in failed for d in stages[name].deps):
+                    failed.add(name)
+                    report.append((name, "skipped (upstream failed)", 0.0))
+                    continue
+                status, fingerprint = check(name)
+                if status == "fresh":
+                    done.add(name)
+                    report.append((name, "up to date", 0.0))
+                    continue
+                if status == "restore":
+                    record(name, fingerprint, 0.0, "restored from cache")
+                    continue
+                stage = stages[name]
+                log_path = LOGS_DIR / f"{name.replace(':', '_')}.log"
+                print(f"▶ {name} ...")
+                future = pool.submit(run_stage, stage.module, stage.func, stage.kwargs, str(log_path))
+                running[future] = (name, fingerprint)
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, fingerprint = running.pop(future)
+                try:
+                    seconds, _ = future.result()
+                except Exception as exc:
+                    failed.add(name)
+                    report.append((name, f"FAILED: {exc}", 0.0))
+                    print(f"✖ {name} failed (see outputs/logs/{name.replace(':', '_')}.log)")
+                    continue
+                if fingerprint is None:  # upstream had no state yet when this was queued
+                    fingerprint = stage_fingerprint(stages[name], codes[name], hasher, state)
+                record(name, fingerprint, seconds, "ran")
+                cache_outputs(stages[name], fingerprint)
+                print(f"✔ {name} ({seconds:.1f}s)")
+
+    return report, not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the stale prepare/EDA/train stages.")
+    parser.add_argument("--only", nargs="+", metavar="NAME",
+                        help=f"datasets ({', '.join(DATASETS)}) or stages (e.g. train:clv) to consider")
+    parser.add_argument("--force", nargs="*", metavar="STAGE",
+                        help="re-run these stages (all selected stages if none are given)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="stages run in parallel (default: CPU count)")
+    parser.add_argument("--chunked", action="store_true",
+                        help="prepare the data and draw the EDA charts in bounded-memory chunks")
+    parser.add_argument("--chunksize", type=int, default=500_000)
+    parser.add_argument("--dry-run", action="store_true", help="only show what would run")
+    args = parser.parse_args()
+
+    # Split the machine between the stages that may run at once
+    train_cores = max(1, (os.cpu_count() or 1) // max(1, args.jobs))
+    stages = build_stages(CLEAN_FORMAT, args.chunksize if args.chunked else None, train_cores)
+    names = select(stages, args.only)
+    force = names if args.force == [] else (args.force or [])
+
+    print(f"\n=== PIPELINE: {len(names)} stages, {args.jobs} worker(s) with {train_cores} core(s) per "
+          f"training stage, clean format '{CLEAN_FORMAT}' ===\n")
+    start = time.perf_counter()
+    report, ok = run(stages, names, args.jobs, force, args.dry_run)
+
+    print(f"\n{'stage':<18} | {'status':<22} | {'seconds':>7}")
+    print("-" * 54)
+    for name, status, seconds in report:
+        print(f"{name:<18} | {status:<22} | {seconds:>7.1f}")
+    print(f"\n{'✅' if ok else '❌'} Pipeline finished in {time.perf_counter() - start:.1f}s\n")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
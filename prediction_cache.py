@@ -0,0 +1,109 @@
+# prediction_cache.py
+"""
+LRU + TTL cache of single-row predictions.
+
+Rows are normalized before lookup: float inputs are snapped to a configured
+step (e.g. distance_km to 0.1 km) and derived columns are rebuilt from the
+snapped inputs, so near-identical requests share one entry. The model sees
+the normalized row too, so a cached answer is exactly what the model returns
+for that key, whichever request filled it.
+
+Entries remember the model registry generation they were computed with; a
+registry.reload() of the model therefore empties the cache on the next
+lookup.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    def __init__(self, name, n_features, steps=None, derive=None, generation=None,
+                 maxsize=10_000, ttl=3600.0):
+        """
+        steps: {column index: quantization step} for float inputs.
+        derive: f(X) -> X that recomputes derived columns after quantization.
+        generation: f() -> value that changes whenever the model is reloaded.
+        ttl: seconds an entry stays valid (0 = no expiry).
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.derive = derive
+        self.generation = generation or (lambda: 0)
+
+        self._step = np.zeros(n_features)
+        for i, step in (steps or {}).items():
+            self._step[i] = step
+        self._quantized = self._step > 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (value, expires_at)
+        self._generation = self.generation()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def normalize(self, x):
+        x = np.array(x, dtype=np.float64).reshape(1, -1)
+        if self._quantized.any():
+            q = self._quantized
+            x[:, q] = np.round(x[:, q] / self._step[q]) * self._step[q]
+        if self.derive is not None:
+            x = self.derive(x)
+        return x
+
+    def predict_one(self, x, compute):
+        """Cached prediction for one row; compute(X) runs the model on a (1, n) array on a miss."""
+        X = self.normalize(x)
+        key = X.tobytes()
+        generation = self.generation()
+        now = time.monotonic()
+
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+                self.invalidations += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self.ttl or entry[1] >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+        # The model runs outside the lock so concurrent misses do not serialize
+        value = compute(X)
+
+        with self._lock:
+            # Do not keep a result computed by a model that was reloaded meanwhile
+            if generation == self._generation:
+                self._entries[key] = (value, now + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "generation": self._generation,
+            }
@@ -1,87 +1,248 @@
 # prepare_data.py
+import argparse
+import shutil
+import tempfile
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
 
-from config import (
-    FOOTFALL_CSV, DELIVERY_CSV, CLV_CSV,
-    CLEAN_FOOTFALL, CLEAN_DELIVERY, CLEAN_CLV
-)
-
-print("\n=== PHASE 2: DATA CLEANING & FEATURE ENGINEERING ===\n")
-
-# ----------------------------------------------------
-# 1️⃣ Footfall Dataset
-# ----------------------------------------------------
-print("Processing Footfall Dataset...")
-
-df_foot = pd.read_csv(FOOTFALL_CSV, parse_dates=["date"])
-
-# Time-based features
-df_foot["day_of_week"] = df_foot["date"].dt.weekday
-df_foot["is_weekend"] = df_foot["day_of_week"].apply(lambda x: 1 if x >= 5 else 0)
-df_foot["month"] = df_foot["date"].dt.month
-
-# Handle missing values
-df_foot["is_holiday"] = df_foot["is_holiday"].fillna(0).astype(int)
-df_foot["promo_active"] = df_foot["promo_active"].fillna(0).astype(int)
-
-# Remove unrealistic footfall values
-df_foot = df_foot[df_foot["footfall"] >= 30]
-
-# Sort by date
-df_foot = df_foot.sort_values("date").reset_index(drop=True)
-
-df_foot.to_csv(CLEAN_FOOTFALL, index=False)
-print(f"✔ Saved cleaned footfall data → {CLEAN_FOOTFALL}")
+from config import FOOTFALL_CSV, DELIVERY_CSV, CLV_CSV, CLEAN_FORMAT
+from datastore import FORMATS, CleanWriter, clean_path, write_clean
+from footfall_stats import DEFAULT_STORE
+
+# Narrow dtypes declared at read time. Continuous columns stay float64 so the
+# medians and derived features (and therefore the cleaned CSVs) are unchanged.
+FOOTFALL_DTYPES = {"store_id": "string", "is_holiday": "Int8", "promo_active": "Int8", "footfall": "Int32"}
+DELIVERY_DTYPES = {
+    "distance_km": "float64",
+    "num_items": "int16",
+    "order_value": "float64",
+    "time_of_day_bucket": "int8",
+    "traffic_level": "int8",
+    "rider_experience_months": "int16",
+    "delivery_time_min": "float64",
+}
+CLV_DTYPES = {
+    "customer_id": "string",
+    "tenure_months": "int16",
+    "orders_per_month": "float64",
+    "avg_order_value": "float64",
+    "recency_days": "int16",
+    "discount_usage_rate": "float64",
+    "return_rate": "float64",
+    "clv_next_12m": "float64",
+}
+
+DELIVERY_FILL_COLS = ["distance_km", "order_value", "delivery_time_min"]
+CLV_FILL_COLS = ["discount_usage_rate", "return_rate"]
+
+DEFAULT_CHUNKSIZE = 500_000
 
 
 # ----------------------------------------------------
-# 2️⃣ Delivery Dataset
+# Per-frame cleaning (a whole file or one chunk of it)
 # ----------------------------------------------------
-print("\nProcessing Delivery Dataset...")
-
-df_del = pd.read_csv(DELIVERY_CSV)
-
-# Basic cleaning
-for col in ["distance_km", "order_value", "delivery_time_min"]:
-    if df_del[col].isna().any():
-        df_del[col] = df_del[col].fillna(df_del[col].median())
-
-# Remove unrealistic values
-df_del = df_del[df_del["delivery_time_min"] >= 5]
-df_del = df_del[df_del["distance_km"] > 0]
-
-# Ensure integers where needed
-df_del["traffic_level"] = df_del["traffic_level"].astype(int)
-df_del["time_of_day_bucket"] = df_del["time_of_day_bucket"].astype(int)
-df_del["num_items"] = df_del["num_items"].astype(int)
-df_del["rider_experience_months"] = df_del["rider_experience_months"].astype(int)
-
-df_del.to_csv(CLEAN_DELIVERY, index=False)
-print(f"✔ Saved cleaned delivery data → {CLEAN_DELIVERY}")
+def clean_footfall(df):
+    # Time-based features
+    df["day_of_week"] = df["date"].dt.weekday.astype("int8")
+    df["is_weekend"] = (df["day_of_week"] >= 5).astype("int8")
+    df["month"] = df["date"].dt.month.astype("int8")
+
+    # Handle missing values
+    df["is_holiday"] = df["is_holiday"].fillna(0).astype("int8")
+    df["promo_active"] = df["promo_active"].fillna(0).astype("int8")
+    if "store_id" in df.columns:  # optional; rows without one belong to the default store
+        df["store_id"] = df["store_id"].fillna(DEFAULT_STORE)
+
+    # Remove unrealistic footfall values
+    return df[(df["footfall"] >= 30).fillna(False)]
+
+
+def clean_delivery(df, medians):
+    # Basic cleaning
+    for col, median in medians.items():
+        df[col] = df[col].fillna(median)
+
+    # Remove unrealistic values (one combined mask, one copy)
+    valid = (df["delivery_time_min"] >= 5) & (df["distance_km"] > 0)
+    return df[valid]
+
+
+def clean_clv(df, medians):
+    # Fill missing numeric columns with median
+    for col, median in medians.items():
+        df[col] = df[col].fillna(median)
+
+    # Remove impossible values
+    df = df[(df["avg_order_value"] > 0) & (df["orders_per_month"] > 0)]
+
+    # Derived features
+    df = df.assign(
+        loyalty_index=(1 - df["discount_usage_rate"]) * (1 - df["return_rate"]),
+        monetary_value=df["orders_per_month"] * df["avg_order_value"],
+    )
+    return df
+
+
+def frame_medians(df, cols):
+    """Medians of the columns that actually have gaps (in-memory path)."""
+    return {c: df[c].median() for c in cols if df[c].isna().any()}
+
+
+def streaming_medians(path, cols, dtypes, chunksize):
+    """
+    Exact medians in bounded memory: merge per-chunk value counts, then walk
+    the cumulative counts. Memory grows with the number of *distinct* values
+    (a few thousand for prices/distances/rates with 1-2 decimals), not rows.
+    """
+    counts = {c: None for c in cols}
+    gaps = {c: False for c in cols}
+    reader = pd.read_csv(path, usecols=cols, dtype={c: dtypes[c] for c in cols}, chunksize=chunksize)
+    for chunk in reader:
+        for c in cols:
+            s = chunk[c]
+            gaps[c] = gaps[c] or bool(s.isna().any())
+            vc = s.value_counts()
+            counts[c] = vc if counts[c] is None else counts[c].add(vc, fill_value=0)
+
+    medians = {}
+    for c in cols:
+        if not gaps[c]:
+            continue
+        vc = counts[c].sort_index()
+        cum = vc.cumsum().to_numpy()
+        values = vc.index.to_numpy(dtype=np.float64)
+        n = int(cum[-1]) if len(cum) else 0
+        if n == 0:
+            medians[c] = np.nan
+            continue
+        lo = values[np.searchsorted(cum, (n - 1) // 2 + 1)]
+        hi = values[np.searchsorted(cum, n // 2 + 1)]
+        medians[c] = (lo + hi) / 2
+    return medians
 
 
 # ----------------------------------------------------
-# 3️⃣ CLV Dataset
+# Dataset runners (output format: see datastore.py)
 # ----------------------------------------------------
-print("\nProcessing CLV Dataset...")
-
-df_clv = pd.read_csv(CLV_CSV)
-
-# Fill missing numeric columns with median
-for col in ["discount_usage_rate", "return_rate"]:
-    if df_clv[col].isna().any():
-        df_clv[col] = df_clv[col].fillna(df_clv[col].median())
-
-# Remove impossible values
-df_clv = df_clv[df_clv["avg_order_value"] > 0]
-df_clv = df_clv[df_clv["orders_per_month"] > 0]
-
-# Derived features
-df_clv["loyalty_index"] = (1 - df_clv["discount_usage_rate"]) * (1 - df_clv["return_rate"])
-df_clv["monetary_value"] = df_clv["orders_per_month"] * df_clv["avg_order_value"]
-
-df_clv.to_csv(CLEAN_CLV, index=False)
-print(f"✔ Saved cleaned CLV data → {CLEAN_CLV}")
-
-print("\n✅ PHASE 2 DONE: Cleaned datasets are ready.\n")
+def prepare_footfall(src=FOOTFALL_CSV, dst=None, chunksize=None, fmt=None):
+    if not chunksize:
+        df = pd.read_csv(src, parse_dates=["date"], dtype=FOOTFALL_DTYPES)
+        df = clean_footfall(df)
+
+        # Sort by date
+        # Stable, like the chunked path, so rows sharing a date keep their input order
+        df = df.sort_values("date", kind="stable").reset_index(drop=True)
+        return write_clean("footfall", df, fmt, dst)
+
+    # Exports normally arrive in date order, so stream straight through and
+    # only fall back to a month-bucketed external sort if they do not.
+    last_date = None
+    with CleanWriter("footfall", fmt, dst) as writer:
+        reader = pd.read_csv(src, parse_dates=["date"], dtype=FOOTFALL_DTYPES, chunksize=chunksize)
+        for chunk in reader:
+            chunk = clean_footfall(chunk).sort_values("date", kind="stable")
+            if chunk.empty and writer.rows:
+                continue
+            if last_date is not None and not chunk.empty and chunk["date"].iloc[0] < last_date:
+                break
+            writer.write(chunk)
+            if not chunk.empty:
+                last_date = chunk["date"].iloc[-1]
+        else:
+            return writer.rows
+
+    return _footfall_bucket_sort(src, dst, chunksize, fmt)
+
+
+def _footfall_bucket_sort(src, dst, chunksize, fmt):
+    """Spill cleaned rows into one file per month, then sort month by month."""
+    tmp = Path(tempfile.mkdtemp(prefix="footfall_sort_"))
+    try:
+        reader = pd.read_csv(src, parse_dates=["date"], dtype=FOOTFALL_DTYPES, chunksize=chunksize)
+        for chunk in reader:
+            chunk = clean_footfall(chunk)
+            month_key = chunk["date"].dt.year * 100 + chunk["date"].dt.month
+            for key, part in chunk.groupby(month_key, sort=False):
+                bucket = tmp / f"{key}.csv"
+                part.to_csv(bucket, index=False, mode="a", header=not bucket.exists())
+
+        with CleanWriter("footfall", fmt, dst) as writer:
+            for bucket in sorted(tmp.glob("*.csv"), key=lambda p: int(p.stem)):
+                part = pd.read_csv(bucket, parse_dates=["date"], dtype=FOOTFALL_DTYPES)
+                writer.write(part.sort_values("date", kind="stable"))
+        return writer.rows
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def prepare_delivery(src=DELIVERY_CSV, dst=None, chunksize=None, fmt=None):
+    if not chunksize:
+        df = pd.read_csv(src, dtype=DELIVERY_DTYPES)
+        df = clean_delivery(df, frame_medians(df, DELIVERY_FILL_COLS))
+        return write_clean("delivery", df, fmt, dst)
+
+    # Pass 1: medians of the fill columns only; pass 2: clean and append
+    medians = streaming_medians(src, DELIVERY_FILL_COLS, DELIVERY_DTYPES, chunksize)
+    with CleanWriter("delivery", fmt, dst) as writer:
+        for chunk in pd.read_csv(src, dtype=DELIVERY_DTYPES, chunksize=chunksize):
+            writer.write(clean_delivery(chunk, medians))
+    return writer.rows
+
+
+def prepare_clv(src=CLV_CSV, dst=None, chunksize=None, fmt=None):
+    if not chunksize:
+        df = pd.read_csv(src, dtype=CLV_DTYPES)
+        df = clean_clv(df, frame_medians(df, CLV_FILL_COLS))
+        return write_clean("clv", df, fmt, dst)
+
+    medians = streaming_medians(src, CLV_FILL_COLS, CLV_DTYPES, chunksize)
+    with CleanWriter("clv", fmt, dst) as writer:
+        for chunk in pd.read_csv(src, dtype=CLV_DTYPES, chunksize=chunksize):
+            writer.write(clean_clv(chunk, medians))
+    return writer.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean the raw CSVs and add features.")
+    parser.add_argument("--chunked", action="store_true",
+                        help="stream each file in bounded-memory chunks")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f"rows per chunk with --chunked (default {DEFAULT_CHUNKSIZE:,})")
+    parser.add_argument("--format", choices=FORMATS, default=CLEAN_FORMAT,
+                        help=f"storage for the cleaned data (default {CLEAN_FORMAT}, see datastore.py)")
+    args = parser.parse_args()
+    chunksize = args.chunksize if args.chunked else None
+    fmt = args.format
+
+    print("\n=== PHASE 2: DATA CLEANING & FEATURE ENGINEERING ===\n")
+    if chunksize:
+        print(f"(chunked mode: {chunksize:,} rows per chunk)\n")
+
+    # ----------------------------------------------------
+    # 1️⃣ Footfall Dataset
+    # ----------------------------------------------------
+    print("Processing Footfall Dataset...")
+    rows = prepare_footfall(chunksize=chunksize, fmt=fmt)
+    print(f"✔ Saved cleaned footfall data ({rows:,} rows) → {clean_path('footfall', fmt)}")
+
+    # ----------------------------------------------------
+    # 2️⃣ Delivery Dataset
+    # ----------------------------------------------------
+    print("\nProcessing Delivery Dataset...")
+    rows = prepare_delivery(chunksize=chunksize, fmt=fmt)
+    print(f"✔ Saved cleaned delivery data ({rows:,} rows) → {clean_path('delivery', fmt)}")
+
+    # ----------------------------------------------------
+    # 3️⃣ CLV Dataset
+    # ----------------------------------------------------
+    print("\nProcessing CLV Dataset...")
+    rows = prepare_clv(chunksize=chunksize, fmt=fmt)
+    print(f"✔ Saved cleaned CLV data ({rows:,} rows) → {clean_path('clv', fmt)}")
+
+    print("\n✅ PHASE 2 DONE: Cleaned datasets are ready.\n")
+
+
+if __name__ == "__main__":
+    main()
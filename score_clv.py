@@ -0,0 +1,195 @@
+# score_clv.py
+"""
+Bulk CLV scoring: re-score and segment a whole customer file.
+
+    python score_clv.py customers.csv [--out outputs/clv_scores] [--workers 4]
+
+The input has the clv_data.csv columns (clv_next_12m is not needed). It is
+read in chunks; each chunk is cleaned with the training medians, featurized
+(loyalty_index / monetary_value) and scored by the XGBoost model in a worker
+pool, then appended to one CSV per segment:
+
+    high_value.csv, medium_value.csv, low_value.csv   customer_id, predicted_clv
+    rejected.csv                                      customer_id, reason
+    summary.json                                      counts, mean CLV, timings
+
+Only a few chunks are in flight at any time, so memory stays flat no matter
+how many customers the file holds.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import CLV_CSV, CLV_SCORES_DIR, BULK_CHUNK_ROWS
+from features import CLV_INPUTS, clv_matrix, clv_segment, invalid_rows
+
+SEGMENTS = {"High Value": "high_value.csv", "Medium Value": "medium_value.csv", "Low Value": "low_value.csv"}
+READ_DTYPES = {"customer_id": "string", **{c: "float64" for c in CLV_INPUTS}}
+
+
+def training_medians():
+    """The fill values prepare_data.py used for the training data."""
+    from prepare_data import CLV_DTYPES, CLV_FILL_COLS, DEFAULT_CHUNKSIZE, streaming_medians
+    return streaming_medians(CLV_CSV, CLV_FILL_COLS, CLV_DTYPES, DEFAULT_CHUNKSIZE)
+
+
+# ---------------------------
+# Worker side
+# ---------------------------
+_WORKER = {}
+
+
+def _init_worker(medians, threads):
+    from model_registry import registry
+
+    model = registry.get("clv")
+    model.set_params(n_jobs=threads)
+    _WORKER.update(model=model, medians=medians)
+
+
+def score_chunk(chunk):
+    """Clean, score and segment one chunk; returns CSV text per output file plus counts."""
+    chunk = chunk.fillna(_WORKER["medians"])
+
+    reason = np.full(len(chunk), "", dtype=object)
+    missing = chunk[CLV_INPUTS].isna().any(axis=1).to_numpy()
+    reason[missing] = "missing value"
+    bad = ~missing & ((chunk["avg_order_value"] <= 0) | (chunk["orders_per_month"] <= 0)).to_numpy()
+    reason[bad] = "non-positive orders_per_month or avg_order_value"
+    valid = ~(missing | bad)
+    # The same per-column rules the web app applies (rates in [0, 1], whole days, ...)
+    for c in CLV_INPUTS:
+        out_of_range = valid & invalid_rows(c, chunk[c].to_numpy())
+        reason[out_of_range] = f"invalid {c}"
+        valid &= ~out_of_range
+
+    scored = chunk[valid]
+    X = clv_matrix({c: scored[c].to_numpy() for c in CLV_INPUTS})
+    pred = _WORKER["model"].predict(X) if len(X) else np.empty(0)
+    segment = clv_segment(pred)
+
+    out, counts, totals = {}, {}, {}
+    ids = scored["customer_id"].to_numpy()
+    for name, filename in SEGMENTS.items():
+        m = segment == name
+        counts[name] = int(m.sum())
+        totals[name] = float(pred[m].sum(dtype=np.float64))
+        if counts[name]:
+            out[filename] = pd.DataFrame({"customer_id": ids[m], "predicted_clv": np.round(pred[m], 2)}) \
+                .to_csv(index=False, header=False)
+    if not valid.all():
+        out["rejected.csv"] = pd.DataFrame({"customer_id": chunk["customer_id"].to_numpy()[~valid],
+                                            "reason": reason[~valid]}).to_csv(index=False, header=False)
+    return out, counts, totals, int((~valid).sum())
+
+
+# ---------------------------
+# Driver
+# ---------------------------
+def score_file(src, out_dir, chunksize=BULK_CHUNK_ROWS, workers=1, cores=None, progress=True):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    headers = {f: "customer_id,predicted_clv\n" for f in SEGMENTS.values()}
+    headers["rejected.csv"] = "customer_id,reason\n"
+    files = {}
+    for name, header in headers.items():
+        files[name] = open(out_dir / name, "w", encoding="utf-8", newline="")
+        files[name].write(header)
+
+    medians = training_medians()
+    threads = max(1, (cores or os.cpu_count() or 1) // max(1, workers))
+    counts = {name: 0 for name in SEGMENTS}
+    totals = {name: 0.0 for name in SEGMENTS}
+    rows = rejected = 0
+    start = last_report = time.perf_counter()
+
+    def collect(result):
+        nonlocal rows, rejected, last_report
+        out, chunk_counts, chunk_totals, chunk_rejected = result
+        for name, text in out.items():
+            files[name].write(text)
+        for name in SEGMENTS:
+            counts[name] += chunk_counts[name]
+            totals[name] += chunk_totals[name]
+        rejected += chunk_rejected
+        rows += sum(chunk_counts.values()) + chunk_rejected
+        now = time.perf_counter()
+        if progress and now - last_report >= 1.0:
+            last_report = now
+            print(f"\r   {rows:>12,} rows  {rows / (now - start):>10,.0f} rows/s", end="", file=sys.stderr, flush=True)
+
+    reader = pd.read_csv(src, usecols=list(READ_DTYPES), dtype=READ_DTYPES, chunksize=chunksize)
+    try:
+        if workers <= 1:
+            _init_worker(medians, threads)
+            for chunk in reader:
+                collect(score_chunk(chunk))
+        else:
+            ctx = get_context("spawn")
+            with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker,
+                                     initargs=(medians, threads)) as pool:
+                pending = deque()
+                for chunk in reader:
+                    pending.append(pool.submit(score_chunk, chunk))
+                    # Bounded read-ahead; results are written in input order
+                    while len(pending) >= 2 * workers:
+                        collect(pending.popleft().result())
+                while pending:
+                    collect(pending.popleft().result())
+    finally:
+        for f in files.values():
+            f.close()
+
+    seconds = time.perf_counter() - start
+    if progress:
+        print("\r" + " " * 50 + "\r", end="", file=sys.stderr)
+    summary = {
+        "input": str(src),
+        "rows": rows,
+        "rejected": rejected,
+        "segments": {name: {"customers": counts[name],
+                            "mean_predicted_clv": totals[name] / counts[name] if counts[name] else None,
+                            "file": SEGMENTS[name]} for name in SEGMENTS},
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else None,
+        "workers": workers,
+        "chunksize": chunksize,
+    }
+    (out_dir / "summary.json").write_text(json.dumps(summary, indent=2))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score and segment every customer in a CSV file.")
+    parser.add_argument("src", type=Path, help="customer file with the clv_data.csv columns")
+    parser.add_argument("--out", type=Path, default=CLV_SCORES_DIR, help=f"output folder (default {CLV_SCORES_DIR})")
+    parser.add_argument("--chunksize", type=int, default=BULK_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--quiet", action="store_true", help="no progress line")
+    args = parser.parse_args()
+
+    print("\n=== BULK CLV SCORING ===\n")
+    print(f"Scoring {args.src} in chunks of {args.chunksize:,} rows with {args.workers} worker(s)...")
+    summary = score_file(args.src, args.out, args.chunksize, args.workers, progress=not args.quiet)
+
+    print(f"\n{'segment':<13} | {'customers':>12} | {'mean CLV':>12}")
+    print("-" * 44)
+    for name, seg in summary["segments"].items():
+        mean = f"₹{seg['mean_predicted_clv']:,.0f}" if seg["mean_predicted_clv"] is not None else "-"
+        print(f"{name:<13} | {seg['customers']:>12,} | {mean:>12}")
+    print(f"{'rejected':<13} | {summary['rejected']:>12,} |")
+    print(f"\n✔ {summary['rows']:,} customers in {summary['seconds']:.1f}s "
+          f"({summary['rows_per_second']:,.0f} rows/s) → {args.out}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# streaming_stats.py
+"""
+Mergeable one-pass aggregates for the streaming EDA (eda.py --streaming).
+
+    QuantileSketch  quantiles with bounded relative error (DDSketch-style
+                    log-spaced buckets): memory depends on the value range,
+                    not on the number of rows
+    Moments         mean / covariance / correlation, merged chunk by chunk
+                    with the pairwise update (no catastrophic cancellation)
+    Hist2D          2-D histogram on a fixed grid; only occupied cells are kept
+
+Every aggregate has update(chunk) and merge(other), so chunks can also be
+summarised in separate processes and combined afterwards.
+"""
+import numpy as np
+
+_MIN_POSITIVE = 1e-9  # smaller magnitudes count as zero
+
+
+class _BucketStore:
+    """Dense bucket counts for a contiguous range of bucket indices."""
+
+    def __init__(self):
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def _extend(self, lo, hi):
+        if not self.counts.size:
+            self.offset = lo
+            self.counts = np.zeros(hi - lo + 1, dtype=np.int64)
+            return
+        new_lo, new_hi = min(lo, self.offset), max(hi, self.offset + self.counts.size - 1)
+        if new_lo != self.offset or new_hi - new_lo + 1 != self.counts.size:
+            grown = np.zeros(new_hi - new_lo + 1, dtype=np.int64)
+            grown[self.offset - new_lo:self.offset - new_lo + self.counts.size] = self.counts
+            self.offset, self.counts = new_lo, grown
+
+    def add(self, index):
+        if not index.size:
+            return
+        self._extend(int(index.min()), int(index.max()))
+        self.counts += np.bincount(index - self.offset, minlength=self.counts.size)
+
+    def merge(self, other):
+        if not other.counts.size:
+            return
+        self._extend(other.offset, other.offset + other.counts.size - 1)
+        start = other.offset - self.offset
+        self.counts[start:start + other.counts.size] += other.counts
+
+    def indices(self):
+        return np.arange(self.offset, self.offset + self.counts.size)
+
+
+class QuantileSketch:
+    def __init__(self, alpha=0.01):
+        """alpha: relative accuracy, e.g. 0.01 = every quantile within ±1% of the true value."""
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = np.log(self.gamma)
+        self.positive = _BucketStore()
+        self.negative = _BucketStore()
+        self.zeros = 0
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _index(self, magnitudes):
+        return np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+
+    def _value(self, index):
+        return 2.0 * self.gamma ** index.astype(np.float64) / (self.gamma + 1)
+
+    def update(self, values):
+        v = np.asarray(values, dtype=np.float64).ravel()
+        v = v[~np.isnan(v)]
+        if not v.size:
+            return self
+        self.count += v.size
+        self.min = min(self.min, float(v.min()))
+        self.max = max(self.max, float(v.max()))
+        pos = v[v > _MIN_POSITIVE]
+        neg = -v[v < -_MIN_POSITIVE]
+        self.zeros += v.size - pos.size - neg.size
+        self.positive.add(self._index(pos))
+        self.negative.add(self._index(neg))
+        return self
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("Only sketches with the same accuracy can be merged")
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zeros += other.zeros
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _buckets(self):
+        """(representative value, count) of every bucket, in ascending value order."""
+        neg = self.negative
+        values = np.concatenate([-self._value(neg.indices())[::-1], [0.0], self._value(self.positive.indices())])
+        counts = np.concatenate([neg.counts[::-1], [self.zeros], self.positive.counts])
+        keep = counts > 0
+        return values[keep], counts[keep]
+
+    def quantile(self, q):
+        """Value at quantile q (scalar or array) of everything seen so far."""
+        if not self.count:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        values, counts = self._buckets()
+        rank = np.asarray(q, dtype=np.float64) * (self.count - 1)
+        pos = np.searchsorted(np.cumsum(counts), rank, side="right")
+        out = np.clip(values[np.minimum(pos, values.size - 1)], self.min, self.max)
+        out = np.where(rank <= 0, self.min, np.where(rank >= self.count - 1, self.max, out))  # exact ends
+        return out if np.ndim(q) else float(out)
+
+    def histogram(self, bins=30):
+        """Equal-width histogram over [min, max]; each bucket's count is spread evenly over its range."""
+        pos, neg = self.positive.indices(), self.negative.indices()[::-1]
+        lower = np.concatenate([-self.gamma ** neg.astype(np.float64), [0.0], self.gamma ** (pos - 1.0)])
+        upper = np.concatenate([-self.gamma ** (neg - 1.0), [0.0], self.gamma ** pos.astype(np.float64)])
+        counts = np.concatenate([self.negative.counts[::-1], [self.zeros], self.positive.counts])
+        keep = counts > 0
+        lower, upper, counts = lower[keep], upper[keep], counts[keep]
+        # piecewise-linear CDF through the bucket boundaries, read off at the bin edges
+        cum = np.cumsum(counts)
+        xp = np.column_stack([lower, upper]).ravel().clip(self.min, self.max)
+        cdf = np.column_stack([cum - counts, cum]).ravel()
+        lo, hi = (self.min, self.max) if self.max > self.min else (self.min - 0.5, self.max + 0.5)
+        edges = np.linspace(lo, hi, bins + 1)
+        return np.diff(np.interp(edges, xp, cdf)), edges
+
+    def box_stats(self, label=None):
+        """Input for Axes.bxp: quartiles and 1.5-IQR whiskers clipped to the data range."""
+        q1, med, q3 = self.quantile([0.25, 0.5, 0.75]).tolist()
+        iqr = q3 - q1
+        return {
+            "label": label, "med": med, "q1": q1, "q3": q3,
+            "whislo": max(self.min, q1 - 1.5 * iqr), "whishi": min(self.max, q3 + 1.5 * iqr),
+            "fliers": [],
+        }
+
+
+class Moments:
+    def __init__(self, n_features):
+        self.n = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros((n_features, n_features))  # Σ (x - mean)(x - mean)ᵀ
+
+    def _combine(self, n_b, mean_b, m2_b):
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * (n_b / n)
+        self.m2 = self.m2 + m2_b + np.outer(delta, delta) * (self.n * n_b / n)
+        self.n = n
+
+    def update(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        X = X[~np.isnan(X).any(axis=1)]
+        if len(X):
+            mean_b = X.mean(axis=0)
+            D = X - mean_b
+            self._combine(len(X), mean_b, D.T @ D)
+        return self
+
+    def merge(self, other):
+        if other.n:
+            self._combine(other.n, other.mean, other.m2)
+        return self
+
+    def covariance(self):
+        return self.m2 / max(self.n - 1, 1)
+
+    def correlation(self):
+        std = np.sqrt(np.diag(self.m2))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.m2 / np.outer(std, std)
+
+
+class Hist2D:
+    def __init__(self, widths, origin=(0.0, 0.0)):
+        self.widths = np.asarray(widths, dtype=np.float64)
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.cells = {}  # (i, j) -> count
+        self.count = 0
+
+    def update(self, x, y):
+        xy = np.column_stack([np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)])
+        xy = xy[~np.isnan(xy).any(axis=1)]
+        if not len(xy):
+            return self
+        ij = np.floor((xy - self.origin) / self.widths).astype(np.int64)
+        cells, counts = np.unique(ij, axis=0, return_counts=True)
+        for (i, j), n in zip(cells.tolist(), counts.tolist()):
+            self.cells[i, j] = self.cells.get((i, j), 0) + n
+        self.count += len(xy)
+        return self
+
+    def merge(self, other):
+        for key, n in other.cells.items():
+            self.cells[key] = self.cells.get(key, 0) + n
+        self.count += other.count
+        return self
+
+    def dense(self):
+        """(x edges, y edges, counts[x, y]) over the occupied range."""
+        ij = np.array(list(self.cells), dtype=np.int64).reshape(-1, 2)
+        lo, hi = ij.min(axis=0), ij.max(axis=0)
+        grid = np.zeros(hi - lo + 1, dtype=np.int64)
+        grid[ij[:, 0] - lo[0], ij[:, 1] - lo[1]] = list(self.cells.values())
+        x_edges = self.origin[0] + np.arange(lo[0], hi[0] + 2) * self.widths[0]
+        y_edges = self.origin[1] + np.arange(lo[1], hi[1] + 2) * self.widths[1]
+        return x_edges, y_edges, grid
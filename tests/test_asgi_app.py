@@ -0,0 +1,58 @@
+# tests/test_asgi_app.py
+import asyncio
+from urllib.parse import urlencode
+
+import pytest
+
+import asgi_app
+from config import FOOTFALL_MODEL
+
+FOOTFALL_FORM = {"day_of_week": "5", "is_holiday": "0", "promo_active": "1", "month": "11", "store_id": ""}
+
+
+def call(path, method="GET", form=None):
+    """Run one request through the ASGI app -> (status, body)."""
+    body = urlencode(form or {}).encode()
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"",
+             "headers": [(b"content-type", b"application/x-www-form-urlencoded")]}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi_app.app(scope, receive, send))
+    return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+
+@pytest.mark.parametrize("path, form, field", [
+    ("/footfall", dict(FOOTFALL_FORM, month="13"), "month"),
+    ("/footfall", dict(FOOTFALL_FORM, day_of_week="-1"), "day_of_week"),
+    ("/footfall", dict(FOOTFALL_FORM, store_id="NOPE"), "NOPE"),
+    ("/delivery", {}, "Invalid or missing form field"),
+    ("/clv", {}, "Invalid or missing form field"),
+])
+def test_form_errors_render_the_page(path, form, field):
+    status, body = call(path, "POST", form)
+    assert status == 400
+    assert b"<html" in body.lower()
+    assert field.encode() in body
+
+
+def test_form_page_get():
+    status, body = call("/footfall")
+    assert status == 200 and b"<html" in body.lower()
+
+
+@pytest.mark.skipif(not FOOTFALL_MODEL.exists(), reason="run train_models.py first")
+def test_footfall_form_predicts():
+    status, _ = call("/footfall", "POST", FOOTFALL_FORM)
+    assert status == 200
+
+
+def test_busy_pool_answers_503(monkeypatch):
+    monkeypatch.setattr(asgi_app.predict_pool, "max_pending", 0)
+    status, body = call("/clv", "POST", {})
+    assert status == 503
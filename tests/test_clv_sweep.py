@@ -0,0 +1,107 @@
+# tests/test_clv_sweep.py
+import numpy as np
+import pytest
+
+from clv_sweep import parse_grid, split_thresholds, sweep
+from features import CLV_INPUTS, clv_matrix
+
+xgb = pytest.importorskip("xgboost")
+
+
+@pytest.fixture(scope="module")
+def model():
+    rng = np.random.default_rng(0)
+    n = 2000
+    block = {
+        "tenure_months": rng.integers(0, 60, n).astype(float),
+        "orders_per_month": rng.uniform(0, 8, n),
+        "avg_order_value": rng.uniform(200, 4000, n),
+        "recency_days": rng.integers(0, 90, n).astype(float),
+        "discount_usage_rate": rng.uniform(0, 1, n),
+        "return_rate": rng.uniform(0, 0.5, n),
+    }
+    X = clv_matrix(block)
+    y = X[:, 7] * 12 * (1 - X[:, 5]) + rng.normal(0, 100, n)
+    return xgb.XGBRegressor(n_estimators=30, max_depth=4).fit(X, y)
+
+
+def customers(n, seed=1):
+    rng = np.random.default_rng(seed)
+    return {
+        "tenure_months": rng.integers(0, 60, n).astype(float),
+        # few distinct values, so some customers share every column
+        "orders_per_month": rng.choice([1.0, 2.5, 4.0], n),
+        "avg_order_value": rng.choice([500.0, 1500.0], n),
+        "recency_days": rng.integers(0, 90, n).astype(float),
+        "discount_usage_rate": rng.uniform(0, 1, n),
+        "return_rate": rng.uniform(0, 0.5, n),
+    }
+
+
+def brute_force(model, cust, names, axes):
+    mesh = [m.reshape(-1) for m in np.meshgrid(*axes, indexing="ij")]
+    n = len(cust[CLV_INPUTS[0]])
+    block = {c: np.repeat(cust[c], len(mesh[0])) for c in CLV_INPUTS}
+    for name, values in zip(names, mesh):
+        block[name] = np.tile(values, n)
+    return model.predict(clv_matrix(block)).reshape((n,) + tuple(len(a) for a in axes))
+
+
+# ---------------------------
+# De-duplicated sweep vs scoring the full block
+# ---------------------------
+@pytest.mark.parametrize("grid", [
+    {"discount_usage_rate": {"start": 0, "stop": 1, "num": 40}, "return_rate": {"start": 0, "stop": 0.5, "num": 30}},
+    {"orders_per_month": {"start": 0.5, "stop": 8, "num": 25}, "avg_order_value": [200, 900, 900, 3000]},
+    {"tenure_months": [0, 6, 12, 24, 48]},
+    # coupled: monetary_value mixes the swept input with a per-customer one
+    {"orders_per_month": {"start": 0.5, "stop": 8, "num": 25}},
+])
+def test_sweep_matches_brute_force(model, grid):
+    names, axes = parse_grid(grid)
+    cust = customers(50)
+    result = sweep(model, cust, names, axes, chunk_rows=500)
+    assert result["clv"].shape == (50,) + tuple(len(a) for a in axes)
+    assert result["rows_total"] == 50 * int(np.prod([len(a) for a in axes]))
+    assert result["rows_scored"] <= result["rows_total"]
+    np.testing.assert_allclose(result["clv"], brute_force(model, cust, names, axes), rtol=1e-5, atol=1e-3)
+
+
+def test_sweep_deduplicates_uncoupled_grid(model):
+    names, axes = parse_grid({"discount_usage_rate": {"start": 0, "stop": 1, "num": 100},
+                              "return_rate": {"start": 0, "stop": 0.5, "num": 100}})
+    result = sweep(model, customers(50), names, axes)
+    assert result["rows_scored"] < result["rows_total"]
+
+
+def test_split_thresholds_follow_the_model(model):
+    assert split_thresholds(model) is split_thresholds(model)
+    other = xgb.XGBRegressor(n_estimators=2, max_depth=2).fit(np.eye(8), np.arange(8.0))
+    assert split_thresholds(other) is not split_thresholds(model)
+
+
+# ---------------------------
+# Grid parsing
+# ---------------------------
+@pytest.mark.parametrize("grid", [
+    None,
+    {},
+    {"loyalty_index": [1, 2]},
+    {"return_rate": [0.1, 1.5]},
+    {"return_rate": {"start": 0, "stop": 1}},
+    {"return_rate": {"start": 0, "stop": 1, "num": 0}},
+    {"return_rate": {"start": 0, "stop": 1, "num": -5}},
+    {"return_rate": {"start": 0, "stop": 1, "num": 10**12}},
+    {"return_rate": {"start": 0, "stop": 1, "num": 5000}, "discount_usage_rate": {"start": 0, "stop": 1, "num": 5000}},
+    {"return_rate": 0.3},
+])
+def test_parse_grid_rejects(grid):
+    with pytest.raises(ValueError):
+        parse_grid(grid)
+
+
+def test_parse_grid_caps_value_lists():
+    with pytest.raises(ValueError):
+        parse_grid({"return_rate": [0.5] * 11}, max_cells=10)
+    names, axes = parse_grid({"return_rate": [0.5] * 10}, max_cells=10)
+    assert names == ["return_rate"] and len(axes[0]) == 10
@@ -0,0 +1,30 @@
+# tests/test_coalescer.py
+import numpy as np
+import pytest
+
+from coalescer import BatchCoalescer
+
+
+def test_each_caller_gets_its_own_prediction():
+    coalescer = BatchCoalescer(lambda X: X.sum(axis=1), max_wait_ms=20, max_batch=8)
+    futures = [coalescer.submit([i, 1.0]) for i in range(20)]
+    assert [f.result(timeout=5) for f in futures] == [i + 1.0 for i in range(20)]
+    assert coalescer.stats()["rows"] == 20
+
+
+def test_vector_predictions_are_split_per_row():
+    coalescer = BatchCoalescer(lambda X: np.column_stack([X[:, 0], X[:, 0] * 2]), max_wait_ms=20)
+    futures = [coalescer.submit([i]) for i in range(5)]
+    assert [f.result(timeout=5).tolist() for f in futures] == [[i, 2 * i] for i in range(5)]
+
+
+@pytest.mark.parametrize("predict", [lambda X: X[:-1, 0], lambda X: np.float64(1.0), lambda X: X[:, 0].tolist() * 2])
+def test_wrong_number_of_results_fails_every_caller(predict):
+    coalescer = BatchCoalescer(predict, max_wait_ms=50, max_batch=4)
+    futures = [coalescer.submit([i]) for i in range(4)]
+    for f in futures:
+        with pytest.raises(RuntimeError, match="results for"):
+            f.result(timeout=5)
+    # The worker keeps serving afterwards
+    coalescer.predict_fn = lambda X: X[:, 0]
+    assert coalescer.predict_one([7.0]) == 7.0
@@ -0,0 +1,44 @@
+# tests/test_datastore.py
+import importlib.util
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datastore import FORMATS, iter_clean, read_clean, write_clean
+
+
+def footfall_frame(rows=40, stores=None):
+    dates = pd.date_range("2025-01-01", periods=rows, freq="D")
+    df = pd.DataFrame({
+        "date": dates,
+        "is_holiday": np.zeros(rows, dtype=int),
+        "promo_active": np.arange(rows) % 2,
+        "footfall": 100 + np.arange(rows),
+        "day_of_week": dates.dayofweek,
+        "is_weekend": (dates.dayofweek >= 5).astype(int),
+        "month": dates.month,
+    })
+    if stores:
+        df.insert(1, "store_id", [stores[i % len(stores)] for i in range(rows)])
+    return df
+
+
+def _formats():
+    if importlib.util.find_spec("pyarrow"):
+        return FORMATS
+    return [f for f in FORMATS if f not in ("parquet", "feather")]
+
+
+@pytest.mark.parametrize("fmt", _formats())
+@pytest.mark.parametrize("stores", [None, ["S1", "S2"]])
+def test_default_columns_skip_missing_optional_store_id(tmp_path, fmt, stores):
+    path = tmp_path / ("footfall.csv" if fmt == "csv" else f"footfall_{fmt}")
+    write_clean("footfall", footfall_frame(stores=stores), fmt=fmt, path=path)
+
+    df = read_clean("footfall", fmt=fmt, path=path)
+    assert ("store_id" in df.columns) == bool(stores)
+    assert len(df) == 40
+    chunks = list(iter_clean("footfall", chunksize=15, fmt=fmt, path=path))
+    assert [len(c) for c in chunks] == [15, 15, 10]
+    assert list(chunks[0].columns) == list(df.columns)
@@ -0,0 +1,79 @@
+# tests/test_dispatch.py
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from dispatch import ORDER_INPUTS, assign_wave, bottleneck_threshold, eta_matrix, solve
+from features import DELIVERY_FEATURES, delivery_matrix
+
+
+def brute_force(eta):
+    """(best total, best worst, best total among the assignments reaching best worst)."""
+    n_orders, n_riders = eta.shape
+    options = []
+    if n_orders <= n_riders:
+        for riders in permutations(range(n_riders), n_orders):
+            values = eta[np.arange(n_orders), list(riders)]
+            options.append((values.sum(), values.max()))
+    else:
+        for orders in permutations(range(n_orders), n_riders):
+            values = eta[list(orders), np.arange(n_riders)]
+            options.append((values.sum(), values.max()))
+    total = min(o[0] for o in options)
+    worst = min(o[1] for o in options)
+    return total, worst, min(o[0] for o in options if o[1] == worst)
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (4, 4), (3, 6), (6, 3), (5, 5)])
+@pytest.mark.parametrize("seed", range(5))
+def test_solve_matches_brute_force(shape, seed):
+    rng = np.random.default_rng(seed)
+    eta = rng.integers(10, 60, shape).astype(np.float64)  # integer ETAs: plenty of ties
+    total, worst, total_at_worst = brute_force(eta)
+
+    assert bottleneck_threshold(eta) == worst
+    orders, riders = solve(eta, "total")
+    assert len(orders) == min(shape) and len(set(riders)) == len(riders)
+    assert eta[orders, riders].sum() == pytest.approx(total)
+    orders, riders = solve(eta, "worst")
+    assert eta[orders, riders].max() == worst
+    assert eta[orders, riders].sum() == pytest.approx(total_at_worst)
+
+
+def test_solve_rejects_unknown_objective():
+    with pytest.raises(ValueError):
+        solve(np.ones((2, 2)), "fastest")
+
+
+def fake_eta(X):
+    """A stand-in delivery model: distance and traffic slow riders down, experience speeds them up."""
+    col = {c: X[:, i] for i, c in enumerate(DELIVERY_FEATURES)}
+    return 10 + 3 * col["distance_km"] + 4 * col["traffic_level"] - 0.2 * col["rider_experience_months"]
+
+
+def orders_block(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "distance_km": rng.uniform(1, 12, n), "num_items": rng.integers(1, 6, n),
+        "order_value": rng.uniform(100, 2000, n), "time_of_day_bucket": rng.integers(0, 3, n),
+        "traffic_level": rng.integers(1, 4, n),
+    }
+
+
+def test_eta_matrix_matches_scoring_every_pair():
+    orders, experience = orders_block(7), np.array([3, 12, 3, 0, 12, 30])
+    expected = np.empty((7, len(experience)))
+    for j, months in enumerate(experience):
+        block = {c: orders[c] for c in ORDER_INPUTS}
+        block["rider_experience_months"] = np.full(7, months)
+        expected[:, j] = fake_eta(delivery_matrix(block))
+    np.testing.assert_allclose(eta_matrix(fake_eta, orders, experience), expected)
+
+
+def test_assign_wave():
+    orders, experience = orders_block(5, seed=1), np.array([1, 20, 5])
+    plan = assign_wave(fake_eta, orders, experience, "worst")
+    assert len(plan["orders"]) == 3 and sorted(plan["riders"].tolist()) == [0, 1, 2]
+    eta = eta_matrix(fake_eta, orders, experience)
+    np.testing.assert_allclose(plan["eta"], eta[plan["orders"], plan["riders"]])
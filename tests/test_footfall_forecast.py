@@ -0,0 +1,26 @@
+# tests/test_footfall_forecast.py
+import numpy as np
+import pytest
+
+from footfall_forecast import calendar_features
+
+
+def test_calendar_features():
+    dates, cal = calendar_features("2025-01-01", "2025-01-07", holidays=["2025-01-01"],
+                                   promos=["2025-01-03", ["2025-01-05", "2025-01-06"]])
+    assert dates[0] == np.datetime64("2025-01-01") and len(dates) == 7
+    assert cal["day_of_week"].tolist() == [2, 3, 4, 5, 6, 0, 1]  # Wednesday first
+    assert cal["is_weekend"].tolist() == [0, 0, 0, 1, 1, 0, 0]
+    assert cal["is_holiday"].tolist() == [1, 0, 0, 0, 0, 0, 0]
+    assert cal["promo_active"].tolist() == [0, 0, 1, 0, 1, 1, 0]
+
+
+@pytest.mark.parametrize("holidays, promos", [
+    ("2025-01-01", []),            # a string, not a list of dates
+    ([], "2025-01-03"),
+    ([], [["2025-01-03"]]),        # not a [first, last] pair
+    ([], [["2025-01-03", "2025-01-04", "2025-01-05"]]),
+])
+def test_calendar_features_rejects_malformed_dates(holidays, promos):
+    with pytest.raises(ValueError):
+        calendar_features("2025-01-01", "2025-01-07", holidays, promos)
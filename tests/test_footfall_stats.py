@@ -0,0 +1,108 @@
+# tests/test_footfall_stats.py
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from footfall_forecast import calendar_features
+from footfall_stats import FootfallStats, fit_stores, to_days
+from features import FOOTFALL_FEATURES
+
+TOL = dict(rtol=1e-9, atol=1e-11)
+
+
+def footfall_rows(days=400, seed=0):
+    rng = np.random.default_rng(seed)
+    dates, cal = calendar_features("2023-01-01", np.datetime64("2023-01-01") + days - 1,
+                                   promos=[["2023-03-01", "2023-03-20"], ["2023-11-20", "2023-12-01"]])
+    cal["is_holiday"] = (rng.random(days) < 0.05).astype(np.int64)
+    X = np.column_stack([cal[f] for f in FOOTFALL_FEATURES]).astype(np.float64)
+    y = 150 + 30 * X[:, FOOTFALL_FEATURES.index("is_weekend")] + 40 * X[:, FOOTFALL_FEATURES.index("promo_active")] \
+        + 2 * X[:, FOOTFALL_FEATURES.index("month")] + rng.normal(0, 15, days)
+    return X, y, to_days(dates)
+
+
+def refit(X, y, weight=None):
+    model = LinearRegression().fit(X, y, sample_weight=weight)
+    return model.coef_, model.intercept_
+
+
+def test_incremental_updates_match_a_full_refit():
+    X, y, days = footfall_rows()
+    stats = FootfallStats.empty()
+    for lo in range(0, len(y), 37):
+        stats.update(X[lo:lo + 37], y[lo:lo + 37], days=days[lo:lo + 37])
+    coef, intercept = stats.solve()
+    expected_coef, expected_intercept = refit(X, y)
+    np.testing.assert_allclose(coef[0], expected_coef, **TOL)
+    np.testing.assert_allclose(intercept[0], expected_intercept, **TOL)
+    assert stats.count[0] == len(y)
+
+
+def test_forgetting_matches_a_weighted_refit():
+    X, y, days = footfall_rows()
+    forget = 0.99
+    stats = FootfallStats.empty()
+    for lo in range(0, len(y), 50):
+        stats.update(X[lo:lo + 50], y[lo:lo + 50], days=days[lo:lo + 50], forget=forget)
+    coef, intercept = stats.solve()
+    expected_coef, expected_intercept = refit(X, y, forget ** (days.max() - days).astype(np.float64))
+    np.testing.assert_allclose(coef[0], expected_coef, **TOL)
+    np.testing.assert_allclose(intercept[0], expected_intercept, **TOL)
+    with pytest.raises(ValueError):
+        FootfallStats.empty().update(X, y, forget=0.9)  # no days
+
+
+def test_per_store_statistics_and_merge():
+    X, y, days = footfall_rows(days=600)
+    stores = np.array(["S1", "S2", "S3"])[np.arange(len(y)) % 3]
+    y = y + 25 * (stores == "S2")
+
+    whole = FootfallStats.empty(stores=()).update(X, y, stores, days)
+    merged = FootfallStats.empty(stores=())
+    for part in np.array_split(np.arange(len(y)), 4):
+        merged.merge(FootfallStats.empty(stores=()).update(X[part], y[part], stores[part], days[part]))
+    assert merged.stores == whole.stores
+    np.testing.assert_allclose(merged.xtx, whole.xtx, rtol=1e-12)
+
+    coef, intercept = merged.solve()
+    for i, store in enumerate(merged.stores):
+        mask = stores == store
+        expected_coef, expected_intercept = refit(X[mask], y[mask])
+        np.testing.assert_allclose(coef[i], expected_coef, **TOL)
+        np.testing.assert_allclose(intercept[i], expected_intercept, **TOL)
+        np.testing.assert_allclose(merged.predict(X[mask][:5], stores[mask][:5]),
+                                   X[mask][:5] @ expected_coef + expected_intercept, **TOL)
+
+
+def test_squared_error_from_the_statistics():
+    X, y, days = footfall_rows()
+    stats = FootfallStats.empty().update(X, y, days=days)
+    coef, intercept = stats.solve()
+    sse, sst = stats.squared_error(coef, intercept)
+    residual = y - (X @ coef[0] + intercept[0])
+    np.testing.assert_allclose(sse[0], (residual ** 2).sum(), rtol=1e-7)
+    np.testing.assert_allclose(sst[0], ((y - y.mean()) ** 2).sum(), rtol=1e-9)
+
+
+def test_fit_stores_with_a_holdout_mask():
+    X, y, days = footfall_rows()
+    stores = np.full(len(y), "default")
+    test = np.random.default_rng(1).random(len(y)) < 0.2
+    shards = ((X[lo:lo + 64], y[lo:lo + 64], stores[lo:lo + 64], days[lo:lo + 64])
+              for lo in range(0, len(y), 64))
+    train, holdout, coef, intercept = fit_stores(shards, holdout_rows=test)
+    assert train.count[0] == (~test).sum() and holdout.count[0] == test.sum()
+    expected_coef, expected_intercept = refit(X[~test], y[~test])
+    np.testing.assert_allclose(coef[0], expected_coef, **TOL)
+    np.testing.assert_allclose(intercept[0], expected_intercept, **TOL)
+
+
+def test_save_and_load(tmp_path):
+    X, y, days = footfall_rows()
+    stats = FootfallStats.empty().update(X, y, days=days)
+    stats.save(tmp_path)
+    loaded = FootfallStats.load(tmp_path, mmap_mode="r")
+    assert loaded.stores == stats.stores and loaded.last_day == stats.last_day
+    np.testing.assert_array_equal(loaded.solve()[0], stats.solve()[0])
+    np.testing.assert_allclose(loaded.lookup_tables()[0].reshape(-1)[:5],
+                               stats.lookup_tables()[0].reshape(-1)[:5])
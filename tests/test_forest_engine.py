@@ -0,0 +1,77 @@
+# tests/test_forest_engine.py
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from forest_engine import CompactForest, ForestPredictor, sklearn_tree_values, tree_quantiles
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    # Delivery-like columns: continuous, small integers and a coarse bucket
+    rng = np.random.default_rng(0)
+    n = 2000
+    X = np.column_stack([
+        rng.uniform(0.5, 15, n).round(2),
+        rng.integers(1, 10, n),
+        rng.uniform(100, 3000, n).round(2),
+        rng.integers(0, 4, n),
+        rng.integers(1, 4, n),
+        rng.integers(0, 36, n),
+    ]).astype(np.float64)
+    y = 10 + 3 * X[:, 0] + 4 * X[:, 4] - 0.2 * X[:, 5] + rng.normal(0, 2, n)
+    rf = RandomForestRegressor(n_estimators=12, random_state=0).fit(X, y)
+    X_new = X[rng.integers(0, n, 500)] * rng.uniform(0.9, 1.1, (500, 6))
+    return rf, CompactForest.from_sklearn(rf), np.vstack([X_new, X[:50]])
+
+
+def test_per_tree_values_match_sklearn_exactly(fitted):
+    rf, forest, X = fitted
+    np.testing.assert_array_equal(forest.leaf_values(X), sklearn_tree_values(rf, X))
+
+
+def test_predict_matches_sklearn(fitted):
+    rf, forest, X = fitted
+    np.testing.assert_allclose(forest.predict(X), rf.predict(X), rtol=1e-12, atol=0)
+    np.testing.assert_allclose(forest.predict(X[:1]), rf.predict(X[:1]), rtol=1e-12, atol=0)
+
+
+def test_small_chunks_give_the_same_values(fitted):
+    _, forest, X = fitted
+    np.testing.assert_array_equal(forest.leaf_values(X, chunk_rows=7), forest.leaf_values(X))
+
+
+def test_save_and_memory_mapped_load(fitted, tmp_path):
+    _, forest, X = fitted
+    forest.save(tmp_path / "forest")
+    loaded = CompactForest.load(tmp_path / "forest", mmap_mode="r")
+    assert (loaded.n_trees, loaded.n_nodes, loaded.max_depth) == (forest.n_trees, forest.n_nodes, forest.max_depth)
+    np.testing.assert_array_equal(loaded.predict(X), forest.predict(X))
+
+
+def test_quantiles_match_np_quantile(fitted):
+    rf, forest, X = fitted
+    q = [0.1, 0.5, 0.9]
+    mean, values = forest.predict_quantiles(X, q)
+    expected = np.quantile(sklearn_tree_values(rf, X), q, axis=0)
+    np.testing.assert_allclose(values, expected, rtol=1e-12)
+    np.testing.assert_allclose(mean, rf.predict(X), rtol=1e-12)
+    with pytest.raises(ValueError):
+        tree_quantiles(forest.leaf_values(X), [1.5])
+
+
+def test_predictor_routes_large_batches_to_sklearn(fitted):
+    rf, forest, X = fitted
+    predictor = ForestPredictor(forest, rf, max_rows=10)
+    np.testing.assert_allclose(predictor.predict(X[:5]), rf.predict(X[:5]), rtol=1e-12)
+    np.testing.assert_allclose(predictor.predict(X), rf.predict(X), rtol=1e-12)
+    _, q_small = predictor.predict_quantiles(X[:5], [0.9])
+    _, q_large = predictor.predict_quantiles(X, [0.9])
+    np.testing.assert_allclose(q_large[:, :5], q_small, rtol=1e-12)
+
+
+def test_pruned_float32_forest_stays_close(fitted):
+    rf, forest, X = fitted
+    small = CompactForest.from_sklearn(rf, trees=[0, 3, 5], max_depth=6, float32=True)
+    assert small.n_trees == 3 and small.max_depth <= 6
+    np.testing.assert_allclose(small.leaf_values(X), forest.leaf_values(X, depth=6)[[0, 3, 5]], rtol=1e-6)
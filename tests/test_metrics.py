@@ -0,0 +1,55 @@
+# tests/test_metrics.py
+import pytest
+
+from config import METRICS_ENABLED
+from metrics import MetricsRegistry, StageTimer
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    hist = registry.histogram("t_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        hist.observe(value, ("/a",))
+    lines = registry.render().splitlines()
+    assert 't_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 't_seconds_bucket{route="/a",le="1.0"} 3' in lines
+    assert 't_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 't_seconds_sum{route="/a"} 3.65' in lines
+    assert 't_seconds_count{route="/a"} 4' in lines
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.histogram("t", "Test.", ("route",), buckets=(1.0,)).observe(0.5, ('a"b\\c\nd',))
+    assert 't_count{route="a\\"b\\\\c\\nd"} 1' in registry.render().splitlines()
+
+
+def test_collectors_skip_missing_values():
+    registry = MetricsRegistry()
+    registry.collector(lambda: [("t_size", "gauge", "Test.", [({"cache": "clv"}, 3), ({"cache": "x"}, None)])])
+    lines = registry.render().splitlines()
+    assert "# TYPE t_size gauge" in lines
+    assert 't_size{cache="clv"} 3' in lines
+    assert not any(line.startswith('t_size{cache="x"}') for line in lines)
+
+
+def test_stage_timer_observes_each_stage():
+    registry = MetricsRegistry()
+    hist = registry.histogram("t_stage", "Test.", ("route", "stage"))
+    timer = StageTimer(hist, "/r")
+    timer.mark("parse")
+    timer.mark("predict")
+    text = registry.render()
+    assert 't_stage_count{route="/r",stage="parse"} 1' in text
+    assert 't_stage_count{route="/r",stage="predict"} 1' in text
+
+
+@pytest.mark.skipif(not METRICS_ENABLED, reason="RP360_METRICS=0")
+def test_metrics_endpoint_reports_requests():
+    from web_app import app
+
+    client = app.test_client()
+    client.post("/api/footfall/forecast", json=[1])
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'rp360_http_request_seconds_count{route="/api/footfall/forecast",method="POST",status="400"}' in text
+    assert "process_resident_memory_bytes" in text
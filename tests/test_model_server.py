@@ -0,0 +1,89 @@
+# tests/test_model_server.py
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+import app
+import model_server
+from model_client import REQUEST, ModelServerError, connect
+from model_registry import ModelRegistry
+
+
+class RowSum:
+    def predict(self, X):
+        return X.sum(axis=1)
+
+    def predict_quantiles(self, X, quantiles):
+        mean = self.predict(X)
+        return mean, np.array([mean * q for q in quantiles])
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    """A model server on a temporary socket, serving RowSum for every model."""
+    registry = ModelRegistry()
+    for name in ("footfall", "delivery", "clv"):
+        registry.register(name, lambda: (RowSum(), {"source": "test"}))
+    monkeypatch.setattr(model_server, "registry", registry)
+
+    path = str(tmp_path / "m.sock")
+    server = model_server.ModelServer(path, model_server.Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+
+
+def test_predict_round_trip(daemon):
+    with connect(daemon) as client:
+        assert client.ping()
+        assert list(client.predict("footfall", [[5, 1, 0, 1, 11]])) == [18.0]
+        X = np.arange(12, dtype=np.float64).reshape(2, 6)
+        assert list(client.predict("delivery", X)) == [15.0, 51.0]
+        mean, (p90,) = client.predict_quantiles("delivery", X, [0.9])
+        assert list(mean) == [15.0, 51.0] and list(p90) == pytest.approx([13.5, 45.9])
+
+
+def test_errors_are_reported_and_the_connection_stays_usable(daemon):
+    with connect(daemon) as client:
+        with pytest.raises(ModelServerError, match="expects 6 values"):
+            client.predict("delivery", [[1, 2, 3]])
+        with pytest.raises(ModelServerError, match="only available for the delivery model"):
+            client.predict_quantiles("clv", [[0] * 8], [0.5])
+        assert list(client.predict("clv", [[1] * 8])) == [8.0]
+
+
+def test_oversized_request_is_refused(daemon):
+    with connect(daemon) as client:
+        client.sock.sendall(REQUEST.pack(1, 0, 0, 10**9, 6))
+        with pytest.raises(ModelServerError, match="Bad request"):
+            client._call(0)  # reads the refusal; the daemon then drops the connection
+
+
+def test_connect_returns_none_without_a_daemon(tmp_path):
+    assert connect(tmp_path / "none.sock") is None
+    stale = tmp_path / "stale.sock"
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(str(stale))
+    sock.close()
+    assert connect(stale) is None
+
+
+def test_app_falls_back_when_the_daemon_goes_away(monkeypatch):
+    class GoneClient:
+        closed = False
+
+        def predict(self, name, rows):
+            raise ConnectionResetError("daemon stopped")
+
+        def close(self):
+            self.closed = True
+
+    client = GoneClient()
+    monkeypatch.setattr(app, "_DAEMON", [client])
+    monkeypatch.setattr(app, "_model", lambda name: RowSum())
+    assert app._predict("clv", [1] * 8) == 8.0
+    assert client.closed and app._DAEMON == [None]
@@ -0,0 +1,89 @@
+# tests/test_pipeline.py
+import subprocess
+import sys
+import textwrap
+import threading
+from pathlib import Path
+
+import pytest
+
+import pipeline
+
+STAGES_MODULE = textwrap.dedent('''
+    from pathlib import Path
+
+
+    def fail(path):
+        raise RuntimeError("corrupted input")
+
+
+    def write(path):
+        Path(path).write_text("ok")
+''')
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    (tmp_path / "rp360_test_stages.py").write_text(STAGES_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "rp360_test_stages", raising=False)  # a previous test's copy
+    monkeypatch.setattr(pipeline, "STATE_FILE", tmp_path / "state.json")
+    monkeypatch.setattr(pipeline, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(pipeline, "LOGS_DIR", tmp_path / "logs")
+    return tmp_path
+
+
+def _stage(name, func, path, deps=()):
+    return pipeline.Stage(name, "rp360_test_stages", func, inputs=[], outputs=[path],
+                          deps=deps, kwargs={"path": str(path)})
+
+
+def _run(stages, jobs):
+    out = {}
+    worker = threading.Thread(target=lambda: out.update(result=pipeline.run(stages, list(stages), jobs)),
+                              daemon=True)
+    worker.start()
+    worker.join(120)
+    assert not worker.is_alive(), "pipeline.run() did not return"
+    return out["result"]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_failed_stage_skips_its_dependents(workdir, jobs):
+    stages = {
+        "prepare:a": _stage("prepare:a", "fail", workdir / "a.txt"),
+        "train:a": _stage("train:a", "write", workdir / "a.model", deps=["prepare:a"]),
+        "prepare:b": _stage("prepare:b", "write", workdir / "b.txt"),
+    }
+    report, ok = _run(stages, jobs)
+
+    status = {name: s for name, s, _ in report}
+    assert not ok
+    assert status["prepare:a"].startswith("FAILED")
+    assert status["train:a"] == "skipped (upstream failed)"
+    assert status["prepare:b"] == "ran"
+    assert not (workdir / "a.model").exists()
+
+
+FINGERPRINT = "import pipeline; print(pipeline.code_fingerprint(pipeline.build_stages()['{}']))"
+
+
+@pytest.mark.parametrize("stage", ["eda:footfall", "train:delivery"])
+def test_code_fingerprint_is_stable_across_processes(stage):
+    # eda.AGGREGATES / eda.PLOTS hold functions, whose repr carries a memory address
+    cwd = Path(pipeline.__file__).parent
+    runs = [subprocess.run([sys.executable, "-c", FINGERPRINT.format(stage)], cwd=cwd,
+                           capture_output=True, text=True, check=True).stdout for _ in range(2)]
+    assert runs[0] == runs[1]
+
+
+def test_functions_in_containers_are_hashed_by_source(workdir, monkeypatch):
+    monkeypatch.setattr(pipeline, "BASE_DIR", workdir)  # the test module counts as project code
+    module = workdir / "rp360_test_stages.py"
+    module.write_text(STAGES_MODULE + "\n\nHANDLERS = {'a': write}\n\ndef uses():\n    return HANDLERS\n")
+    stage = pipeline.Stage("eda:x", "rp360_test_stages", "uses", inputs=[], outputs=[])
+    before = pipeline.code_fingerprint(stage)
+
+    module.write_text(module.read_text().replace('write_text("ok")', 'write_text("changed")'))
+    sys.modules.pop("rp360_test_stages")
+    assert pipeline.code_fingerprint(stage) != before
@@ -0,0 +1,91 @@
+# tests/test_prediction_cache.py
+import numpy as np
+import pytest
+
+import prediction_cache
+from prediction_cache import PredictionCache
+
+
+class Model:
+    """Counts calls; the prediction is the row sum."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, X):
+        self.calls += 1
+        return float(X.sum())
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prediction_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_quantized_rows_share_an_entry():
+    model = Model()
+    cache = PredictionCache("t", 2, steps={0: 0.1}, derive=lambda X: np.column_stack([X[:, 0], X[:, 0] * 2]))
+    assert cache.predict_one([4.21, 0], model) == pytest.approx(4.2 * 3)
+    assert cache.predict_one([4.19, 99], model) == pytest.approx(4.2 * 3)
+    assert model.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_generation_change_empties_the_cache():
+    model, generation = Model(), [0]
+    cache = PredictionCache("t", 2, generation=lambda: generation[0])
+    cache.predict_one([1, 2], model)
+    cache.predict_one([1, 2], model)
+    generation[0] += 1
+    cache.predict_one([1, 2], model)
+    assert model.calls == 2
+    assert cache.stats()["invalidations"] == 1 and cache.stats()["generation"] == 1
+
+
+def test_result_from_a_reloaded_model_is_not_served():
+    model, generation = Model(), [0]
+    cache = PredictionCache("t", 1, generation=lambda: generation[0])
+
+    def reload_mid_predict(X):
+        generation[0] += 1
+        return model(X)
+
+    cache.predict_one([1], reload_mid_predict)
+    cache.predict_one([1], model)
+    assert model.calls == 2
+
+
+def test_entries_expire_after_ttl(clock):
+    model = Model()
+    cache = PredictionCache("t", 1, ttl=60)
+    cache.predict_one([1], model)
+    clock[0] += 59
+    cache.predict_one([1], model)
+    assert model.calls == 1
+    clock[0] += 2
+    cache.predict_one([1], model)
+    assert model.calls == 2 and cache.stats()["expirations"] == 1
+
+
+def test_zero_ttl_never_expires(clock):
+    model = Model()
+    cache = PredictionCache("t", 1, ttl=0)
+    cache.predict_one([1], model)
+    clock[0] += 1e9
+    cache.predict_one([1], model)
+    assert model.calls == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    model = Model()
+    cache = PredictionCache("t", 1, maxsize=2)
+    for x in (1, 2, 1, 3):  # 1 is used again, so 2 is the one to go
+        cache.predict_one([x], model)
+    assert cache.stats()["evictions"] == 1
+    calls = model.calls
+    cache.predict_one([1], model)
+    assert model.calls == calls
+    cache.predict_one([2], model)
+    assert model.calls == calls + 1
@@ -0,0 +1,106 @@
+# tests/test_prepare_data.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import prepare_data
+from datastore import read_clean
+
+ROWS = 203  # not a multiple of the chunk size
+
+
+def raw_footfall(path, shuffled=False, stores=False, days=ROWS):
+    rng = np.random.default_rng(1)
+    dates = pd.date_range("2024-11-15", periods=days, freq="D").strftime("%Y-%m-%d")
+    df = pd.DataFrame({
+        "date": np.sort(np.resize(dates, ROWS)),
+        "is_holiday": rng.choice([0, 1, np.nan], ROWS, p=[0.85, 0.1, 0.05]),
+        "promo_active": rng.choice([0, 1, np.nan], ROWS, p=[0.6, 0.35, 0.05]),
+        "footfall": rng.integers(10, 400, ROWS),
+    })
+    if stores:
+        df.insert(1, "store_id", rng.choice(["S1", "S2", None], ROWS))
+    if shuffled:  # out of date order: the chunked path falls back to its bucket sort
+        df = df.sample(frac=1, random_state=1)
+    df.to_csv(path, index=False, float_format="%g")
+
+
+def raw_delivery(path):
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({
+        "distance_km": rng.uniform(-0.5, 15, ROWS).round(2),
+        "num_items": rng.integers(1, 10, ROWS),
+        "order_value": rng.uniform(100, 3000, ROWS).round(1),
+        "time_of_day_bucket": rng.integers(0, 4, ROWS),
+        "traffic_level": rng.integers(1, 4, ROWS),
+        "rider_experience_months": rng.integers(0, 36, ROWS),
+        "delivery_time_min": rng.uniform(2, 90, ROWS).round(1),
+    })
+    for col in prepare_data.DELIVERY_FILL_COLS:
+        df.loc[rng.random(ROWS) < 0.1, col] = np.nan
+    df.to_csv(path, index=False)
+
+
+def raw_clv(path):
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({
+        "customer_id": [f"CUST_{i:04d}" for i in range(ROWS)],
+        "tenure_months": rng.integers(1, 60, ROWS),
+        "orders_per_month": rng.uniform(-0.2, 6, ROWS).round(2),
+        "avg_order_value": rng.uniform(100, 3000, ROWS).round(2),
+        "recency_days": rng.integers(0, 365, ROWS),
+        "discount_usage_rate": rng.uniform(0, 0.7, ROWS).round(2),
+        "return_rate": rng.uniform(0, 0.4, ROWS).round(2),
+        "clv_next_12m": rng.uniform(1000, 90000, ROWS).round(2),
+    })
+    for col in prepare_data.CLV_FILL_COLS:
+        df.loc[rng.random(ROWS) < 0.1, col] = np.nan
+    df.to_csv(path, index=False)
+
+
+CASES = {
+    "footfall": (prepare_data.prepare_footfall, raw_footfall),
+    "footfall-shuffled": (prepare_data.prepare_footfall, lambda p: raw_footfall(p, shuffled=True)),
+    "footfall-stores": (prepare_data.prepare_footfall, lambda p: raw_footfall(p, shuffled=True, stores=True)),
+    # several stores per day: rows with equal dates must keep their input order on both paths
+    "footfall-dup-dates": (prepare_data.prepare_footfall, lambda p: raw_footfall(p, stores=True, days=40)),
+    "footfall-dup-shuffled": (prepare_data.prepare_footfall,
+                              lambda p: raw_footfall(p, shuffled=True, stores=True, days=40)),
+    "delivery": (prepare_data.prepare_delivery, raw_delivery),
+    "clv": (prepare_data.prepare_clv, raw_clv),
+}
+
+
+@pytest.mark.parametrize("case", CASES)
+@pytest.mark.parametrize("chunksize", [7, 64])
+def test_chunked_csv_is_byte_identical(tmp_path, case, chunksize):
+    prepare, make_raw = CASES[case]
+    src = tmp_path / "raw.csv"
+    make_raw(src)
+
+    rows = prepare(src, tmp_path / "memory.csv", fmt="csv")
+    assert prepare(src, tmp_path / "chunked.csv", chunksize=chunksize, fmt="csv") == rows
+    assert (tmp_path / "chunked.csv").read_bytes() == (tmp_path / "memory.csv").read_bytes()
+
+
+@pytest.mark.parametrize("case", ["footfall-shuffled", "delivery", "clv"])
+def test_chunked_npy_matches(tmp_path, case):
+    prepare, make_raw = CASES[case]
+    src = tmp_path / "raw.csv"
+    make_raw(src)
+    name = case.split("-")[0]
+
+    prepare(src, tmp_path / "memory", fmt="npy")
+    prepare(src, tmp_path / "chunked", chunksize=7, fmt="npy")
+    pd.testing.assert_frame_equal(read_clean(name, fmt="npy", path=tmp_path / "chunked"),
+                                  read_clean(name, fmt="npy", path=tmp_path / "memory"))
+
+
+def test_streaming_medians_match_pandas(tmp_path):
+    src = tmp_path / "raw.csv"
+    raw_delivery(src)
+    df = pd.read_csv(src, dtype=prepare_data.DELIVERY_DTYPES)
+    for chunksize in (5, 50, 1000):
+        got = prepare_data.streaming_medians(src, prepare_data.DELIVERY_FILL_COLS,
+                                             prepare_data.DELIVERY_DTYPES, chunksize)
+        assert got and got == prepare_data.frame_medians(df, prepare_data.DELIVERY_FILL_COLS)
@@ -0,0 +1,43 @@
+# tests/test_score_clv.py
+import io
+
+import numpy as np
+import pandas as pd
+
+import score_clv
+from features import CLV_INPUTS
+
+
+class FakeModel:
+    def predict(self, X):
+        return X[:, 7] * 12  # monetary_value over a year
+
+
+ROWS = [
+    # customer_id, tenure, orders/month, aov, recency, discount, returns
+    ("ok", 12, 2.0, 900.0, 10, 0.2, 0.05),
+    ("rate", 12, 2.0, 900.0, 10, 1.7, 0.05),
+    ("negative", -3, 2.0, 900.0, 10, 0.2, 0.05),
+    ("fraction", 12, 2.0, 900.0, 2.5, 0.2, 0.05),
+    ("zero_orders", 12, 0.0, 900.0, 10, 0.2, 0.05),
+    ("filled", 12, 2.0, 900.0, np.nan, 0.2, 0.05),
+]
+
+
+def test_score_chunk_rejects_rows_that_break_the_rules(monkeypatch):
+    monkeypatch.setitem(score_clv._WORKER, "model", FakeModel())
+    monkeypatch.setitem(score_clv._WORKER, "medians", {"recency_days": 30.0})
+    chunk = pd.DataFrame(ROWS, columns=["customer_id", *CLV_INPUTS]).astype(score_clv.READ_DTYPES)
+
+    out, counts, totals, rejected = score_clv.score_chunk(chunk)
+
+    assert rejected == 4 and sum(counts.values()) == 2
+    reasons = pd.read_csv(io.StringIO(out["rejected.csv"]), names=["customer_id", "reason"])
+    assert dict(zip(reasons["customer_id"], reasons["reason"])) == {
+        "rate": "invalid discount_usage_rate",
+        "negative": "invalid tenure_months",
+        "fraction": "invalid recency_days",
+        "zero_orders": "non-positive orders_per_month or avg_order_value",
+    }
+    scored = "".join(text for name, text in out.items() if name != "rejected.csv")
+    assert "ok," in scored and "filled," in scored
@@ -0,0 +1,168 @@
+# tests/test_web_app.py
+import csv
+import io
+
+import numpy as np
+import pytest
+
+import web_app
+from config import FOOTFALL_MODEL
+from web_app import app
+
+needs_footfall = pytest.mark.skipif(not FOOTFALL_MODEL.exists(), reason="run train_models.py first")
+
+FOOTFALL_FORM = {"day_of_week": "5", "is_holiday": "0", "promo_active": "1", "month": "11", "store_id": ""}
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+# ---------------------------
+# Footfall form and calendar forecast
+# ---------------------------
+@pytest.mark.parametrize("field, value", [
+    ("day_of_week", "9"), ("day_of_week", "-1"), ("month", "13"), ("month", "0"),
+    ("is_holiday", "2"), ("promo_active", "x"), ("month", ""),
+])
+def test_footfall_form_rejects_out_of_range_values(client, field, value):
+    resp = client.post("/footfall", data=dict(FOOTFALL_FORM, **{field: value}))
+    assert resp.status_code == 400
+    assert field.encode() in resp.data
+
+
+@needs_footfall
+def test_footfall_form_predicts(client):
+    assert client.post("/footfall", data=FOOTFALL_FORM).status_code == 200
+
+
+@pytest.mark.parametrize("body", [
+    [1, 2],
+    "2025-01-01",
+    {"end": "2025-01-10"},
+    {"start": "2025-01-10", "end": "2025-01-01"},
+    {"start": "2025-01-01", "end": "2099-12-31"},
+    {"start": "soon", "end": "2025-01-01"},
+    {"start": "2025-01-01", "end": "2025-01-10", "holidays": "2025-01-01"},
+    {"start": "2025-01-01", "end": "2025-01-10", "promos": [["2025-01-03"]]},
+])
+def test_footfall_forecast_rejects_bad_bodies(client, body):
+    resp = client.post("/api/footfall/forecast", json=body)
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()
+
+
+@needs_footfall
+def test_footfall_forecast(client):
+    resp = client.post("/api/footfall/forecast", json={"start": "2025-01-01", "end": "2025-01-07",
+                                                       "promos": [["2025-01-03", "2025-01-04"]]})
+    body = resp.get_json()
+    assert resp.status_code == 200
+    assert len(body["dates"]) == len(body["footfall"]) == 7
+
+
+@pytest.mark.parametrize("body", [
+    [1, 2],
+    "2025-01-01",
+    {"end": "2025-01-10"},
+    {"start": "2025-01-01", "stores": "S0001"},
+    {"start": "2025-01-01", "stores": [1, 2]},
+])
+def test_store_forecast_rejects_bad_bodies(client, body):
+    resp = client.post("/api/footfall/stores/forecast", json=body)
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()
+
+
+# ---------------------------
+# Rider assignment
+# ---------------------------
+ORDER = {"id": "o1", "distance_km": 4.2, "num_items": 3, "order_value": 640, "time_of_day_bucket": 1,
+         "traffic_level": 2}
+
+
+@pytest.mark.parametrize("body, status", [
+    ([1, 2], 400),
+    ({"orders": [ORDER]}, 400),
+    ({"orders": [ORDER], "riders": [{"rider_experience_months": 3}], "objective": "fastest"}, 400),
+    ({"orders": [ORDER], "riders": ["r1"]}, 400),
+    ({"orders": [dict(ORDER, traffic_level=7)], "riders": [{"rider_experience_months": 3}]}, 400),
+    ({"orders": [ORDER] * 1001, "riders": [{"rider_experience_months": 3}] * 1000}, 413),
+])
+def test_assign_rejects_bad_waves(client, body, status):
+    resp = client.post("/api/delivery/assign", json=body)
+    assert resp.status_code == status
+    assert "error" in resp.get_json()
+
+
+# ---------------------------
+# CLV what-if sweep
+# ---------------------------
+CUSTOMER = {"tenure_months": 12, "orders_per_month": 2.5, "avg_order_value": 900, "recency_days": 10,
+            "discount_usage_rate": 0.2, "return_rate": 0.05}
+GRID = {"return_rate": {"start": 0, "stop": 0.4, "num": 100}}
+
+
+@pytest.mark.parametrize("body, status", [
+    ([1, 2], 400),
+    ({"grid": GRID}, 400),
+    ({"customer": CUSTOMER, "grid": GRID, "reduce": "max"}, 400),
+    ({"customer": dict(CUSTOMER, return_rate=3), "grid": GRID}, 400),
+    ({"customer": CUSTOMER, "grid": {"return_rate": {"start": 0, "stop": 1, "num": 10**12}}}, 400),
+    ({"customer": CUSTOMER, "grid": {"return_rate": {"start": 0, "stop": 1, "num": -1}}}, 400),
+    ({"customers": [CUSTOMER] * 300_000, "grid": GRID}, 413),
+])
+def test_sweep_rejects_bad_requests(client, body, status):
+    resp = client.post("/api/clv/sweep", json=body)
+    assert resp.status_code == status
+    assert "error" in resp.get_json()
+
+
+# ---------------------------
+# Batch scoring
+# ---------------------------
+FOOTFALL_ROWS = [{"day_of_week": 5, "is_holiday": 0, "promo_active": 1, "month": 11}] * 3
+
+
+def test_stream_csv_quotes_ids(monkeypatch):
+    monkeypatch.setattr(web_app, "BATCH_STREAM_CHUNK", 2)
+    ids = ["a,b", 'say "hi"', "line\nbreak"]
+    body = "".join(web_app._stream_csv(ids, np.array([1.5, 2.0, 3.25]), np.array(["Low", "Mid", "High"]),
+                                       {"p90": np.array([2.0, 3.0, 4.0])}))
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0] == ["id", "prediction", "label", "p90"]
+    assert [r[0] for r in rows[1:]] == ids
+    assert rows[3] == ["line\nbreak", "3.25", "High", "4.0"]
+
+
+@pytest.mark.parametrize("name, kwargs, status", [
+    ("weather", {"json": FOOTFALL_ROWS}, 404),
+    ("footfall", {"json": {"rows": "nope"}}, 400),
+    ("footfall", {"json": [dict(FOOTFALL_ROWS[0], month=13)]}, 400),
+    ("footfall", {"json": {"columns": {"day_of_week": [5, 6], "is_holiday": [0, 0], "promo_active": [1, 1],
+                                       "month": [11, 11], "id": ["x"]}}}, 400),
+    ("footfall", {"data": b"", "content_type": "text/csv"}, 400),
+    ("delivery", {"json": [dict(ORDER, rider_experience_months=3)], "query_string": {"quantiles": "1.5"}}, 400),
+    ("delivery", {"json": [dict(ORDER, rider_experience_months=3)], "query_string": {"quantiles": "p90"}}, 400),
+])
+def test_batch_rejects_bad_requests(client, name, kwargs, status):
+    resp = client.post(f"/api/{name}/batch", **kwargs)
+    assert resp.status_code == status
+    assert "error" in resp.get_json()
+
+
+def test_batch_rejects_too_many_rows(client, monkeypatch):
+    monkeypatch.setattr(web_app, "BATCH_MAX_ROWS", 2)
+    resp = client.post("/api/footfall/batch", json=FOOTFALL_ROWS)
+    assert resp.status_code == 413
+
+
+@needs_footfall
+def test_batch_csv_round_trips_ids(client):
+    rows = [dict(r, id=i) for r, i in zip(FOOTFALL_ROWS, ["a,b", "c", 'd"e'])]
+    resp = client.post("/api/footfall/batch?format=csv", json=rows)
+    assert resp.status_code == 200
+    out = list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+    assert [r["id"] for r in out] == ["a,b", "c", 'd"e']
+    assert resp.headers["X-Batch-Rows"] == "3"
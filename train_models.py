@@ -1,141 +1,401 @@
-import sys
-from pathlib import Path
-
-# Ensure local imports work
-sys.path.append(str(Path(__file__).resolve().parent))
-
-import pandas as pd
-import numpy as np
-import joblib
-
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, r2_score
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from xgboost import XGBRegressor  # <- third, different algo
-
-from config import (
-    CLEAN_FOOTFALL, CLEAN_DELIVERY, CLEAN_CLV,
-    FOOTFALL_MODEL, DELIVERY_MODEL, CLV_MODEL
-)
-
-print("\n=== PHASE 4: MODEL TRAINING (3 different algorithms) ===\n")
-
-# ----------------------------------------------------
-# 1️⃣ Footfall Model – Linear Regression
-# ----------------------------------------------------
-print(">> Training Footfall model (Linear Regression)...")
-
-df_foot = pd.read_csv(CLEAN_FOOTFALL)
-
-X_foot = df_foot[["day_of_week", "is_weekend", "is_holiday", "promo_active", "month"]]
-y_foot = df_foot["footfall"]
-
-X_train_f, X_test_f, y_train_f, y_test_f = train_test_split(
-    X_foot, y_foot, test_size=0.2, random_state=42
-)
-
-foot_model = LinearRegression()
-foot_model.fit(X_train_f, y_train_f)
-
-y_pred_f = foot_model.predict(X_test_f)
-mae_f = mean_absolute_error(y_test_f, y_pred_f)
-r2_f = r2_score(y_test_f, y_pred_f)
-
-print(f"   Footfall MAE: {mae_f:.2f}")
-print(f"   Footfall R²:  {r2_f:.3f}")
-
-joblib.dump(foot_model, FOOTFALL_MODEL)
-print(f"   ✔ Saved Linear Regression model → {FOOTFALL_MODEL}\n")
-
-
-# ----------------------------------------------------
-# 2️⃣ Delivery Time Model – Random Forest
-# ----------------------------------------------------
-print(">> Training Delivery Time model (Random Forest Regressor)...")
-
-df_del = pd.read_csv(CLEAN_DELIVERY)
-
-X_del = df_del[
-    [
-        "distance_km",
-        "num_items",
-        "order_value",
-        "time_of_day_bucket",
-        "traffic_level",
-        "rider_experience_months",
-    ]
-]
-y_del = df_del["delivery_time_min"]
-
-X_train_d, X_test_d, y_train_d, y_test_d = train_test_split(
-    X_del, y_del, test_size=0.2, random_state=42
-)
-
-del_model = RandomForestRegressor(
-    n_estimators=200,
-    max_depth=None,
-    random_state=42,
-    n_jobs=-1,
-)
-del_model.fit(X_train_d, y_train_d)
-
-y_pred_d = del_model.predict(X_test_d)
-mae_d = mean_absolute_error(y_test_d, y_pred_d)
-r2_d = r2_score(y_test_d, y_pred_d)
-
-print(f"   Delivery MAE: {mae_d:.2f} minutes")
-print(f"   Delivery R²:  {r2_d:.3f}")
-
-joblib.dump(del_model, DELIVERY_MODEL)
-print(f"   ✔ Saved Random Forest model → {DELIVERY_MODEL}\n")
-
-
-# ----------------------------------------------------
-# 3️⃣ CLV Model – XGBoost Regressor
-# ----------------------------------------------------
-print(">> Training CLV model (XGBoost Regressor)...")
-
-df_clv = pd.read_csv(CLEAN_CLV)
-
-X_clv = df_clv[
-    [
-        "tenure_months",
-        "orders_per_month",
-        "avg_order_value",
-        "recency_days",
-        "discount_usage_rate",
-        "return_rate",
-        "loyalty_index",
-        "monetary_value",
-    ]
-]
-y_clv = df_clv["clv_next_12m"]
-
-X_train_c, X_test_c, y_train_c, y_test_c = train_test_split(
-    X_clv, y_clv, test_size=0.2, random_state=42
-)
-
-clv_model = XGBRegressor(
-    n_estimators=300,
-    max_depth=4,
-    learning_rate=0.08,
-    subsample=0.9,
-    colsample_bytree=0.9,
-    objective="reg:squarederror",
-    random_state=42,
-)
-clv_model.fit(X_train_c, y_train_c)
-
-y_pred_c = clv_model.predict(X_test_c)
-mae_c = mean_absolute_error(y_test_c, y_pred_c)
-r2_c = r2_score(y_test_c, y_pred_c)
-
-print(f"   CLV MAE: ₹{mae_c:,.2f}")
-print(f"   CLV R²:  {r2_c:.3f}")
-
-joblib.dump(clv_model, CLV_MODEL)
-print(f"   ✔ Saved XGBoost model → {CLV_MODEL}\n")
-
-
-print("✅ PHASE 4 DONE: All three models trained with different algorithms.\n")
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import shutil
+import sys
+import time
+import traceback
+from multiprocessing import get_context
+from multiprocessing.connection import wait
+from pathlib import Path
+
+# Ensure local imports work
+sys.path.append(str(Path(__file__).resolve().parent))
+
+import numpy as np
+import joblib
+
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.linear_model import LinearRegression
+from sklearn.ensemble import RandomForestRegressor
+from xgboost import XGBRegressor  # <- third, different algo
+
+from config import (
+    FOOTFALL_MODEL, DELIVERY_MODEL, CLV_MODEL,
+    FOOTFALL_ARRAYS, FOOTFALL_STORES, DELIVERY_FOREST, DELIVERY_FOREST_SMALL, CLV_BOOSTER,
+    TRAIN_CORES, TRAIN_CORE_SHARES, TRAINING_REPORT, TRAINING_CONFIG,
+)
+from datastore import read_clean, iter_clean, stored_columns
+from footfall_forecast import build_table
+from footfall_stats import DEFAULT_STORE, FootfallStats, to_days, fit_stores, export_store_models
+from forest_engine import CompactForest
+
+
+STORE_SHARD_ROWS = 250_000  # rows per shard of the per-store footfall fit
+
+
+def model_params(name):
+    """Hyperparameters for one model from training_config.json (written by tune.py)."""
+    with open(TRAINING_CONFIG) as f:
+        return json.load(f)[name]
+
+
+def make_estimator(name, n_jobs=None):
+    """The unfitted model train_<name>() fits (also used by benchmarks/suite.py)."""
+    if name == "footfall":
+        return LinearRegression(n_jobs=n_jobs)
+    if name == "delivery":
+        return RandomForestRegressor(**model_params("delivery"), random_state=42, n_jobs=n_jobs)
+    return XGBRegressor(**model_params("clv"), objective="reg:squarederror", random_state=42, n_jobs=n_jobs)
+
+
+# ----------------------------------------------------
+# 1️⃣ Footfall Model – Linear Regression
+# ----------------------------------------------------
+def train_footfall(n_jobs=None):
+    print(">> Training Footfall model (Linear Regression)...")
+
+    foot_cols = ["day_of_week", "is_weekend", "is_holiday", "promo_active", "month"]
+    df_foot = read_clean("footfall", ["date"] + foot_cols + ["footfall"])
+
+    X_foot = df_foot[foot_cols]
+    y_foot = df_foot["footfall"]
+
+    X_train_f, X_test_f, y_train_f, y_test_f = train_test_split(
+        X_foot, y_foot, test_size=0.2, random_state=42
+    )
+
+    foot_model = make_estimator("footfall", n_jobs)
+    foot_model.fit(X_train_f, y_train_f)
+
+    y_pred_f = foot_model.predict(X_test_f)
+    mae_f = mean_absolute_error(y_test_f, y_pred_f)
+    r2_f = r2_score(y_test_f, y_pred_f)
+
+    print(f"   Footfall MAE: {mae_f:.2f}")
+    print(f"   Footfall R²:  {r2_f:.3f}")
+
+    # The whole input space is 7 x 2 x 2 x 12 points: ship every prediction with the model
+    foot_model.lookup_table_ = build_table(foot_model)
+    print(f"   Lookup table: {foot_model.lookup_table_.size} precomputed predictions")
+
+    joblib.dump(foot_model, FOOTFALL_MODEL)
+    print(f"   ✔ Saved Linear Regression model → {FOOTFALL_MODEL}")
+
+    # Plain arrays for memory-mapped serving
+    FOOTFALL_ARRAYS.mkdir(parents=True, exist_ok=True)
+    np.save(FOOTFALL_ARRAYS / "lookup_table.npy", foot_model.lookup_table_)
+    np.save(FOOTFALL_ARRAYS / "coef.npy", foot_model.coef_)
+    np.save(FOOTFALL_ARRAYS / "intercept.npy", np.atleast_1d(foot_model.intercept_))
+    print(f"   ✔ Exported lookup table and coefficients → {FOOTFALL_ARRAYS}")
+
+    # Sufficient statistics of the same fit, so new days can be added without a refit
+    stats = FootfallStats.empty().update(
+        X_train_f.to_numpy(), y_train_f.to_numpy(), days=to_days(df_foot.loc[X_train_f.index, "date"])
+    )
+    coef, _ = stats.solve()
+    stats.save(FOOTFALL_ARRAYS)
+    print(f"   ✔ Saved running statistics (max |coef diff| vs refit {np.abs(coef[0] - foot_model.coef_).max():.1e})")
+
+    # Per-store models: one pass of per-store statistics (sharded over n_jobs processes),
+    # one batched solve, one coefficient matrix. Single-store data gives one "default" row.
+    start = time.perf_counter()
+    has_stores = "store_id" in stored_columns("footfall")
+    cols = ["date"] + foot_cols + ["footfall"] + (["store_id"] if has_stores else [])
+
+    def shards():
+        for chunk in iter_clean("footfall", cols, chunksize=STORE_SHARD_ROWS):
+            stores = (chunk["store_id"].astype(str).to_numpy() if has_stores
+                      else np.full(len(chunk), DEFAULT_STORE))
+            yield (chunk[foot_cols].to_numpy(np.float64), chunk["footfall"].to_numpy(np.float64),
+                   stores, to_days(chunk["date"]))
+
+    # Hold out the same rows as the model above, so the "default" store of
+    # single-store data is that very model
+    test_rows = np.zeros(len(df_foot), dtype=bool)
+    test_rows[df_foot.index.get_indexer(X_test_f.index)] = True
+    train_stats, holdout, coef, intercept = fit_stores(shards(), n_jobs=n_jobs or 1, holdout_rows=test_rows)
+    export_store_models(train_stats, FOOTFALL_STORES, coef, intercept)
+    sse, sst = holdout.squared_error(coef, intercept)
+    rmse = np.sqrt(sse / np.maximum(holdout.count, 1))[holdout.count > 0]
+    print(f"   Per-store models: {train_stats.n_stores:,} store(s) in {time.perf_counter() - start:.2f}s, "
+          f"holdout RMSE median {np.median(rmse):.2f} (p90 {np.percentile(rmse, 90):.2f})")
+    print(f"   ✔ Saved per-store coefficient matrix → {FOOTFALL_STORES}\n")
+    return {"mae": mae_f, "r2": r2_f, "stores": train_stats.n_stores,
+            "store_r2": float(1 - sse.sum() / sst.sum()) if sst.sum() > 0 else None}
+
+
+# ----------------------------------------------------
+# 2️⃣ Delivery Time Model – Random Forest
+# ----------------------------------------------------
+def train_delivery(n_jobs=-1):
+    print(">> Training Delivery Time model (Random Forest Regressor)...")
+
+    del_cols = [
+        "distance_km",
+        "num_items",
+        "order_value",
+        "time_of_day_bucket",
+        "traffic_level",
+        "rider_experience_months",
+    ]
+    df_del = read_clean("delivery", del_cols + ["delivery_time_min"])
+
+    X_del = df_del[del_cols]
+    y_del = df_del["delivery_time_min"]
+
+    X_train_d, X_test_d, y_train_d, y_test_d = train_test_split(
+        X_del, y_del, test_size=0.2, random_state=42
+    )
+
+    del_model = make_estimator("delivery", n_jobs)
+    del_model.fit(X_train_d, y_train_d)
+
+    y_pred_d = del_model.predict(X_test_d)
+    mae_d = mean_absolute_error(y_test_d, y_pred_d)
+    r2_d = r2_score(y_test_d, y_pred_d)
+
+    print(f"   Delivery MAE: {mae_d:.2f} minutes")
+    print(f"   Delivery R²:  {r2_d:.3f}")
+
+    joblib.dump(del_model, DELIVERY_MODEL)
+    print(f"   ✔ Saved Random Forest model → {DELIVERY_MODEL}")
+
+    # Flattened copy for the array-backed predictor
+    forest = CompactForest.from_sklearn(del_model)
+    max_diff = np.abs(forest.predict(X_test_d.to_numpy()) - y_pred_d).max()
+    forest.save(DELIVERY_FOREST)
+    print(f"   ✔ Exported compact forest ({forest.n_nodes:,} nodes, max |diff| {max_diff:.1e}) → {DELIVERY_FOREST}")
+
+    # A compressed forest was cut from the previous model
+    if DELIVERY_FOREST_SMALL.exists():
+        shutil.rmtree(DELIVERY_FOREST_SMALL)
+        print(f"   ✔ Removed stale {DELIVERY_FOREST_SMALL.name} (re-run compress_forest.py)")
+    print()
+    return {"mae": mae_d, "r2": r2_d}
+
+
+# ----------------------------------------------------
+# 3️⃣ CLV Model – XGBoost Regressor
+# ----------------------------------------------------
+def train_clv(n_jobs=None):
+    print(">> Training CLV model (XGBoost Regressor)...")
+
+    clv_cols = [
+        "tenure_months",
+        "orders_per_month",
+        "avg_order_value",
+        "recency_days",
+        "discount_usage_rate",
+        "return_rate",
+        "loyalty_index",
+        "monetary_value",
+    ]
+    df_clv = read_clean("clv", clv_cols + ["clv_next_12m"])
+
+    X_clv = df_clv[clv_cols]
+    y_clv = df_clv["clv_next_12m"]
+
+    X_train_c, X_test_c, y_train_c, y_test_c = train_test_split(
+        X_clv, y_clv, test_size=0.2, random_state=42
+    )
+
+    clv_model = make_estimator("clv", n_jobs)
+    clv_model.fit(X_train_c, y_train_c)
+
+    y_pred_c = clv_model.predict(X_test_c)
+    mae_c = mean_absolute_error(y_test_c, y_pred_c)
+    r2_c = r2_score(y_test_c, y_pred_c)
+
+    print(f"   CLV MAE: ₹{mae_c:,.2f}")
+    print(f"   CLV R²:  {r2_c:.3f}")
+
+    joblib.dump(clv_model, CLV_MODEL)
+    clv_model.save_model(CLV_BOOSTER)
+    print(f"   ✔ Saved XGBoost model → {CLV_MODEL} (native: {CLV_BOOSTER.name})\n")
+    return {"mae": mae_c, "r2": r2_c}
+
+
+# ----------------------------------------------------
+# Parallel training (one process per model, shared core budget)
+# ----------------------------------------------------
+TRAIN_JOBS = {"footfall": train_footfall, "delivery": train_delivery, "clv": train_clv}
+THREAD_ENV = ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"]
+
+
+def split_cores(total, shares=TRAIN_CORE_SHARES):
+    """Whole cores per model in proportion to shares, at least one each (needs a core per model)."""
+    if total < len(shares):
+        raise ValueError(f"{total} core(s) cannot run {len(shares)} models side by side; train sequentially")
+    weight = sum(shares.values())
+    cores = {name: max(1, int(total * share / weight)) for name, share in shares.items()}
+    by_share = sorted(shares, key=shares.get, reverse=True)
+    i = 0
+    while sum(cores.values()) < total:
+        cores[by_share[i % len(by_share)]] += 1
+        i += 1
+    while sum(cores.values()) > total:
+        cores[max(cores, key=cores.get)] -= 1
+    return cores
+
+
+def _peak_rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _run_measured(name, cores, capture=False):
+    """Train one model and return its metrics with wall time, CPU time and peak RSS."""
+    out = io.StringIO()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_start = usage.ru_utime + usage.ru_stime
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(out) if capture else contextlib.nullcontext():
+            metrics = TRAIN_JOBS[name](n_jobs=cores)
+        error = None
+    except Exception:
+        metrics, error = None, traceback.format_exc()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        "model": name,
+        "cores": cores,
+        "wall_seconds": time.perf_counter() - start,
+        "cpu_seconds": usage.ru_utime + usage.ru_stime - cpu_start,
+        "peak_rss_bytes": _peak_rss_bytes(),
+        "metrics": metrics,
+        "error": error,
+        "output": out.getvalue(),
+    }
+
+
+def _train_job(name, cores, conn):
+    """Child process entry point."""
+    conn.send(_run_measured(name, cores, capture=True))
+    conn.close()
+
+
+def train_sequential(total_cores=TRAIN_CORES, names=None):
+    """Same report, one model after another in this process (peak RSS is cumulative)."""
+    names = names or list(TRAIN_JOBS)
+    start = time.perf_counter()
+    models = []
+    for name in names:
+        result = _run_measured(name, total_cores)
+        result.pop("output")
+        models.append(result)
+    return {"total_cores": total_cores, "mode": "sequential",
+            "wall_seconds": time.perf_counter() - start, "models": models}
+
+
+def train_parallel(total_cores=TRAIN_CORES, names=None):
+    names = names or list(TRAIN_JOBS)
+    # Without spare cores every model would get exactly one, whatever its share:
+    # one model at a time on all cores finishes sooner
+    if total_cores <= len(names):
+        return train_sequential(total_cores, names)
+    cores = split_cores(total_cores, {n: TRAIN_CORE_SHARES.get(n, 1) for n in names})
+    ctx = get_context("spawn")
+    start = time.perf_counter()
+
+    procs, conns = {}, {}
+    saved = {k: os.environ.get(k) for k in THREAD_ENV}
+    try:
+        for name in names:
+            # Native thread pools size themselves from these at import time
+            for k in THREAD_ENV:
+                os.environ[k] = str(cores[name])
+            recv, send = ctx.Pipe(duplex=False)
+            proc = ctx.Process(target=_train_job, args=(name, cores[name], send), name=f"train-{name}")
+            proc.start()
+            send.close()
+            procs[name], conns[recv] = proc, name
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+    # A child that dies without sending closes its end of the pipe, so recv() raises EOFError
+    results = {}
+    while conns:
+        for ready in wait(list(conns)):
+            name = conns.pop(ready)
+            try:
+                results[name] = ready.recv()
+            except EOFError:
+                results[name] = {"model": name, "cores": cores[name],
+                                 "error": f"process exited with code {procs[name].join() or procs[name].exitcode}"}
+            print(results[name].get("output", ""), end="")
+    for proc in procs.values():
+        proc.join()
+
+    report = {
+        "total_cores": total_cores,
+        "mode": "parallel",
+        "wall_seconds": time.perf_counter() - start,
+        "models": [{k: v for k, v in results[n].items() if k != "output"} for n in names],
+    }
+    return report
+
+
+def print_report(report):
+    print(f"{'model':<9} | {'cores':>5} | {'wall s':>7} | {'CPU s':>7} | {'CPU/wall':>8} | {'peak MB':>8}")
+    print("-" * 60)
+    for r in report["models"]:
+        if r.get("error"):
+            print(f"{r['model']:<9} | {r['cores']:>5} | FAILED")
+            continue
+        print(f"{r['model']:<9} | {r['cores']:>5} | {r['wall_seconds']:>7.2f} | {r['cpu_seconds']:>7.2f} | "
+              f"{r['cpu_seconds'] / max(r['wall_seconds'], 1e-9):>8.2f} | {r['peak_rss_bytes'] / 1e6:>8.1f}")
+    walls = [r["wall_seconds"] for r in report["models"] if not r.get("error")]
+    if walls:
+        print(f"\nEnd-to-end {report['wall_seconds']:.2f}s  (slowest model {max(walls):.2f}s, "
+              f"sum of models {sum(walls):.2f}s, {report['total_cores']} cores)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the footfall, delivery and CLV models.")
+    parser.add_argument("--cores", type=int, default=TRAIN_CORES,
+                        help=f"total core budget shared by the models (default {TRAIN_CORES})")
+    parser.add_argument("--sequential", action="store_true",
+                        help="train one model after another in this process")
+    args = parser.parse_args()
+
+    print("\n=== PHASE 4: MODEL TRAINING (3 different algorithms) ===\n")
+    # Parallel training needs more cores than models (see train_parallel)
+    if args.sequential or args.cores <= len(TRAIN_JOBS):
+        print(f"Training sequentially on {args.cores} core(s)\n")
+        report = train_sequential(args.cores)
+    else:
+        cores = split_cores(args.cores)
+        print("Core budget: " + ", ".join(f"{n} {c}" for n, c in cores.items()) + f" (of {args.cores})\n")
+        report = train_parallel(args.cores)
+    print_report(report)
+
+    TRAINING_REPORT.parent.mkdir(parents=True, exist_ok=True)
+    TRAINING_REPORT.write_text(json.dumps(report, indent=2))
+    print(f"✔ Training report → {TRAINING_REPORT}\n")
+
+    failed = [r for r in report["models"] if r.get("error")]
+    for r in failed:
+        print(f"✖ {r['model']} failed:\n{r['error']}")
+    if failed:
+        sys.exit(1)
+    print("✅ PHASE 4 DONE: All three models trained with different algorithms.\n")
+
+
+if __name__ == "__main__":
+    main()
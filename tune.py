@@ -0,0 +1,275 @@
+# tune.py
+"""
+Hyperparameter search for the delivery (RandomForest) and CLV (XGBoost) models.
+
+    python tune.py --model clv --configs 243
+    python tune.py --model all --workers 16 --no-write
+
+Random configurations (plus the current one from training_config.json) are
+scored with k-fold CV and successive halving: every configuration gets the
+smallest budget, the best 1/eta of them move on with eta times the budget,
+and so on up to the full budget.
+
+    clv       budget = boosting rounds. Each rung continues the previous
+              rung's boosters instead of starting over, and the validation
+              MAE curve gives early stopping for free: n_estimators is the
+              best round of the mean curve.
+    delivery  budget = share of each training fold's rows.
+
+Fold indices are drawn once in the parent. Every worker process loads the
+data and builds its per-fold arrays / XGBoost QuantileDMatrix objects once, in
+the pool initializer, and every trial it runs reuses them. The winner is
+merged into training_config.json (which train_models.py reads) and all trials
+with their timings go to outputs/logs/tuning_<model>.json.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+import numpy as np
+
+from config import TRAINING_CONFIG, LOGS_DIR, TUNING_WORKERS
+from features import DELIVERY_FEATURES, CLV_FEATURES
+
+TARGETS = {"delivery": "delivery_time_min", "clv": "clv_next_12m"}
+FEATURES = {"delivery": DELIVERY_FEATURES, "clv": CLV_FEATURES}
+# (smallest, full) budget per model: boosting rounds / share of training rows
+BUDGETS = {"clv": (25, 900), "delivery": (1 / 27, 1.0)}
+SEED = 42
+
+
+# ---------------------------
+# Search spaces
+# ---------------------------
+def sample_configs(model, n, rng):
+    configs = []
+    for _ in range(n):
+        if model == "clv":
+            configs.append({
+                "max_depth": int(rng.integers(2, 9)),
+                "learning_rate": round(float(np.exp(rng.uniform(np.log(0.01), np.log(0.3)))), 4),
+                "subsample": round(float(rng.uniform(0.5, 1.0)), 3),
+                "colsample_bytree": round(float(rng.uniform(0.5, 1.0)), 3),
+                "min_child_weight": round(float(np.exp(rng.uniform(0, np.log(20)))), 3),
+                "reg_lambda": round(float(np.exp(rng.uniform(np.log(0.1), np.log(10)))), 3),
+            })
+        else:
+            configs.append({
+                "n_estimators": int(rng.choice([100, 200, 300, 400])),
+                "max_depth": [None, 6, 10, 14, 20][rng.integers(5)],
+                "min_samples_leaf": int(rng.choice([1, 2, 4, 8, 16])),
+                "max_features": [1.0, 0.8, 0.6, 0.4, "sqrt"][rng.integers(5)],
+            })
+    return configs
+
+
+def make_folds(n_rows, k, seed=SEED):
+    """k (train, valid) index pairs; train indices are shuffled so any prefix is a random sample."""
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(n_rows)
+    folds = []
+    for part in np.array_split(np.arange(n_rows), k):
+        valid = np.sort(order[part])
+        train = order[np.setdiff1d(np.arange(n_rows), part, assume_unique=True)]
+        folds.append((train, valid))
+    return folds
+
+
+# ---------------------------
+# Worker side
+# ---------------------------
+_WORKER = {}
+
+
+def _init_worker(model, folds, threads):
+    from datastore import read_clean
+
+    df = read_clean(model, FEATURES[model] + [TARGETS[model]])
+    X = df[FEATURES[model]].to_numpy(np.float32)
+    y = df[TARGETS[model]].to_numpy(np.float64)
+
+    parts = []
+    for train, valid in folds:
+        if model == "clv":
+            import xgboost as xgb
+            dtrain = xgb.QuantileDMatrix(X[train], label=y[train], nthread=threads)
+            dvalid = xgb.QuantileDMatrix(X[valid], label=y[valid], ref=dtrain, nthread=threads)
+            parts.append((dtrain, dvalid))
+        else:
+            parts.append((X[train], y[train], X[valid], y[valid]))
+    _WORKER.update(model=model, folds=parts, threads=threads)
+
+
+def _xgb_params(config, threads):
+    params = {k: v for k, v in config.items() if k != "n_estimators"}
+    params.update(objective="reg:squarederror", eval_metric="mae", seed=SEED, nthread=threads)
+    return params
+
+
+def _clv_trial(cfg_id, config, rounds, boosters):
+    """Grow each fold's booster to `rounds`; return the new part of each validation MAE curve."""
+    import xgboost as xgb
+
+    start = time.perf_counter()
+    params = _xgb_params(config, _WORKER["threads"])
+    curves, saved = [], []
+    for i, (dtrain, dvalid) in enumerate(_WORKER["folds"]):
+        previous = None
+        if boosters:
+            previous = xgb.Booster(model_file=bytearray(boosters[i]))
+        done = previous.num_boosted_rounds() if previous is not None else 0
+        history = {}
+        booster = xgb.train(params, dtrain, num_boost_round=rounds - done, evals=[(dvalid, "valid")],
+                            evals_result=history, xgb_model=previous, verbose_eval=False)
+        curves.append(history["valid"]["mae"])
+        saved.append(bytes(booster.save_raw("ubj")))
+    return cfg_id, curves, saved, time.perf_counter() - start
+
+
+def _delivery_trial(cfg_id, config, share):
+    from sklearn.ensemble import RandomForestRegressor
+
+    start = time.perf_counter()
+    errors = []
+    for X_train, y_train, X_valid, y_valid in _WORKER["folds"]:
+        n = max(2, int(len(X_train) * share))
+        model = RandomForestRegressor(**config, random_state=SEED, n_jobs=_WORKER["threads"])
+        model.fit(X_train[:n], y_train[:n])
+        errors.append(np.abs(model.predict(X_valid) - y_valid).mean())
+    return cfg_id, float(np.mean(errors)), None, time.perf_counter() - start
+
+
+# ---------------------------
+# Successive halving
+# ---------------------------
+def successive_halving(model, configs, folds, workers, threads, eta=3, budget=None):
+    low, full = budget or BUDGETS[model]
+    alive = list(range(len(configs)))
+    resource = low
+    curves = {}      # clv: cfg_id -> per-fold MAE curves so far
+    boosters = {}    # clv: cfg_id -> per-fold boosters to continue from
+    trials, rungs = [], []
+
+    ctx = get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(model, folds, threads)) as pool:
+        while True:
+            rung_start = time.perf_counter()
+            if model == "clv":
+                rounds = int(round(resource))
+                futures = [pool.submit(_clv_trial, i, configs[i], rounds, boosters.get(i)) for i in alive]
+            else:
+                futures = [pool.submit(_delivery_trial, i, configs[i], resource) for i in alive]
+
+            scores, best_rounds = {}, {}
+            for future in as_completed(futures):
+                cfg_id, result, saved, seconds = future.result()
+                if model == "clv":
+                    per_fold = curves.setdefault(cfg_id, [[] for _ in folds])
+                    for fold_curve, new in zip(per_fold, result):
+                        fold_curve.extend(new)
+                    boosters[cfg_id] = saved
+                    mean_curve = np.mean(per_fold, axis=0)
+                    best_rounds[cfg_id] = int(np.argmin(mean_curve)) + 1
+                    scores[cfg_id] = float(mean_curve[best_rounds[cfg_id] - 1])
+                else:
+                    scores[cfg_id] = result
+                trials.append({
+                    "rung": len(rungs), "config_id": cfg_id, "budget": resource,
+                    "cv_mae": scores[cfg_id], "best_round": best_rounds.get(cfg_id),
+                    "seconds": round(seconds, 4),
+                })
+
+            ranked = sorted(alive, key=scores.get)
+            rung_seconds = time.perf_counter() - rung_start
+            rung_trials = [t["seconds"] for t in trials if t["rung"] == len(rungs)]
+            rungs.append({"configs": len(alive), "budget": resource, "best_cv_mae": scores[ranked[0]],
+                          "seconds": rung_seconds, "mean_trial_seconds": float(np.mean(rung_trials))})
+            budget_label = f"{int(round(resource))} rounds" if model == "clv" else f"{resource:.0%} rows"
+            print(f"   rung {len(rungs) - 1}: {len(alive):>4} configs × {budget_label:<10} "
+                  f"best CV MAE {scores[ranked[0]]:,.3f}  ({rung_seconds:.1f}s, "
+                  f"{np.mean(rung_trials):.3f}s/trial)")
+
+            if resource >= full or len(alive) == 1:
+                break
+            alive = ranked[:max(1, len(alive) // eta)]
+            for cfg_id in list(boosters):
+                if cfg_id not in alive:
+                    del boosters[cfg_id]
+            resource = min(resource * eta, full)
+
+    best = ranked[0]
+    params = dict(configs[best])
+    if model == "clv":
+        params["n_estimators"] = best_rounds[best]
+    return {"best_id": best, "best_params": params, "best_cv_mae": scores[best],
+            "rungs": rungs, "trials": trials}
+
+
+def load_training_config():
+    with open(TRAINING_CONFIG) as f:
+        return json.load(f)
+
+
+def tune(model, n_configs, k, workers, threads, eta):
+    current = load_training_config()[model]
+    rng = np.random.default_rng(SEED)
+    # The current configuration competes too (config 0), so tuning never makes things worse
+    baseline = {key: v for key, v in current.items() if model != "clv" or key != "n_estimators"}
+    configs = [baseline] + sample_configs(model, n_configs - 1, rng)
+
+    from datastore import read_clean
+    n_rows = len(read_clean(model, [TARGETS[model]]))
+    folds = make_folds(n_rows, k)
+
+    print(f"\n>> Tuning {model}: {len(configs)} configs, {k}-fold CV, eta={eta}, "
+          f"{workers} worker(s) × {threads} thread(s)")
+    start = time.perf_counter()
+    result = successive_halving(model, configs, folds, workers, threads, eta)
+    result["seconds"] = time.perf_counter() - start
+    result["configs"] = configs
+    result["previous_params"] = current
+    print(f"   Best (config {result['best_id']}): CV MAE {result['best_cv_mae']:,.3f} "
+          f"in {result['seconds']:.1f}s over {len(result['trials'])} trials")
+    print(f"   {json.dumps(result['best_params'])}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the delivery and CLV models with successive halving.")
+    parser.add_argument("--model", choices=["clv", "delivery", "all"], default="all")
+    parser.add_argument("--configs", type=int, default=81, help="random configurations per model (default 81)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--eta", type=int, default=3, help="keep the best 1/eta each rung (default 3)")
+    parser.add_argument("--workers", type=int, default=TUNING_WORKERS,
+                        help=f"worker processes (default {TUNING_WORKERS})")
+    parser.add_argument("--cores", type=int, default=os.cpu_count() or 1,
+                        help="total cores; each worker gets cores // workers threads")
+    parser.add_argument("--no-write", action="store_true", help=f"do not update {TRAINING_CONFIG.name}")
+    args = parser.parse_args()
+
+    threads = max(1, args.cores // args.workers)
+    models = ["delivery", "clv"] if args.model == "all" else [args.model]
+
+    print("\n=== HYPERPARAMETER TUNING (k-fold CV + successive halving) ===")
+    results = {m: tune(m, args.configs, args.folds, args.workers, threads, args.eta) for m in models}
+
+    for m, result in results.items():
+        path = LOGS_DIR / f"tuning_{m}.json"
+        path.write_text(json.dumps(result, indent=2))
+        print(f"\n✔ Trials and timings → {path}")
+
+    if not args.no_write:
+        config = load_training_config()
+        for m, result in results.items():
+            config[m] = result["best_params"]
+        TRAINING_CONFIG.write_text(json.dumps(config, indent=2) + "\n")
+        print(f"✔ Best parameters written → {TRAINING_CONFIG} (re-run train_models.py to use them)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
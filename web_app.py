@@ -1,129 +1,784 @@
-import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).resolve().parent))
-
-from flask import Flask, render_template, request
-import numpy as np
-import joblib
-
-from config import FOOTFALL_MODEL, DELIVERY_MODEL, CLV_MODEL
-
-app = Flask(__name__)
-
-# Load models
-footfall_model = joblib.load(FOOTFALL_MODEL)
-delivery_model = joblib.load(DELIVERY_MODEL)
-clv_model = joblib.load(CLV_MODEL)
-
-
-# ---------------- HOME / MODEL SELECTOR ----------------
-@app.route("/")
-def home():
-    return render_template("index.html")
-
-
-# ---------------- FOOTFALL PAGE ----------------
-@app.route("/footfall", methods=["GET", "POST"])
-def footfall_page():
-    result = None
-
-    if request.method == "POST":
-        day_of_week = int(request.form.get("day_of_week"))
-        month = int(request.form.get("month"))
-        is_holiday = int(request.form.get("is_holiday"))
-        promo_active = int(request.form.get("promo_active"))
-        is_weekend = 1 if day_of_week >= 5 else 0
-
-        X = np.array([[day_of_week, is_weekend, is_holiday, promo_active, month]])
-        pred = footfall_model.predict(X)[0]
-
-        if pred > 500:
-            rec = "High traffic day: increase staff and run in-store promotions."
-        elif pred > 300:
-            rec = "Medium traffic day: normal staff, consider peak-hour offers."
-        else:
-            rec = "Low traffic day: optimise staffing and push digital campaigns."
-
-        result = {
-            "prediction": f"{pred:.0f}",
-            "recommendation": rec,
-        }
-
-    return render_template("footfall.html", result=result)
-
-
-# ---------------- DELIVERY PAGE ----------------
-@app.route("/delivery", methods=["GET", "POST"])
-def delivery_page():
-    result = None
-
-    if request.method == "POST":
-        distance_km = float(request.form.get("distance_km"))
-        num_items = int(request.form.get("num_items"))
-        order_value = float(request.form.get("order_value"))
-        time_of_day_bucket = int(request.form.get("time_of_day_bucket"))
-        traffic_level = int(request.form.get("traffic_level"))
-        rider_experience_months = int(request.form.get("rider_experience_months"))
-
-        X = np.array([[distance_km, num_items, order_value,
-                       time_of_day_bucket, traffic_level,
-                       rider_experience_months]])
-        pred = delivery_model.predict(X)[0]
-
-        if pred > 45:
-            rec = "High delay risk: inform customer early and avoid tight SLAs."
-        elif pred > 30:
-            rec = "Moderate delay risk: assign experienced rider and check route."
-        else:
-            rec = "Low delay risk: use this slot for express delivery promises."
-
-        result = {
-            "prediction": f"{pred:.1f}",
-            "recommendation": rec,
-        }
-
-    return render_template("delivery.html", result=result)
-
-
-# ---------------- CLV PAGE ----------------
-@app.route("/clv", methods=["GET", "POST"])
-def clv_page():
-    result = None
-
-    if request.method == "POST":
-        tenure_months = int(request.form.get("tenure_months"))
-        orders_per_month = float(request.form.get("orders_per_month"))
-        avg_order_value = float(request.form.get("avg_order_value"))
-        recency_days = int(request.form.get("recency_days"))
-        discount_usage_rate = float(request.form.get("discount_usage_rate"))
-        return_rate = float(request.form.get("return_rate"))
-
-        loyalty_index = (1 - discount_usage_rate) * (1 - return_rate)
-        monetary_value = orders_per_month * avg_order_value
-
-        X = np.array([[tenure_months, orders_per_month, avg_order_value,
-                       recency_days, discount_usage_rate, return_rate,
-                       loyalty_index, monetary_value]])
-        pred = clv_model.predict(X)[0]
-
-        if pred > 50000:
-            segment = "High Value"
-            rec = "Pamper with VIP perks, loyalty rewards, and early access."
-        elif pred > 20000:
-            segment = "Medium Value"
-            rec = "Use targeted offers and personalised nudges to grow value."
-        else:
-            segment = "Low Value"
-            rec = "Use low-cost campaigns to increase frequency and engagement."
-
-        result = {
-            "prediction": f"{pred:,.2f}",
-            "segment": segment,
-            "recommendation": rec,
-        }
-
-    return render_template("clv.html", result=result)
-
-
-if __name__ == "__main__":
-    app.run(debug=True)
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+import csv
+import io
+import json
+import time
+
+from flask import Flask, Response, g, jsonify, render_template, request, stream_with_context
+import numpy as np
+import pandas as pd
+
+from config import (
+    BATCH_MAX_ROWS, BATCH_STREAM_CHUNK, FORECAST_MAX_DAYS,
+    COALESCE_ENABLED, COALESCE_MAX_WAIT_MS, COALESCE_MAX_BATCH,
+    PREDICTION_CACHE_ENABLED, PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL, PREDICTION_CACHE_STEPS,
+    METRICS_ENABLED, ASSIGN_MAX_PAIRS, DELIVERY_QUANTILES, DELIVERY_RISK_QUANTILE, SWEEP_MAX_ROWS,
+)
+from clv_sweep import parse_grid, sweep
+from coalescer import BatchCoalescer
+from dispatch import ORDER_INPUTS, OBJECTIVES, assign_wave
+from model_registry import registry
+from prediction_cache import PredictionCache
+from metrics import metrics, StageTimer, NullTimer, HTTP_SECONDS, STAGE_SECONDS, PREDICT_SECONDS, PREDICT_ROWS
+from features import (
+    DELIVERY_FEATURES, CLV_FEATURES,
+    FOOTFALL_INPUTS, DELIVERY_INPUTS, CLV_INPUTS,
+    validate_block, footfall_matrix, delivery_matrix, clv_matrix,
+    footfall_level, delivery_risk, clv_segment,
+)
+
+app = Flask(__name__)
+
+# Models are loaded lazily on first registry.get() (see model_registry.py). Footfall
+# is served from the lookup table precomputed at train time.
+
+
+
+# ---------------- INSTRUMENTATION (/metrics) ----------------
+def stage_timer():
+    """Per-request stage timer for the current route (no-op when metrics are off)."""
+    if not METRICS_ENABLED:
+        return NullTimer()
+    rule = request.url_rule
+    return StageTimer(STAGE_SECONDS, rule.rule if rule else "unmatched")
+
+
+def observe_predict(name, seconds, rows):
+    if METRICS_ENABLED:
+        PREDICT_SECONDS.observe(seconds, (name,))
+        PREDICT_ROWS.observe(rows, (name,))
+
+
+def model_predict(name, X):
+    """registry.get(name).predict(X), timed per model."""
+    start = time.perf_counter()
+    pred = registry.get(name).predict(X)
+    observe_predict(name, time.perf_counter() - start, len(X))
+    return pred
+
+
+# Delivery ETA quantiles served with the mean; the risk quantile is always among them
+ETA_QUANTILES = tuple(sorted(set(DELIVERY_QUANTILES) | (
+    {DELIVERY_RISK_QUANTILE} if DELIVERY_RISK_QUANTILE is not None else set()
+)))
+
+
+def delivery_eta(X, quantiles=ETA_QUANTILES):
+    """(rows x 1+len(quantiles)): the mean ETA, then each quantile, from one pass over the trees."""
+    start = time.perf_counter()
+    mean, q = registry.get("delivery").predict_quantiles(X, quantiles)
+    observe_predict("delivery", time.perf_counter() - start, len(X))
+    return np.column_stack([mean, q.T])
+
+
+def _row_model(name):
+    """X -> one prediction per row (a vector per row for delivery with quantiles)."""
+    if name == "delivery" and ETA_QUANTILES:
+        return delivery_eta
+    return lambda X: model_predict(name, X)
+
+
+if METRICS_ENABLED:
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.get("request_start")
+        if start is not None:
+            rule = request.url_rule
+            HTTP_SECONDS.observe(time.perf_counter() - start,
+                                 (rule.rule if rule else "unmatched", request.method, str(response.status_code)))
+        return response
+
+
+# Optional micro-batching of concurrent single-row form requests
+# (footfall lookups are cheaper than queueing, so only the two ML models)
+coalescers = {}
+if COALESCE_ENABLED:
+    for _name in ["delivery", "clv"]:
+        coalescers[_name] = BatchCoalescer(
+            _row_model(_name),
+            max_wait_ms=COALESCE_MAX_WAIT_MS,
+            max_batch=COALESCE_MAX_BATCH,
+            name=_name,
+        )
+
+
+# Optional cache of single-row predictions, emptied when a model is reloaded
+caches = {}
+if PREDICTION_CACHE_ENABLED:
+    def _steps(columns):
+        return {columns.index(c): s for c, s in PREDICTION_CACHE_STEPS.items() if c in columns}
+
+    def _clv_rederive(X):
+        # loyalty_index / monetary_value follow the (quantized) raw inputs
+        return clv_matrix({c: X[:, i] for i, c in enumerate(CLV_INPUTS)})
+
+    caches["delivery"] = PredictionCache(
+        "delivery", len(DELIVERY_FEATURES), steps=_steps(DELIVERY_FEATURES),
+        generation=lambda: (registry.generation("delivery"), registry.generation("delivery_sklearn")),
+        maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL,
+    )
+    caches["clv"] = PredictionCache(
+        "clv", len(CLV_FEATURES), steps=_steps(CLV_INPUTS), derive=_clv_rederive,
+        generation=lambda: registry.generation("clv"),
+        maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL,
+    )
+
+
+def _predict_uncached(name, X):
+    if name in coalescers:
+        return coalescers[name].predict_one(X[0])
+    return _row_model(name)(X)[0]
+
+
+def predict_row(name, X):
+    """Predict a single-row X, through the cache and/or coalescer when enabled."""
+    if name in caches:
+        return caches[name].predict_one(X[0], lambda Xn: _predict_uncached(name, Xn))
+    return _predict_uncached(name, X)
+
+
+# ---------------- HOME / MODEL SELECTOR ----------------
+@app.route("/")
+def home():
+    return render_template("index.html")
+
+
+# ---------------- FORM PAGES ----------------
+# Each page is parse (form -> values) -> features (values -> X) -> predict ->
+# result (prediction -> template context). The steps are plain functions so
+# asgi_app.py serves the same pages with predict() moved off the event loop.
+def parse_footfall_form(form):
+    store = (form.get("store_id") or "").strip() or None
+    if store is not None:
+        try:
+            registry.get("footfall_stores").index([store])
+        except (KeyError, FileNotFoundError):
+            raise ValueError(f"Unknown store: {store}")
+    # The lookup table is indexed by these values: out-of-range ones must not reach it
+    block = validate_block({c: [form.get(c)] for c in FOOTFALL_INPUTS}, FOOTFALL_INPUTS)
+    return (store,) + tuple(int(block[c][0]) for c in FOOTFALL_INPUTS)
+
+
+def predict_footfall(key):
+    store, *key = key
+    start = time.perf_counter()
+    table = registry.get("footfall_stores").table(store) if store else registry.get("footfall")
+    pred = table.lookup(*key)
+    observe_predict("footfall", time.perf_counter() - start, 1)
+    return pred
+
+
+def footfall_result(pred):
+    if pred > 500:
+        rec = "High traffic day: increase staff and run in-store promotions."
+    elif pred > 300:
+        rec = "Medium traffic day: normal staff, consider peak-hour offers."
+    else:
+        rec = "Low traffic day: optimise staffing and push digital campaigns."
+
+    return {
+        "prediction": f"{pred:.0f}",
+        "recommendation": rec,
+    }
+
+
+def parse_delivery_form(form):
+    return (float(form.get("distance_km")), int(form.get("num_items")), float(form.get("order_value")),
+            int(form.get("time_of_day_bucket")), int(form.get("traffic_level")),
+            int(form.get("rider_experience_months")))
+
+
+def delivery_features(values):
+    return np.array([values], dtype=np.float64)
+
+
+def delivery_result(pred):
+    # pred is the mean ETA, or [mean, *ETA_QUANTILES] when quantiles are on
+    pred = np.atleast_1d(pred)
+    quantiles = dict(zip(ETA_QUANTILES, pred[1:]))
+    mean = pred[0]
+    risk = quantiles.get(DELIVERY_RISK_QUANTILE, mean)
+    if risk > 45:
+        rec = "High delay risk: inform customer early and avoid tight SLAs."
+    elif risk > 30:
+        rec = "Moderate delay risk: assign experienced rider and check route."
+    else:
+        rec = "Low delay risk: use this slot for express delivery promises."
+
+    result = {
+        "prediction": f"{mean:.1f}",
+        "recommendation": rec,
+    }
+    if len(quantiles) >= 2:
+        lo, hi = min(quantiles), max(quantiles)
+        result["interval"] = f"{quantiles[lo]:.1f}–{quantiles[hi]:.1f}"
+        result["interval_label"] = f"P{lo * 100:g}–P{hi * 100:g}"
+    if DELIVERY_RISK_QUANTILE is not None:
+        result["risk_basis"] = f"P{DELIVERY_RISK_QUANTILE * 100:g}"
+    return result
+
+
+def parse_clv_form(form):
+    return (int(form.get("tenure_months")), float(form.get("orders_per_month")),
+            float(form.get("avg_order_value")), int(form.get("recency_days")),
+            float(form.get("discount_usage_rate")), float(form.get("return_rate")))
+
+
+def clv_features(values):
+    tenure_months, orders_per_month, avg_order_value, recency_days, discount_usage_rate, return_rate = values
+    loyalty_index = (1 - discount_usage_rate) * (1 - return_rate)
+    monetary_value = orders_per_month * avg_order_value
+    return np.array([[tenure_months, orders_per_month, avg_order_value,
+                      recency_days, discount_usage_rate, return_rate,
+                      loyalty_index, monetary_value]])
+
+
+def clv_result(pred):
+    if pred > 50000:
+        segment = "High Value"
+        rec = "Pamper with VIP perks, loyalty rewards, and early access."
+    elif pred > 20000:
+        segment = "Medium Value"
+        rec = "Use targeted offers and personalised nudges to grow value."
+    else:
+        segment = "Low Value"
+        rec = "Use low-cost campaigns to increase frequency and engagement."
+
+    return {
+        "prediction": f"{pred:,.2f}",
+        "segment": segment,
+        "recommendation": rec,
+    }
+
+
+# name -> (template, parse, features or None, predict, result)
+FORM_PAGES = {
+    "footfall": ("footfall.html", parse_footfall_form, None, predict_footfall, footfall_result),
+    "delivery": ("delivery.html", parse_delivery_form, delivery_features,
+                 lambda X: predict_row("delivery", X), delivery_result),
+    "clv": ("clv.html", parse_clv_form, clv_features, lambda X: predict_row("clv", X), clv_result),
+}
+
+
+def form_page(name):
+    template, parse, features, predict, to_result = FORM_PAGES[name]
+    result = None
+    timer = stage_timer()
+
+    if request.method == "POST":
+        try:
+            values = parse(request.form)
+        except (TypeError, ValueError) as exc:  # e.g. an unknown store_id
+            error = str(exc) if isinstance(exc, ValueError) else "Invalid or missing form field"
+            return render_template(template, result=None, error=error), 400
+        timer.mark("parse")
+        if features is not None:
+            values = features(values)
+            timer.mark("features")
+        pred = predict(values)
+        timer.mark("predict")
+        result = to_result(pred)
+
+    html = render_template(template, result=result)
+    timer.mark("render")
+    return html
+
+
+@app.route("/footfall", methods=["GET", "POST"])
+def footfall_page():
+    return form_page("footfall")
+
+
+@app.route("/delivery", methods=["GET", "POST"])
+def delivery_page():
+    return form_page("delivery")
+
+
+@app.route("/clv", methods=["GET", "POST"])
+def clv_page():
+    return form_page("clv")
+
+
+# ---------------- BATCH SCORING API ----------------
+# name -> (required input columns, feature builder, label function); the models
+# themselves come from the registry through model_predict()
+BATCH_MODELS = {
+    "footfall": (FOOTFALL_INPUTS, footfall_matrix, footfall_level),
+    "delivery": (DELIVERY_INPUTS, delivery_matrix, delivery_risk),
+    "clv": (CLV_INPUTS, clv_matrix, clv_segment),
+}
+
+
+def _read_batch_payload():
+    """
+    Turn a JSON or CSV request body into a column block (+ optional row ids).
+
+    JSON may be {"columns": {name: [...]}}, {"rows": [{...}, ...]} or a bare
+    list of row objects. CSV may be the raw body or an uploaded "file".
+    """
+    if request.is_json:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict) and isinstance(payload.get("columns"), dict):
+            data = payload["columns"]
+        else:
+            rows = payload.get("rows") if isinstance(payload, dict) else payload
+            if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+                raise ValueError("JSON body must contain 'columns' or a list of 'rows'")
+            keys = {k for r in rows for k in r}
+            data = {k: [r.get(k) for r in rows] for k in keys}
+        return data, data.get("id")
+
+    upload = request.files.get("file")
+    raw = upload.read() if upload else request.get_data()
+    if not raw:
+        raise ValueError("Empty request body")
+    try:
+        frame = pd.read_csv(io.BytesIO(raw))
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError):
+        raise ValueError("Could not parse CSV body")
+    data = {c: frame[c].to_numpy() for c in frame.columns}
+    return data, data.get("id")
+
+
+def _stream_json(name, ids, pred, labels, extra):
+    yield f'{{"model": "{name}", "rows": {len(pred)}, "results": ['
+    for start in range(0, len(pred), BATCH_STREAM_CHUNK):
+        stop = start + BATCH_STREAM_CHUNK
+        records = [
+            {"prediction": p, "label": l}
+            for p, l in zip(pred[start:stop].tolist(), labels[start:stop].tolist())
+        ]
+        for col, values in extra.items():
+            for rec, v in zip(records, values[start:stop].tolist()):
+                rec[col] = v
+        if ids is not None:
+            for rec, row_id in zip(records, ids[start:stop]):
+                rec["id"] = row_id.item() if hasattr(row_id, "item") else row_id
+        chunk = json.dumps(records)[1:-1]
+        yield ("," if start else "") + chunk
+    yield "]}"
+
+
+def _stream_csv(ids, pred, labels, extra):
+    header = (["id"] if ids is not None else []) + ["prediction", "label", *extra]
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(header)
+    yield buf.getvalue()
+    for start in range(0, len(pred), BATCH_STREAM_CHUNK):
+        stop = start + BATCH_STREAM_CHUNK
+        columns = [pred[start:stop].tolist(), labels[start:stop].tolist()]
+        columns += [values[start:stop].tolist() for values in extra.values()]
+        if ids is not None:
+            # ids are client-supplied: let the csv module quote commas, quotes and newlines
+            columns.insert(0, list(ids[start:stop]))
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(zip(*columns))
+        yield buf.getvalue()
+
+
+def _quantile_column(q):
+    return f"p{q * 100:g}"
+
+
+@app.route("/api/<name>/batch", methods=["POST"])
+def batch_predict(name):
+    """
+    Score a whole batch; ?format=csv|json picks the response format.
+
+    Delivery only: ?quantiles=0.1,0.9 adds p10/p90 ETA columns (default:
+    DELIVERY_QUANTILES), ?quantiles= (empty) returns the mean alone.
+    """
+    if name not in BATCH_MODELS:
+        return jsonify(error=f"Unknown model '{name}'"), 404
+    required, build, label = BATCH_MODELS[name]
+    timer = stage_timer()
+
+    start = time.perf_counter()
+    try:
+        data, ids = _read_batch_payload()
+        block = validate_block(data, required)
+        quantiles = ()
+        if name == "delivery":
+            raw = request.args.get("quantiles")
+            quantiles = DELIVERY_QUANTILES if raw is None else tuple(
+                float(q) for q in raw.split(",") if q.strip()
+            )
+            if any(not 0 <= q <= 1 for q in quantiles):
+                raise ValueError("Quantiles must be between 0 and 1")
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+    timer.mark("parse")
+
+    n_rows = len(block[required[0]])
+    if n_rows > BATCH_MAX_ROWS:
+        return jsonify(error=f"Batch too large: {n_rows} rows (max {BATCH_MAX_ROWS})"), 413
+    if ids is not None:
+        ids = list(ids)
+        if len(ids) != n_rows:
+            return jsonify(error="Column 'id' does not match the number of rows"), 400
+
+    # One vectorized predict for the whole batch
+    X = build(block)
+    timer.mark("features")
+    predict_start = time.perf_counter()
+    extra = {}
+    if name == "delivery" and (quantiles or DELIVERY_RISK_QUANTILE is not None):
+        # Mean and quantiles from the same per-tree predictions
+        wanted = tuple(sorted(set(quantiles) | ({DELIVERY_RISK_QUANTILE} - {None})))
+        eta = delivery_eta(X, wanted)
+        pred, by_q = eta[:, 0], dict(zip(wanted, eta[:, 1:].T))
+        extra = {_quantile_column(q): by_q[q] for q in quantiles}
+        risk = by_q.get(DELIVERY_RISK_QUANTILE, pred)
+    else:
+        pred = risk = np.asarray(model_predict(name, X), dtype=np.float64)
+    predict_s = time.perf_counter() - predict_start
+    timer.mark("predict")
+    labels = label(risk)
+    total_s = time.perf_counter() - start
+
+    fmt = request.args.get("format")
+    if fmt is None:
+        wants_csv = request.accept_mimetypes.best == "text/csv" or not request.is_json
+        fmt = "csv" if wants_csv else "json"
+
+    if fmt == "csv":
+        body, mimetype = _stream_csv(ids, pred, labels, extra), "text/csv"
+    else:
+        body, mimetype = _stream_json(name, ids, pred, labels, extra), "application/json"
+
+    resp = Response(stream_with_context(body), mimetype=mimetype)
+    resp.headers["X-Batch-Rows"] = str(n_rows)
+    resp.headers["X-Predict-Time-Ms"] = f"{predict_s * 1000:.3f}"
+    resp.headers["X-Total-Time-Ms"] = f"{total_s * 1000:.3f}"
+    resp.headers["X-Rows-Per-Second"] = f"{n_rows / max(total_s, 1e-9):.0f}"
+    timer.mark("respond")  # the body itself streams after this
+    return resp
+
+
+# ---------------- FOOTFALL CALENDAR FORECAST ----------------
+def check_forecast_range(start, end):
+    """Reject bad or over-long date ranges before any per-day array is built."""
+    try:
+        days = int((np.datetime64(end, "D") - np.datetime64(start, "D")).astype(np.int64)) + 1
+    except (TypeError, ValueError):
+        raise ValueError("'start' and 'end' must be dates (YYYY-MM-DD)")
+    if days <= 0:
+        raise ValueError("'end' is before 'start'")
+    if days > FORECAST_MAX_DAYS:
+        raise ValueError(f"Range too long: {days} days (max {FORECAST_MAX_DAYS})")
+
+
+@app.route("/api/footfall/forecast", methods=["POST"])
+def footfall_forecast():
+    """
+    Forecast a whole date range in one vectorized lookup.
+
+    JSON body: {"start": "2025-01-01", "end": "2025-12-31",
+                "holidays": ["2025-01-26", ...],
+                "promos": ["2025-03-14", ["2025-11-20", "2025-11-30"], ...]}
+    """
+    timer = stage_timer()
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify(error="Expected a JSON object"), 400
+    try:
+        check_forecast_range(payload["start"], payload["end"])
+    except KeyError as exc:
+        return jsonify(error=f"Missing field: {exc.args[0]}"), 400
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+    timer.mark("parse")
+    try:
+        dates, pred = registry.get("footfall").forecast(
+            payload["start"],
+            payload["end"],
+            holidays=payload.get("holidays", []),
+            promos=payload.get("promos", []),
+        )
+    except (TypeError, ValueError) as exc:
+        return jsonify(error=str(exc)), 400
+    timer.mark("predict")
+
+    resp = jsonify(
+        start=str(dates[0]),
+        end=str(dates[-1]),
+        dates=dates.astype(str).tolist(),
+        footfall=np.round(pred, 1).tolist(),
+        level=footfall_level(pred).tolist(),
+        total_footfall=float(pred.sum()),
+    )
+    timer.mark("serialize")
+    return resp
+
+
+# ---------------- RIDER ASSIGNMENT ----------------
+@app.route("/api/delivery/assign", methods=["POST"])
+def delivery_assign():
+    """
+    Assign a wave of orders to riders by predicted ETA (see dispatch.py).
+
+    JSON body: {"orders": [{"id": "o1", "distance_km": 4.2, "num_items": 3, "order_value": 640,
+                            "time_of_day_bucket": 1, "traffic_level": 2}, ...],
+                "riders": [{"id": "r1", "rider_experience_months": 14}, ...],
+                "objective": "total" | "worst"}
+    """
+    timer = stage_timer()
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify(error="Expected a JSON object"), 400
+    orders, riders = payload.get("orders") or [], payload.get("riders") or []
+    objective = payload.get("objective", "total")
+    if not isinstance(orders, list) or not isinstance(riders, list) or not orders or not riders:
+        return jsonify(error="Both 'orders' and 'riders' must be non-empty lists"), 400
+    if len(orders) * len(riders) > ASSIGN_MAX_PAIRS:
+        return jsonify(error=f"Wave too large: {len(orders)} x {len(riders)} pairs (max {ASSIGN_MAX_PAIRS})"), 413
+    if objective not in OBJECTIVES:
+        return jsonify(error=f"'objective' must be one of: {', '.join(OBJECTIVES)}"), 400
+    if not all(isinstance(item, dict) for item in orders + riders):
+        return jsonify(error="Orders and riders must be JSON objects"), 400
+    try:
+        block = validate_block({c: [o.get(c) for o in orders] for c in ORDER_INPUTS}, ORDER_INPUTS)
+        experience = validate_block({"rider_experience_months": [r.get("rider_experience_months") for r in riders]},
+                                    ["rider_experience_months"])["rider_experience_months"]
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+    timer.mark("parse")
+
+    plan = assign_wave(lambda X: model_predict("delivery", X), block, experience, objective)
+    timer.mark("predict")
+
+    order_ids = [o.get("id", i) for i, o in enumerate(orders)]
+    rider_ids = [r.get("id", i) for i, r in enumerate(riders)]
+    assigned = set(plan["orders"].tolist())
+    busy = set(plan["riders"].tolist())
+    resp = jsonify(
+        objective=objective,
+        assignments=[{"order": order_ids[o], "rider": rider_ids[r], "eta_min": round(float(e), 1)}
+                     for o, r, e in zip(plan["orders"].tolist(), plan["riders"].tolist(), plan["eta"])],
+        unassigned_orders=[order_ids[i] for i in range(len(orders)) if i not in assigned],
+        idle_riders=[rider_ids[i] for i in range(len(riders)) if i not in busy],
+        total_eta_min=round(float(plan["eta"].sum()), 1),
+        max_eta_min=round(float(plan["eta"].max()), 1),
+        score_ms=round(plan["score_seconds"] * 1e3, 2),
+        solve_ms=round(plan["solve_seconds"] * 1e3, 2),
+    )
+    timer.mark("serialize")
+    return resp
+
+
+# ---------------- CLV WHAT-IF SWEEPS ----------------
+@app.route("/api/clv/sweep", methods=["POST"])
+def clv_sweep():
+    """
+    Predicted CLV of one or more customers over a grid of one or two inputs (see clv_sweep.py).
+
+    JSON body: {"customer": {"tenure_months": 18, ...}} or {"customers": [{...}, ...]},
+                "grid": {"discount_usage_rate": {"start": 0, "stop": 0.7, "num": 100},
+                         "return_rate": [0, 0.05, 0.1, ...]},
+                "reduce": "none" | "mean"}
+    Response: "clv" is a customers x grid[0] (x grid[1]) array, or grid-shaped with
+    "reduce": "mean". ?format=npz returns the same arrays as a NumPy .npz file.
+    """
+    timer = stage_timer()
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify(error="Expected a JSON object"), 400
+    customers = payload.get("customers")
+    if customers is None and isinstance(payload.get("customer"), dict):
+        customers = [payload["customer"]]
+    reduce = payload.get("reduce", "none")
+    if not isinstance(customers, list) or not customers or not all(isinstance(c, dict) for c in customers):
+        return jsonify(error="Send a 'customer' object or a non-empty 'customers' list"), 400
+    if reduce not in ("none", "mean"):
+        return jsonify(error="'reduce' must be 'none' or 'mean'"), 400
+    try:
+        names, axes = parse_grid(payload.get("grid"))
+        block = validate_block({c: [cust.get(c) for cust in customers] for c in CLV_INPUTS}, CLV_INPUTS)
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+    n_rows = len(customers) * int(np.prod([len(a) for a in axes]))
+    if n_rows > SWEEP_MAX_ROWS:
+        return jsonify(error=f"Sweep too large: {n_rows:,} rows (max {SWEEP_MAX_ROWS:,})"), 413
+    timer.mark("parse")
+
+    try:
+        result = sweep(registry.get("clv"), block, names, axes, predict=lambda X: model_predict("clv", X))
+    except FileNotFoundError:
+        return jsonify(error="No CLV model; run train_models.py"), 404
+    clv = result["clv"].mean(axis=0) if reduce == "mean" else result["clv"]
+    timer.mark("predict")
+
+    if request.args.get("format") == "npz":
+        buf = io.BytesIO()
+        np.savez(buf, clv=clv, **{f"axis_{i}": a for i, a in enumerate(axes)})
+        resp = Response(buf.getvalue(), mimetype="application/octet-stream",
+                        headers={"Content-Disposition": "attachment; filename=clv_sweep.npz",
+                                 "X-Features": ",".join(names)})
+    else:
+        resp = jsonify(
+            features=names,
+            axes=[a.tolist() for a in axes],
+            shape=list(clv.shape),
+            reduce=reduce,
+            clv=np.round(clv.astype(np.float64), 2).tolist(),
+            rows_total=result["rows_total"],
+            rows_scored=result["rows_scored"],
+            sweep_ms=round(result["seconds"] * 1e3, 2),
+        )
+    timer.mark("serialize")
+    return resp
+
+
+# ---------------- PER-STORE FOOTFALL ----------------
+@app.route("/api/footfall/stores/forecast", methods=["POST"])
+def footfall_stores_forecast():
+    """
+    Forecast every store (or the listed ones) over a date range: one matrix product.
+
+    JSON body: as /api/footfall/forecast, plus optional "stores": ["S0001", ...].
+    Response: "footfall" is a stores x dates matrix (rows in "stores" order).
+    """
+    timer = stage_timer()
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify(error="Expected a JSON object"), 400
+    stores = payload.get("stores")
+    if stores is not None and (not isinstance(stores, list) or not all(isinstance(s, str) for s in stores)):
+        return jsonify(error="'stores' must be a list of store ids"), 400
+    timer.mark("parse")
+    try:
+        check_forecast_range(payload["start"], payload.get("end", payload["start"]))
+        models = registry.get("footfall_stores")
+        stores, dates, pred = models.forecast(
+            payload["start"],
+            payload.get("end", payload["start"]),
+            holidays=payload.get("holidays", []),
+            promos=payload.get("promos", []),
+            stores=stores,
+        )
+    except FileNotFoundError:
+        return jsonify(error="No per-store models; run train_models.py"), 404
+    except KeyError as exc:
+        return jsonify(error=f"Missing field or unknown store: {exc.args[0]}"), 400
+    except (TypeError, ValueError) as exc:
+        return jsonify(error=str(exc)), 400
+    timer.mark("predict")
+
+    resp = jsonify(
+        start=str(dates[0]),
+        end=str(dates[-1]),
+        dates=dates.astype(str).tolist(),
+        stores=stores.tolist(),
+        footfall=np.round(pred, 1).tolist(),
+        total_footfall=pred.sum(axis=1).round(1).tolist(),
+    )
+    timer.mark("serialize")
+    return resp
+
+
+@app.route("/api/footfall/stores")
+def footfall_stores():
+    """Store count and the state of the per-store lookup-table LRU."""
+    try:
+        return jsonify(registry.get("footfall_stores").cache_info())
+    except FileNotFoundError:
+        return jsonify(error="No per-store models; run train_models.py"), 404
+
+
+@app.route("/api/models")
+def model_stats():
+    """Per-model load state, load time and memory (mapped pages are shared across workers)."""
+    return jsonify(registry.stats())
+
+
+@metrics.collector
+def _model_samples():
+    stats = registry.stats()
+    return [
+        ("rp360_model_loaded", "gauge", "1 once the model artifact is loaded.",
+         [({"model": m}, int(s["loaded"])) for m, s in stats.items()]),
+        ("rp360_model_generation", "gauge", "Times the model was reloaded.",
+         [({"model": m}, s["generation"]) for m, s in stats.items()]),
+        ("rp360_model_load_seconds", "gauge", "Time the last load of the model took.",
+         [({"model": m}, s.get("load_seconds")) for m, s in stats.items()]),
+        ("rp360_model_mapped_bytes", "gauge", "Model arrays memory-mapped from disk.",
+         [({"model": m}, s.get("mapped_bytes")) for m, s in stats.items()]),
+        ("rp360_model_heap_bytes", "gauge", "Model arrays held on the heap.",
+         [({"model": m}, s.get("heap_bytes")) for m, s in stats.items()]),
+        ("rp360_model_rss_delta_bytes", "gauge", "Resident memory added by loading the model.",
+         [({"model": m}, s.get("rss_delta_bytes")) for m, s in stats.items()]),
+    ]
+
+
+@metrics.collector
+def _coalescer_samples():
+    stats = [c.stats() for c in coalescers.values()]
+    return [
+        ("rp360_coalescer_batches_total", "counter", "Micro-batches sent to the model.",
+         [({"model": s["model"]}, s["batches"]) for s in stats]),
+        ("rp360_coalescer_rows_total", "counter", "Rows predicted through the coalescer.",
+         [({"model": s["model"]}, s["rows"]) for s in stats]),
+        ("rp360_coalescer_queued", "gauge", "Rows waiting for the next batch.",
+         [({"model": s["model"]}, s["queued"]) for s in stats]),
+    ]
+
+
+@metrics.collector
+def _cache_samples():
+    out = []
+    for field, kind, help in [("hits", "counter", "Prediction cache hits."),
+                              ("misses", "counter", "Prediction cache misses."),
+                              ("evictions", "counter", "Entries evicted by the LRU limit."),
+                              ("expirations", "counter", "Entries dropped after their TTL."),
+                              ("invalidations", "counter", "Cache flushes after a model reload."),
+                              ("size", "gauge", "Entries in the prediction cache.")]:
+        suffix = "_total" if kind == "counter" else ""
+        out.append((f"rp360_prediction_cache_{field}{suffix}", kind, help,
+                    [({"model": m}, c.stats()[field]) for m, c in caches.items()]))
+    return out
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition of the counters and histograms above."""
+    if not METRICS_ENABLED:
+        return Response("metrics are disabled (RP360_METRICS=0)\n", status=404, mimetype="text/plain")
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route("/api/models/<name>/reload", methods=["POST"])
+def model_reload(name):
+    """Drop a loaded model so the next request reads the artifact again."""
+    if name not in registry.names():
+        return jsonify(error=f"Unknown model '{name}'"), 404
+    registry.reload(name)
+    return jsonify(model=name, generation=registry.generation(name))
+
+
+@app.route("/api/cache/stats")
+def cache_stats():
+    return jsonify(
+        enabled=PREDICTION_CACHE_ENABLED,
+        models={name: c.stats() for name, c in caches.items()},
+    )
+
+
+@app.route("/api/coalescer/stats")
+def coalescer_stats():
+    return jsonify(
+        enabled=COALESCE_ENABLED,
+        models={name: c.stats() for name, c in coalescers.items()},
+    )
+
+
+if __name__ == "__main__":
+    app.run(debug=True)